@@ -0,0 +1,84 @@
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+# Компактний прогрес Академії: множина прочитаних статей — бітова маска (біт = id статті).
+# ~366 статей вміщуються в 46 байт, тож перевірка "прочитано?", загальна кількість
+# і денний лічильник відповідають з пам'яті без запитів до БД.
+
+
+def bitmap_from_bytes(data) -> int:
+    """BYTEA з Postgres (set_bit: біт n — молодший біт байта n // 8) -> int-бітсет"""
+    return int.from_bytes(data, "little") if data else 0
+
+
+def bitmap_from_ids(article_ids) -> int:
+    bits = 0
+    for article_id in article_ids:
+        bits |= 1 << article_id
+    return bits
+
+
+def bitmap_to_bytes(bits: int) -> bytes:
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+
+class UserProgress:
+    __slots__ = ("bits", "count", "daily_date", "daily_count", "loaded_at")
+
+    def __init__(self, bits, daily_count):
+        self.bits = bits
+        self.count = bits.bit_count()
+        self.daily_date = datetime.now().date()
+        self.daily_count = daily_count
+        self.loaded_at = time.monotonic()
+
+    def is_read(self, article_id) -> bool:
+        return bool(self.bits >> article_id & 1)
+
+    def today_count(self) -> int:
+        # Після півночі денний лічильник починається з нуля
+        if self.daily_date != datetime.now().date():
+            self.daily_date = datetime.now().date()
+            self.daily_count = 0
+        return self.daily_count
+
+    def mark_read(self, article_id) -> bool:
+        if self.is_read(article_id):
+            return False
+        self.bits |= 1 << article_id
+        self.count += 1
+        self.today_count()
+        self.daily_count += 1
+        return True
+
+
+class ProgressCache:
+    """
+    LRU прогресу по юзерах. Записи живуть ttl секунд: бот і API — різні процеси,
+    і запис з іншого процесу підтягнеться не пізніше ніж через ttl.
+    """
+
+    def __init__(self, max_users=10000, ttl=120):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._items = OrderedDict()
+
+    def get(self, user_id):
+        progress = self._items.get(user_id)
+        if progress is None:
+            return None
+        if time.monotonic() - progress.loaded_at > self.ttl:
+            del self._items[user_id]
+            return None
+        self._items.move_to_end(user_id)
+        return progress
+
+    def put(self, user_id, progress):
+        self._items[user_id] = progress
+        self._items.move_to_end(user_id)
+        while len(self._items) > self.max_users:
+            self._items.popitem(last=False)
+
+    def invalidate(self, user_id):
+        self._items.pop(user_id, None)
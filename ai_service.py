@@ -2,6 +2,8 @@ import os
 from dotenv import load_dotenv
 from openai import AsyncOpenAI
 
+from metrics import openai_completion
+
 load_dotenv()
 
 client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
@@ -17,7 +19,9 @@ SYSTEM_PROMPT = """
 async def get_stoic_advice(user_text: str, user_id: int = None) -> str:
     """Відправляє запит до ШІ та отримує відповідь"""
     try:
-        response = await client.chat.completions.create(
+        response = await openai_completion(
+            client,
+            "bot_mentor",
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": SYSTEM_PROMPT},
@@ -3,7 +3,9 @@ import random
 from datetime import datetime
 from contextlib import asynccontextmanager
 from constants import (
+    ACADEMY_DAILY_LIMIT,
     ACADEMY_REWARD,
+    AI_COOLDOWN_SECONDS,
     LAB_POINTS_PER_MINUTE, 
     LAB_MAX_POINTS_PER_SESSION, 
     LAB_MIN_SECONDS,
@@ -11,16 +13,30 @@ from constants import (
 )
 
 import uvicorn
-from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException, Security, status
+from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException, Request, Response, Security, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import APIKeyHeader
 from openai import AsyncOpenAI
 from pydantic import BaseModel
+from typing import List, Optional
 
 from config import SYSTEM_PROMPT_AI_MSG
 from db import Database
-from utils import get_stoic_rank
+import metrics
+import query_trace
+from pagination import decode_cursor, encode_cursor
+import sync_service
+from http_cache import (
+    CONTENT_CACHE_CONTROL,
+    DB_CONTENT_CACHE_CONTROL,
+    ORJSONResponse,
+    ResponseCache,
+    cached_response,
+    conditional_response,
+    serialize,
+)
+from utils import STOIC_RANKS
 
 # --- МОДЕЛІ ДАНИХ (ОНОВЛЕНІ: без user_id там, де не треба) ---
 class GymAnswer(BaseModel):
@@ -54,6 +70,37 @@ class LabCompleteRequest(BaseModel):
 class SyncRequest(BaseModel):
     code: str
 
+# --- МОДЕЛІ ВІДПОВІДЕЙ (для документації; вихід довірений, тому без валідації) ---
+class ArticleListItem(BaseModel):
+    id: int
+    day: int
+    month: int
+    title: Optional[str]
+
+class LeaderboardEntry(BaseModel):
+    user_id: int
+    username: str
+    score: int
+    rank_name: str
+
+class JournalHistoryItem(BaseModel):
+    id: int
+    entry_text: str
+    created_at: datetime
+
+class MentorHistoryItem(BaseModel):
+    role: str
+    content: str
+    created_at: datetime
+
+def json_list_docs(model):
+    """Описує схему списку в OpenAPI, не вмикаючи response_model (валідацію на виході)"""
+    return {"response_model": None, "responses": {200: {"model": List[model]}}}
+
+def raw_json(body: str) -> Response:
+    """Віддає JSON, який уже зібрав Postgres (json_agg), без повторного кодування"""
+    return Response(content=body.encode("utf-8"), media_type="application/json")
+
 # --- НАЛАШТУВАННЯ ---
 ADMIN_TOKEN = os.getenv("ADMIN_SECRET_TOKEN")
 APP_SECRET_KEY = os.getenv("APP_SECRET_KEY") # Крок 1 (API Key)
@@ -61,6 +108,21 @@ APP_SECRET_KEY = os.getenv("APP_SECRET_KEY") # Крок 1 (API Key)
 client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 db = Database()
 
+# Кеш серіалізованого контенту (статті). З бандлом ключ містить версію контенту,
+# і записи живуть до перезбірки; без бандла — не довше CONTENT_CACHE_TTL секунд.
+CONTENT_CACHE_TTL = 300
+content_cache = ResponseCache()
+
+def content_cache_key(*parts):
+    version = db.bundle.content_version if db.bundle else None
+    return (version, *parts)
+
+def content_cache_ttl():
+    return None if db.bundle else CONTENT_CACHE_TTL
+
+def content_cache_control():
+    return CONTENT_CACHE_CONTROL if db.bundle else DB_CONTENT_CACHE_CONTROL
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await db.connect()
@@ -68,9 +130,13 @@ async def lifespan(app: FastAPI):
     await db.create_academy_table()
     await db.create_progress_table()
     await db.create_lab_tables()
+    await db.create_erasure_tables()
+    # Незавершені видалення акаунтів після рестарту
+    await db.erasure.resume()
     yield
+    await db.close()
 
-app = FastAPI(title="Stoic Trainer API", lifespan=lifespan)
+app = FastAPI(title="Stoic Trainer API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -80,6 +146,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Час кожного запиту за шаблоном маршруту (metrics.py)
+app.middleware("http")(metrics.api_middleware)
+# Запити до БД на HTTP-запит, попередження понад QUERY_BUDGET (query_trace.py)
+app.middleware("http")(query_trace.api_middleware)
+
 if not os.path.exists("static"):
     os.makedirs("static")
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -114,30 +185,52 @@ async def get_current_user(token: str = Security(user_auth_header)):
 
 # --- ЕНДПОІНТИ ЗАГАЛЬНІ (Публічні або напів-публічні) ---
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
+
+# Топ повільних запитів з планами (slow_queries.py). Лише з X-Admin-Token = ADMIN_SECRET_TOKEN
+@app.get("/api/admin/slow-queries", include_in_schema=False)
+async def admin_slow_queries(limit: int = 20, explain: bool = False, x_admin_token: str = Header(None)):
+    if not ADMIN_TOKEN or x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if explain:
+        await db.slow_queries.explain_top()
+    return {
+        "enabled": db.slow_queries.enabled,
+        "threshold_ms": db.slow_queries.threshold_ms,
+        "statements": db.slow_queries.top(limit=limit, with_plan=True),
+    }
+
 @app.get("/")
 async def root():
     user_count = await db.count_users()
     return {"status": "online", "total_users": user_count}
 
-@api_router.get("/quotes/random")
-async def get_random_quote():
+async def build_random_quote():
     quote = await db.get_random_quote()
     if not quote:
         return {"text": "Живи зараз.", "author": "Сенека", "category": "Час"}
     return quote
 
-@api_router.get("/leaderboard")
+@api_router.get("/quotes/random")
+async def get_random_quote():
+    return await build_random_quote()
+
+@api_router.get("/leaderboard", **json_list_docs(LeaderboardEntry))
 async def get_leaderboard(limit: int = 20):
     users = await db.get_top_users(limit)
-    return [
+    ranks = STOIC_RANKS.resolve_many([score for _, _, score in users])
+    return ORJSONResponse([
         {
             # Тут user_id можна показувати (це публічний топ), або приховати
-            "user_id": user["user_id"],
-            "username": user["username"] or "Мандрівник",
-            "score": user["score"],
-            "rank_name": get_stoic_rank(user["score"]),
-        } for user in users
-    ]
+            "user_id": user_id,
+            "username": username or "Мандрівник",
+            "score": score,
+            "rank_name": rank.name,
+        } for (user_id, username, score), rank in zip(users, ranks)
+    ])
 
 # --- АВТОРИЗАЦІЯ (Тут ми ВИДАЄМО токени) ---
 
@@ -145,17 +238,8 @@ async def get_leaderboard(limit: int = 20):
 async def create_guest(req: GuestRequest):
     try:
         b_date = datetime.strptime(req.birthdate, "%Y-%m-%d").date()
-        # db.add_user тепер генерує токен всередині
-        await db.add_user(req.user_id, req.username, b_date)
-        
-        # Нам треба повернути цей токен клієнту!
-        # Оскільки add_user не повертає токен, ми дістанемо його окремим запитом 
-        # (або можна переписати add_user щоб повертав, але так простіше зараз)
-        # В даному випадку ми знаємо user_id (бо це реєстрація по Device ID)
-        
-        # Тимчасово: дістаємо токен, який щойно створився
-        async with db.pool.acquire() as conn:
-            token = await conn.fetchval("SELECT auth_token FROM users WHERE user_id = $1", req.user_id)
+        # add_user одним запитом створює юзера і повертає його токен (новий або існуючий)
+        token = await db.add_user(req.user_id, req.username, b_date)
 
         return {"status": "success", "token": token}
     except Exception as e:
@@ -163,52 +247,26 @@ async def create_guest(req: GuestRequest):
 
 @api_router.post("/auth/sync")
 async def sync_with_code(req: SyncRequest):
-    async with db.pool.acquire() as conn:
-        row = await conn.fetchrow(
-            """
-            DELETE FROM sync_codes 
-            WHERE code = $1 AND expires_at > (now() AT TIME ZONE 'utc') 
-            RETURNING user_id
-            """,
-            req.code
-        )
-        
-        if not row:
-            raise HTTPException(status_code=401, detail="Код недійсний")
-        
-        user_id = row["user_id"]
-        
-        # Тепер беремо повні дані, ВКЛЮЧАЮЧИ ТОКЕН
-        user_data = await db.get_full_user_data(user_id)
-        
-        # Важливо: get_full_user_data має повертати auth_token. 
-        # Якщо ні - дістанемо його:
-        token = await conn.fetchval("SELECT auth_token FROM users WHERE user_id = $1", user_id)
-        
-        academy_count, academy_rank = await db.get_academy_progress(user_id)
-        user_data["academy_total"] = academy_count
-        user_data["academy_rank"] = academy_rank
-        
-        return {
-            "status": "success", 
-            "user_id": int(user_id), 
-            "token": token, # <--- ПОВЕРТАЄМО ТОКЕН
-            "user_data": user_data
-        }
+    # Код гаситься і профіль з токеном повертається одним запитом
+    redeemed = await sync_service.redeem_code(db, req.code)
+    if not redeemed:
+        raise HTTPException(status_code=401, detail="Код недійсний")
+
+    token, user_data = redeemed
+    return {
+        "status": "success", 
+        "user_id": user_data["user_id"], 
+        "token": token, # <--- ПОВЕРТАЄМО ТОКЕН
+        "user_data": user_data
+    }
 
 # --- ЗАХИЩЕНІ ЕНДПОІНТИ (Вимагають Token) ---
 # Увага: скрізь user_id береться з get_current_user
 
-@api_router.get("/stats") # Прибрав {user_id}
-async def get_user_stats(user_id: int = Depends(get_current_user)):
-    score, level, name = await db.get_stats(user_id)
-    global_rank = await db.get_user_position(user_id)
+async def build_user_stats(user_id: int):
+    score, level, name, birthdate, global_rank = await db.get_user_overview(user_id)
     energy = await db.check_energy(user_id)
-    birthdate = await db.get_birthdate(user_id)
-    rank_name = get_stoic_rank(score)
-    
-    thresholds = [50, 150, 500, 1000, 2500, 5000]
-    next_rank_score = next((t for t in thresholds if score < t), 0)
+    rank_name, next_rank_score, rank_progress = STOIC_RANKS.resolve(score)
 
     return {
         "user_id": user_id,
@@ -220,12 +278,17 @@ async def get_user_stats(user_id: int = Depends(get_current_user)):
         "rank": rank_name,
         "global_rank": global_rank,
         "next_rank_score": next_rank_score,
+        "rank_progress": round(rank_progress, 3),
     }
 
+@api_router.get("/stats") # Прибрав {user_id}
+async def get_user_stats(user_id: int = Depends(get_current_user)):
+    return await build_user_stats(user_id)
+
 # --- STOIC GYM ---
 
-@api_router.get("/gym/scenario")
-async def get_next_gym_scenario(lang: str = "ua", user_id: int = Depends(get_current_user)):
+async def build_gym_scenario(user_id: int, lang: str = "ua"):
+    """Наступний сценарій для юзера або підсумок дня, якщо енергії немає. None — сценарій не знайдено."""
     energy = await db.check_energy(user_id)
     if energy <= 0:
         summary = await db.get_daily_summary(user_id)
@@ -239,9 +302,17 @@ async def get_next_gym_scenario(lang: str = "ua", user_id: int = Depends(get_cur
     scenario = await db.get_scenario_by_level(target_id, lang=lang)
     
     if not scenario:
-        raise HTTPException(status_code=404, detail="Сценарій не знайдено")
+        return None
     return {"scenario": scenario, "energy": energy, "level": level, "is_endless": level > max_scenarios}
 
+@api_router.get("/gym/scenario")
+async def get_next_gym_scenario(request: Request, lang: str = "ua", user_id: int = Depends(get_current_user)):
+    result = await build_gym_scenario(user_id, lang)
+    if not result:
+        raise HTTPException(status_code=404, detail="Сценарій не знайдено")
+    # Відповідь персональна (енергія, рівень), тому тільки ETag без спільного кешу
+    return conditional_response(request, result)
+
 @api_router.post("/gym/answer")
 async def submit_gym_answer(
     data: GymAnswer, 
@@ -252,58 +323,102 @@ async def submit_gym_answer(
     if data.level != db_level:
         raise HTTPException(status_code=400, detail="Дані застаріли")
     
-    energy = await db.check_energy(user_id)
-    if energy <= 0:
+    energy_left = await db.spend_energy(user_id)
+    if energy_left is None:
         raise HTTPException(status_code=403, detail="Енергія вичерпана")
 
     new_score = current_score + data.score
     new_level = db_level + 1
     
     await db.update_game_progress(user_id, new_score, new_level)
-    await db.decrease_energy(user_id)
     await db.log_move(user_id, data.level, data.score)
     
     return {
         "status": "success", 
         "new_score": new_score, 
         "new_level": new_level,
-        "energy_left": energy - 1
+        "energy_left": energy_left
     }
 
 # --- АКАДЕМІЯ ---
 
-@api_router.get("/academy/status")
-async def get_academy_status(lang: str = "ua", user_id: int = Depends(get_current_user)):
+async def build_academy_status(user_id: int, lang: str = "ua"):
+    # Обидва з одного прогресу юзера (кеш), тож другий виклик без запиту
     count, rank = await db.get_academy_progress(user_id)
     daily_count = await db.get_daily_academy_count(user_id)
-    return {"total_learned": count, "rank": rank, "daily_count": daily_count, "can_learn_more": daily_count < 5}
-
-@api_router.get("/academy/articles")
-async def get_articles(limit: int = 50, offset: int = 0, lang: str = "ua", user_id: int = Depends(get_current_user)):
-    # Використовуємо динамічний вибір колонки заголовка
-    async with db.pool.acquire() as conn:
-        t_col = "title_en" if lang == "en" else "title"
-        rows = await conn.fetch(
-            f"SELECT id, day, month, {t_col} as title FROM academy_articles ORDER BY month, day LIMIT $1 OFFSET $2", 
-            limit, offset
+    return {"total_learned": count, "rank": rank, "daily_count": daily_count, "can_learn_more": daily_count < ACADEMY_DAILY_LIMIT}
+
+@api_router.get("/academy/status")
+async def get_academy_status(lang: str = "ua", user_id: int = Depends(get_current_user)):
+    return await build_academy_status(user_id, lang)
+
+ARTICLE_FIELDS = ["id", "day", "month", "title"]
+
+@api_router.get("/academy/articles", **json_list_docs(ArticleListItem))
+async def get_articles(
+    request: Request,
+    limit: int = 50,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    lang: str = "ua",
+    user_id: int = Depends(get_current_user),
+):
+    """
+    Без cursor — старий формат (масив об'єктів, LIMIT/OFFSET) для старих версій додатку.
+    З cursor (порожній = перша сторінка) — компактний формат з keyset-пагінацією:
+    {"fields": [...], "items": [[id, day, month, title], ...], "has_more": bool, "next_cursor": str | null}
+    """
+    if cursor is None:
+        key = content_cache_key("articles", limit, offset, lang)
+        cached = content_cache.get(key)
+        if not cached:
+            body = await db.get_articles_json(limit, offset, lang=lang)
+            cached = content_cache.put_body(key, body.encode("utf-8"), ttl=content_cache_ttl())
+        return cached_response(request, cached, content_cache_control())
+
+    after = decode_cursor(cursor, 3) if cursor else (0, 0, 0)
+    if after is None:
+        raise HTTPException(status_code=400, detail="Невірний курсор")
+    limit = max(1, min(limit, 100))
+
+    key = content_cache_key("articles_page", after, limit, lang)
+    cached = content_cache.get(key)
+    if not cached:
+        items, has_more, last_key = await db.get_articles_page_json(after, limit, lang=lang)
+        next_cursor = encode_cursor(*last_key) if has_more else None
+        # items вже JSON від Postgres — вклеюємо його без перекодування
+        body = (
+            b'{"fields":' + serialize(ARTICLE_FIELDS)
+            + b',"items":' + items.encode("utf-8")
+            + b',"has_more":' + serialize(has_more)
+            + b',"next_cursor":' + serialize(next_cursor) + b"}"
         )
-        return [dict(row) for row in rows]
+        cached = content_cache.put_body(key, body, ttl=content_cache_ttl())
+    return cached_response(request, cached, content_cache_control())
     
 # Тільки урок на сьогодні
 @api_router.get("/academy/today")
-async def get_today_article(lang: str = "ua", user_id: int = Depends(get_current_user)):
-    # Використовуємо новий метод з db.py, який має логіку дати, мови та fallback
-    article = await db.get_today_article(lang=lang)
-    if not article:
-        raise HTTPException(status_code=404, detail="Статтю не знайдено")
-    return article
+async def get_today_article(request: Request, lang: str = "ua", user_id: int = Depends(get_current_user)):
+    key = content_cache_key("today", datetime.now().date(), lang)
+    cached = content_cache.get(key)
+    if not cached:
+        # Використовуємо новий метод з db.py, який має логіку дати, мови та fallback
+        article = await db.get_today_article(lang=lang)
+        if not article:
+            raise HTTPException(status_code=404, detail="Статтю не знайдено")
+        cached = content_cache.put(key, article, ttl=content_cache_ttl())
+    return cached_response(request, cached, content_cache_control())
 
 @api_router.get("/academy/articles/{article_id}")
-async def get_article_detail(article_id: int, lang: str = "ua", user_id: int = Depends(get_current_user)):
-    article = await db.get_article_by_id(article_id, lang=lang)
-    if not article: 
-        raise HTTPException(status_code=404, detail="Статтю не знайдено")
-    return article
+async def get_article_detail(request: Request, article_id: int, lang: str = "ua", user_id: int = Depends(get_current_user)):
+    key = content_cache_key("article", article_id, lang)
+    cached = content_cache.get(key)
+    if not cached:
+        article = await db.get_article_by_id(article_id, lang=lang)
+        if not article: 
+            raise HTTPException(status_code=404, detail="Статтю не знайдено")
+        cached = content_cache.put(key, article, ttl=content_cache_ttl())
+    return cached_response(request, cached, content_cache_control())
 
 @api_router.get("/academy/library") # Прибрав {user_id}
 async def get_library(user_id: int = Depends(get_current_user)):
@@ -327,27 +442,56 @@ async def complete_lesson(
     req: AcademyReadRequest, 
     user_id: int = Depends(get_current_user)
 ):
-    
-    daily_count = await db.get_daily_academy_count(user_id)
-    if daily_count >= 5: 
-        return {"success": False, "error": "limit_reached"}
-    
-    # Передаємо наше фіксоване значення винагороди
-    is_new, new_total_score = await db.mark_article_as_read(user_id, req.article_id, score=ACADEMY_REWARD)
+    # Квоту вже вичерпано (а стаття нова) — відповідаємо з пам'яті, без БД
+    if db.academy_limit_reached(user_id, req.article_id):
+        return {"success": False, "error": "limit_reached", "daily_count": ACADEMY_DAILY_LIMIT}
+
+    # Ліміт і зарахування атомарно: паралельні запити не проскочать денний ліміт
+    result = await db.complete_article(user_id, req.article_id, ACADEMY_DAILY_LIMIT, score=ACADEMY_REWARD)
+    if not result:
+        raise HTTPException(status_code=404, detail="User not found")
+    if result["limit_reached"]:
+        return {"success": False, "error": "limit_reached", "daily_count": result["daily_count"]}
 
     return {
         "success": True, 
-        "is_new": is_new, 
-        "new_score": new_total_score, # Віддаємо новий загальний рахунок
-        "reward": ACADEMY_REWARD if is_new else 0 # Повідомляємо, скільки нарахували
+        "is_new": result["is_new"], 
+        "new_score": result["new_score"], # Віддаємо новий загальний рахунок
+        "reward": ACADEMY_REWARD if result["is_new"] else 0, # Повідомляємо, скільки нарахували
+        "total_learned": result["total_learned"],
+        "daily_count": result["daily_count"],
+        "rank": result["rank"],
+        "can_learn_more": result["daily_count"] < ACADEMY_DAILY_LIMIT,
+    }
+
+# --- ГОЛОВНИЙ ЕКРАН ДОДАТКУ ---
+
+@api_router.get("/home")
+async def get_home_screen(
+    lang: str = "ua",
+    include_scenario: bool = False,
+    user_id: int = Depends(get_current_user),
+):
+    """
+    Все для холодного старту додатку одним запитом:
+    stats + academy/status + academy/today + quotes/random (+ gym/scenario).
+    Авторизація одна, частини збираються по черзі: запит тримає щонайбільше одне
+    з'єднання пулу (паралельні частини забирали б пів пулу на кожен холодний старт).
+    Контентні частини з бандлом запитів не роблять.
+    """
+    return {
+        "stats": await build_user_stats(user_id),
+        "academy_status": await build_academy_status(user_id, lang),
+        "today_article": await db.get_today_article(lang=lang),
+        "quote": await build_random_quote(),
+        "gym": await build_gym_scenario(user_id, lang) if include_scenario else None,
     }
 
 # --- ЩОДЕННИК ---
 
-@api_router.get("/journal/history") # Прибрав {user_id}
+@api_router.get("/journal/history", **json_list_docs(JournalHistoryItem)) # Прибрав {user_id}
 async def get_journal_history(limit: int = 10, user_id: int = Depends(get_current_user)):
-    entries = await db.get_journal_entries(user_id, limit)
-    return [dict(e) for e in entries]
+    return raw_json(await db.get_journal_entries_json(user_id, limit))
 
 @api_router.post("/journal/save")
 async def save_journal_entry(
@@ -366,10 +510,9 @@ async def delete_journal_entry(entry_id: int, user_id: int = Depends(get_current
 
 # --- ШІ МЕНТОР ---
 
-@api_router.get("/mentor/history")
+@api_router.get("/mentor/history", **json_list_docs(MentorHistoryItem))
 async def get_mentor_history(user_id: int = Depends(get_current_user)):
-    entries = await db.get_mentor_history(user_id)
-    return [dict(e) for e in entries]
+    return raw_json(await db.get_mentor_history_json(user_id))
 
 @api_router.post("/mentor/chat")
 async def mentor_chat(
@@ -390,14 +533,12 @@ async def mentor_chat(
     if not safe_messages:
          return {"reply": "Ти мовчиш..."}
 
-    # 2. ЗАХИСТ ВІД СПАМУ (Rate Limiting)
-    # Цей метод ми додали в db.py
-    # limit_per_day=50 означає ~1.5$ в місяць макс. на юзера (дуже грубо)
-    status_limit = await db.check_ai_limit(user_id, limit_per_day=50)
+    # 2. ЗАХИСТ ВІД СПАМУ (Rate Limiting): кулдаун і денний ліміт у пам'яті (rate_limit.py)
+    status_limit = await db.check_ai_limit(user_id)
     
     if status_limit == "cooldown":
         # 429 Too Many Requests
-        raise HTTPException(status_code=429, detail="Не поспішай. Дай мені 5 секунд на роздуми.")
+        raise HTTPException(status_code=429, detail=f"Не поспішай. Дай мені {AI_COOLDOWN_SECONDS} секунд на роздуми.")
     
     if status_limit == "limit_reached":
         raise HTTPException(status_code=429, detail="На сьогодні ліміт мудрості вичерпано. Приходь завтра.")
@@ -408,7 +549,9 @@ async def mentor_chat(
         last_msg = safe_messages[-1]["content"]
         await db.save_mentor_message(user_id, "user", last_msg)
         
-        response = await client.chat.completions.create(
+        response = await metrics.openai_completion(
+            client,
+            "api_mentor",
             model="gpt-4o-mini", 
             messages=[{"role": "system", "content": SYSTEM_PROMPT_AI_MSG}] + safe_messages, 
             temperature=0.7,
@@ -445,27 +588,17 @@ async def complete_lab_practice(
     # 3. Обрізаємо аномально довгі сесії (макс 10 балів за раз)
     session_score = min(calculated_score, LAB_MAX_POINTS_PER_SESSION)
 
-    # --- 🛑 ЗАХИСТ ВІД СПАМУ (Денний ліміт) ---
-    today_score = await db.get_today_lab_points(user_id)
-    
-    if today_score >= LAB_DAILY_POINTS_LIMIT:
-        # Ліміт вичерпано.
-        # Можна повернути помилку, або записати практику з 0 балів (щоб зберегти статистику в історії, але не дати балів)
-        session_score = 0
-        # return {"success": False, "message": "Денний ліміт балів вичерпано!"} <--- Або так, якщо хочеш помилку
-
-    # Коригування "хвоста": Якщо ліміт 50, вже є 48, а заробив 5 -> даємо тільки 2.
-    elif today_score + session_score > LAB_DAILY_POINTS_LIMIT:
-        session_score = LAB_DAILY_POINTS_LIMIT - today_score
-
-    # 4. Зберігаємо (тільки якщо є що зберігати або треба записати факт історії)
-    if session_score > 0:
-        new_total_score = await db.save_lab_practice(user_id, req.practice_type, session_score)
-    else:
-        # Якщо балів 0, просто отримуємо поточний рахунок, щоб не поламати фронт
-        # (можна викликати легкий SELECT або взяти з кешу, тут приклад через SELECT)
-        data = await db.pool.fetchrow("SELECT score FROM users WHERE user_id = $1", user_id)
-        new_total_score = data['score']
+    # 4. Денний ліміт уже вичерпано — без локу в БД, лише поточний рахунок
+    if db.limits.exhausted(user_id, "lab_points"):
+        total_score, _, _ = await db.get_stats(user_id)
+        return {"success": True, "added_score": 0, "total_score": total_score}
+
+    # 5. Денний ліміт (захист від спаму), бали та історія — одним атомарним викликом у БД.
+    # Хвіст обрізається до ліміту, після ліміту сесія дає 0 балів.
+    result = await db.complete_lab_practice(user_id, req.practice_type, session_score, LAB_DAILY_POINTS_LIMIT)
+    if not result:
+        raise HTTPException(status_code=404, detail="User not found")
+    session_score, new_total_score = result
 
     return {
         "success": True, 
@@ -486,14 +619,22 @@ async def delete_account(
         # Якщо ID в токені не співпадає з ID, який хочуть видалити
         raise HTTPException(status_code=403, detail="Ви не можете видалити чужий акаунт")
 
-    # Якщо перевірка пройшла успішно - видаляємо
-    success = await db.delete_user_data(target_user_id)
+    # Якщо перевірка пройшла успішно - ставимо видалення в чергу (дані видаляються у фоні)
+    job_id = await db.erasure.start(target_user_id)
     
-    if success:
-        return {"status": "deleted"}
+    if job_id:
+        return ORJSONResponse(status_code=202, content={"status": "accepted", "job_id": job_id})
         
     raise HTTPException(status_code=404, detail="User not found")
 
+# Статус без токена: після видалення токена вже немає, а job_id — випадковий UUID
+@api_router.get("/user/erasure/{job_id}")
+async def get_erasure_status(job_id: str):
+    job = await db.erasure.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 app.include_router(api_router)
 
 if __name__ == "__main__":
@@ -0,0 +1,53 @@
+import argparse
+import asyncio
+from datetime import date
+
+from dotenv import load_dotenv
+
+from db import Database
+
+# Перераховує daily_user_stats з game_history (одноразово після міграції
+# або для ремонту зведенки). Повторний запуск безпечний: рядки перезаписуються.
+load_dotenv()
+
+
+async def backfill(since):
+    db = Database()
+    try:
+        await db.connect()
+        await db.create_tables()
+
+        async with db.pool.acquire() as conn:
+            async with conn.transaction():
+                # Блокуємо upsert-и флашера на час перерахунку, щоб не затерти свіжі ходи
+                await conn.execute("LOCK TABLE daily_user_stats IN SHARE ROW EXCLUSIVE MODE")
+                result = await conn.execute(
+                    """
+                    INSERT INTO daily_user_stats (user_id, day, moves, points, mistakes, wisdoms)
+                    SELECT user_id, played_at, COUNT(*), COALESCE(SUM(points_earned), 0),
+                           COUNT(*) FILTER (WHERE points_earned < 0),
+                           COUNT(*) FILTER (WHERE points_earned > 0)
+                    FROM game_history
+                    WHERE played_at >= $1 AND user_id IS NOT NULL
+                    GROUP BY user_id, played_at
+                    ON CONFLICT (user_id, day) DO UPDATE SET
+                        moves = EXCLUDED.moves,
+                        points = EXCLUDED.points,
+                        mistakes = EXCLUDED.mistakes,
+                        wisdoms = EXCLUDED.wisdoms
+                    """,
+                    since,
+                )
+
+        print(f"✅ Зведенку перераховано: {result.split()[-1]} днів-юзерів.")
+    except Exception as e:
+        print(f"❌ Помилка: {e}")
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill daily_user_stats з game_history")
+    parser.add_argument("--since", type=date.fromisoformat, default=date(1970, 1, 1), help="YYYY-MM-DD")
+    args = parser.parse_args()
+    asyncio.run(backfill(args.since))
@@ -0,0 +1,126 @@
+"""
+Бенчмарк "останні N записів" для mentor_history та journal на великих таблицях.
+Засіває окрему схему bench_history (партиції за 12 місяців, індекси з міграції),
+міряє запити з db.py і падає, якщо медіана виконання на сервері >= 1 мс.
+
+Запуск з кореня репозиторію (потрібен DATABASE_URL):
+    python -m benchmarks.bench_history --rows 2000000 --users 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+from datetime import date
+
+import asyncpg
+from dotenv import load_dotenv
+
+import partitions
+from db import _HISTORY_INDEXES
+
+SCHEMA = "bench_history"
+
+QUERIES = {
+    # Ті самі форми, що get_mentor_history та get_journal_entries
+    "mentor_history": (
+        "SELECT role, content, created_at FROM mentor_history WHERE user_id = $1 ORDER BY created_at DESC LIMIT $2",
+        50,
+    ),
+    "journal": (
+        "SELECT id, entry_text, created_at FROM journal WHERE user_id = $1 ORDER BY created_at DESC LIMIT $2",
+        10,
+    ),
+}
+
+
+async def seed(conn, rows, users):
+    await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await conn.execute(f"CREATE SCHEMA {SCHEMA}")
+    await conn.execute("CREATE TABLE users (user_id BIGINT PRIMARY KEY)")
+    await conn.execute("INSERT INTO users SELECT generate_series(1, $1)", users)
+
+    today = date.today()
+    for table in QUERIES:
+        await partitions.ensure_table(conn, table)
+        for i in range(1, 12):
+            await partitions.create_partition(conn, partitions.TABLES[table], partitions.add_months(today, -i))
+    for index_sql in _HISTORY_INDEXES:
+        await conn.execute(index_sql)
+
+    # Записи рівномірно за останній рік, юзери — з довгим хвостом (як у житті)
+    await conn.execute(
+        """
+        INSERT INTO mentor_history (user_id, role, content, created_at)
+        SELECT 1 + floor(power(random(), 3) * $2)::bigint,
+               CASE WHEN g % 2 = 0 THEN 'user' ELSE 'assistant' END,
+               repeat('Як перестати злитися на колег? ', 6),
+               now() - random() * interval '330 days'
+        FROM generate_series(1, $1) g
+        """,
+        rows,
+        users,
+    )
+    await conn.execute(
+        """
+        INSERT INTO journal (user_id, entry_text, created_at)
+        SELECT 1 + floor(power(random(), 3) * $2)::bigint,
+               'Сьогодні я вдячний за спокій. ' || g,
+               now() - random() * interval '330 days'
+        FROM generate_series(1, $1) g
+        """,
+        rows // 4,
+        users,
+    )
+    await conn.execute("VACUUM ANALYZE mentor_history")
+    await conn.execute("VACUUM ANALYZE journal")
+
+
+async def measure(conn, sql, limit, users, samples):
+    client, server = [], []
+    for _ in range(samples):
+        # Активні юзери (на них припадає більшість записів) — найгірший випадок
+        user_id = 1 + int(random.random() ** 3 * users)
+        started = time.perf_counter()
+        await conn.fetch(sql, user_id, limit)
+        client.append((time.perf_counter() - started) * 1000)
+        raw = await conn.fetchval(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", user_id, limit)
+        server.append(json.loads(raw)[0]["Execution Time"])
+    return client, server
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк історії Ментора та щоденника")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--keep", action="store_true", help="не видаляти схему після прогону")
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(os.getenv("DATABASE_URL"), server_settings={"search_path": SCHEMA})
+    try:
+        started = time.perf_counter()
+        await seed(conn, args.rows, args.users)
+        print(f"Засіяно {args.rows} + {args.rows // 4} рядків за {time.perf_counter() - started:.1f} с")
+
+        failed = False
+        print(f"{'query':<18}{'p50, ms':>10}{'p99, ms':>10}{'server p50':>12}")
+        for table, (sql, limit) in QUERIES.items():
+            client, server = await measure(conn, sql, limit, args.users, args.samples)
+            p99 = statistics.quantiles(client, n=100)[98]
+            server_p50 = statistics.median(server)
+            print(f"{table:<18}{statistics.median(client):>10.3f}{p99:>10.3f}{server_p50:>12.3f}")
+            failed |= server_p50 >= 1.0
+        if failed:
+            raise SystemExit("❌ Медіана виконання >= 1 мс")
+    finally:
+        if not args.keep:
+            await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    asyncio.run(main())
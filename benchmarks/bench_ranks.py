@@ -0,0 +1,58 @@
+"""
+Мікробенчмарк визначення рангів: старі ланцюжки if/elif проти таблиць з bisect
+(поштучно та списком, як у лідерборді). Старий варіант не рахує прогрес до наступного звання.
+
+Запуск з кореня репозиторію: python -m benchmarks.bench_ranks
+"""
+import random
+import timeit
+
+from utils import ACADEMY_RANKS, STOIC_RANKS
+
+ROUNDS = 200
+THRESHOLDS = [50, 150, 500, 1000, 2500, 5000]
+
+
+def legacy_stoic(score):
+    # Як було в utils.get_stoic_rank + пошук наступного порогу в show_profile
+    if score < 50:
+        name = "🌱 Неофіт"
+    elif score < 150:
+        name = "🎒 Учень"
+    elif score < 500:
+        name = "🏃 Практик"
+    elif score < 1000:
+        name = "🧠 Філософ"
+    elif score < 2500:
+        name = "🛡️ Майстер Стійкості"
+    elif score < 5000:
+        name = "🏛️ Мудрець"
+    else:
+        name = "👑 Стоїчний Ідеал"
+    return name, next((t for t in THRESHOLDS if score < t), 0)
+
+
+def main():
+    rng = random.Random(42)
+    scores = [int(rng.paretovariate(1.2) * 40) for _ in range(1000)]
+    counts = [rng.randint(0, 400) for _ in range(1000)]
+
+    for score in scores:
+        rank = STOIC_RANKS.resolve(score)
+        assert (rank.name, rank.next_threshold) == legacy_stoic(score)
+    assert STOIC_RANKS.resolve_many(scores) == [STOIC_RANKS.resolve(s) for s in scores]
+
+    cases = {
+        "stoic: if/elif": lambda: [legacy_stoic(s) for s in scores],
+        "stoic: resolve": lambda: [STOIC_RANKS.resolve(s) for s in scores],
+        "stoic: resolve_many": lambda: STOIC_RANKS.resolve_many(scores),
+        "academy: resolve_many": lambda: ACADEMY_RANKS.resolve_many(counts, "en"),
+    }
+    print(f"{'1000 users':<24}{'µs':>10}")
+    for label, fn in cases.items():
+        elapsed = timeit.timeit(fn, number=ROUNDS) / ROUNDS * 1e6
+        print(f"{label:<24}{elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Мікробенчмарк серіалізації відповідей API: як було (dict(row) -> jsonable_encoder -> json)
+проти ORJSONResponse та готового JSON з Postgres (json_agg).
+
+Запуск з кореня репозиторію: python -m benchmarks.bench_serialization
+"""
+import json
+import timeit
+from datetime import datetime, timedelta
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from http_cache import ORJSONResponse
+
+from utils import get_stoic_rank
+
+ROUNDS = 200
+
+
+def make_payloads():
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    articles = [
+        {"id": i, "day": i % 28 + 1, "month": i % 12 + 1, "title": f"Стаття №{i}: Дихотомія контролю"}
+        for i in range(1, 367)
+    ]
+    mentor = [
+        {"role": "user" if i % 2 else "assistant", "content": "Як перестати злитися на колег? " * 8,
+         "created_at": now - timedelta(minutes=i)}
+        for i in range(50)
+    ]
+    leaderboard = [
+        {"user_id": 10_000 + i, "username": f"Стоїк {i}", "score": 5000 - i * 97,
+         "rank_name": get_stoic_rank(5000 - i * 97)}
+        for i in range(20)
+    ]
+    return {"/api/academy/articles": articles, "/api/mentor/history": mentor, "/api/leaderboard": leaderboard}
+
+
+def old_path(payload):
+    # Те, що FastAPI робив з list[dict]: jsonable_encoder + stdlib json
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def orjson_path(payload):
+    return ORJSONResponse(payload).body
+
+
+def main():
+    print(f"{'endpoint':<24}{'old, µs':>12}{'orjson, µs':>14}{'pg json, µs':>14}{'speedup':>10}")
+    for endpoint, payload in make_payloads().items():
+        # Для json_agg Python лише кодує готовий рядок у bytes
+        pg_text = orjson.dumps(payload).decode("utf-8")
+        assert json.loads(old_path(payload)) == json.loads(orjson_path(payload))
+
+        old = timeit.timeit(lambda: old_path(payload), number=ROUNDS) / ROUNDS * 1e6
+        new = timeit.timeit(lambda: orjson_path(payload), number=ROUNDS) / ROUNDS * 1e6
+        raw = timeit.timeit(lambda: pg_text.encode("utf-8"), number=ROUNDS) / ROUNDS * 1e6
+        print(f"{endpoint:<24}{old:>12.1f}{new:>14.1f}{raw:>14.1f}{old / new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
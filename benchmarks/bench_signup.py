@@ -0,0 +1,91 @@
+"""
+Бенчмарк реєстрацій: як було (UPSERT + UPDATE токена + SELECT токена, 3 запити)
+проти Database.add_user (1 запит) та add_users_bulk. Показує реєстрації за секунду,
+нові юзери та повторні (/start від існуючого).
+Тимчасові юзери мають id від BASE_USER_ID і видаляються після прогону.
+
+Запуск з кореня репозиторію (потрібен DATABASE_URL):
+    python -m benchmarks.bench_signup --users 2000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import date
+
+from dotenv import load_dotenv
+
+from db import Database
+
+BASE_USER_ID = 8_000_000_000
+
+
+async def legacy_add_user(db, user_id, username, birthdate=None):
+    new_token = str(uuid.uuid4())
+    async with db.pool.acquire() as conn:
+        await conn.execute(
+            """
+            INSERT INTO users (user_id, username, birthdate, auth_token)
+            VALUES ($1, $2, $3, $4)
+            ON CONFLICT (user_id) DO UPDATE
+            SET username = COALESCE(users.username, EXCLUDED.username),
+                birthdate = COALESCE(users.birthdate, EXCLUDED.birthdate)
+            """,
+            user_id, username, birthdate, new_token,
+        )
+        await conn.execute(
+            "UPDATE users SET auth_token = $1 WHERE user_id = $2 AND auth_token IS NULL",
+            new_token, user_id,
+        )
+    async with db.pool.acquire() as conn:
+        return await conn.fetchval("SELECT auth_token FROM users WHERE user_id = $1", user_id)
+
+
+async def cleanup(db):
+    async with db.pool.acquire() as conn:
+        await conn.execute("DELETE FROM users WHERE user_id >= $1", BASE_USER_ID)
+
+
+async def rate(db, count, signup):
+    started = time.perf_counter()
+    for i in range(count):
+        assert await signup(db, BASE_USER_ID + i, "bench", date(1990, 1, 1))
+    return count / (time.perf_counter() - started)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк реєстрацій")
+    parser.add_argument("--users", type=int, default=2000)
+    args = parser.parse_args()
+
+    db = Database()
+    await db.connect()
+    await db.create_tables()
+    try:
+        print(f"{'variant':<22}{'new, /s':>10}{'repeat, /s':>12}")
+        for label, signup in (
+            ("3 запити (як було)", legacy_add_user),
+            ("add_user", lambda db, *a: db.add_user(*a)),
+        ):
+            await cleanup(db)
+            new = await rate(db, args.users, signup)
+            repeat = await rate(db, args.users, signup)
+            print(f"{label:<22}{new:>10.0f}{repeat:>12.0f}")
+
+        await cleanup(db)
+        users = [(BASE_USER_ID + i, "bench", date(1990, 1, 1)) for i in range(args.users)]
+        started = time.perf_counter()
+        tokens = await db.add_users_bulk(users)
+        new = args.users / (time.perf_counter() - started)
+        started = time.perf_counter()
+        assert await db.add_users_bulk(users) == tokens
+        repeat = args.users / (time.perf_counter() - started)
+        print(f"{'add_users_bulk':<22}{new:>10.0f}{repeat:>12.0f}")
+    finally:
+        await cleanup(db)
+        await db.close()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    asyncio.run(main())
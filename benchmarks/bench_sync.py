@@ -0,0 +1,88 @@
+"""
+Бенчмарк погашення коду синхронізації: як було (4 запити: DELETE ... RETURNING,
+профіль, токен, прогрес Академії) проти одного запиту sync_service.redeem_code.
+Створює тимчасових юзерів з id від BASE_USER_ID і прибирає їх після прогону.
+
+Запуск з кореня репозиторію (потрібен DATABASE_URL):
+    python -m benchmarks.bench_sync --samples 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+import sync_service
+from db import Database
+
+BASE_USER_ID = 9_000_000_000
+
+
+async def legacy_redeem(db, code):
+    async with db.pool.acquire() as conn:
+        row = await conn.fetchrow(
+            """
+            DELETE FROM sync_codes
+            WHERE code = $1 AND expires_at > (now() AT TIME ZONE 'utc')
+            RETURNING user_id
+            """,
+            code,
+        )
+        if not row:
+            return None
+        user_id = row["user_id"]
+        profile = await conn.fetchrow(
+            "SELECT user_id, username, score, level, birthdate, energy FROM users WHERE user_id = $1",
+            user_id,
+        )
+        token = await conn.fetchval("SELECT auth_token FROM users WHERE user_id = $1", user_id)
+        count = await conn.fetchval("SELECT COUNT(*) FROM user_academy_progress WHERE user_id = $1", user_id)
+        return token, dict(profile), count
+
+
+async def timed(samples, db, redeem):
+    latencies = []
+    for i in range(samples):
+        code = await sync_service.issue_code(db, BASE_USER_ID + i)
+        started = time.perf_counter()
+        assert await redeem(db, code)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк погашення коду синхронізації")
+    parser.add_argument("--samples", type=int, default=500)
+    args = parser.parse_args()
+
+    db = Database()
+    await db.connect()
+    await db.create_tables()
+    await db.create_progress_table()
+    try:
+        async with db.pool.acquire() as conn:
+            await conn.execute(
+                """
+                INSERT INTO users (user_id, username, auth_token)
+                SELECT $1::bigint + g, 'bench', md5(g::text) FROM generate_series(0, $2 - 1) g
+                ON CONFLICT (user_id) DO NOTHING
+                """,
+                BASE_USER_ID,
+                args.samples,
+            )
+
+        print(f"{'redeem':<12}{'p50, ms':>10}{'p95, ms':>10}{'p99, ms':>10}")
+        for label, redeem in (("4 запити", legacy_redeem), ("1 запит", sync_service.redeem_code)):
+            latencies = await timed(args.samples, db, redeem)
+            q = statistics.quantiles(latencies, n=100)
+            print(f"{label:<12}{statistics.median(latencies):>10.3f}{q[94]:>10.3f}{q[98]:>10.3f}")
+    finally:
+        async with db.pool.acquire() as conn:
+            await conn.execute("DELETE FROM users WHERE user_id >= $1", BASE_USER_ID)
+        await db.close()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    asyncio.run(main())
@@ -0,0 +1,176 @@
+"""
+Заглушки зовнішніх сервісів для навантажувального тесту (benchmarks/loadtest.py):
+Telegram Bot API (TELEGRAM_API_URL у main.py) та OpenAI (OPENAI_BASE_URL читає сам клієнт openai).
+
+Telegram-заглушка приймає getMe/getUpdates/sendMessage/editMessageText/answerCallbackQuery/
+sendChatAction і запам'ятовує останнє повідомлення кожного чату з кнопками — синтетичний юзер
+"натискає" те, що бот йому показав. OpenAI-заглушка відповідає на /v1/chat/completions
+із заданою затримкою.
+
+Окремо (щоб погоняти справжній main.py руками):
+    python -m benchmarks.fakes --telegram-port 8081 --openai-port 8082 --openai-latency-ms 800
+    TELEGRAM_API_URL=http://127.0.0.1:8081 OPENAI_BASE_URL=http://127.0.0.1:8082/v1 python main.py
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter, defaultdict
+
+from aiohttp import web
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Stoic Trainer", "username": "StoicTrainer_ua_bot"}
+
+
+class ChatLog:
+    def __init__(self):
+        self.next_message_id = 1
+        self.message_id = None
+        self.text = ""
+        self.buttons = []
+        # Усі тексти sendMessage (коди /sync, відповіді Ментора)
+        self.sent = []
+
+
+def _buttons(reply_markup):
+    if not reply_markup:
+        return []
+    markup = json.loads(reply_markup)
+    return [
+        button["callback_data"]
+        for row in markup.get("inline_keyboard", ())
+        for button in row
+        if button.get("callback_data")
+    ]
+
+
+class FakeTelegram:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.chats = defaultdict(ChatLog)
+        self.calls = Counter()
+        self.updates = asyncio.Queue()
+        self._update_id = 0
+        self.app = web.Application()
+        self.app.router.add_post("/bot{token}/{method}", self.handle)
+
+    def push_update(self, update):
+        """Апдейт для getUpdates (коли бот працює через справжній polling)"""
+        self._update_id += 1
+        self.updates.put_nowait({"update_id": self._update_id, **update})
+
+    def message(self, chat_id, message_id, text):
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            "text": text,
+        }
+
+    async def handle(self, request):
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        params = await request.post()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == "getMe":
+            result = BOT_USER
+        elif method == "getUpdates":
+            result = await self._get_updates(int(params.get("timeout", 0)))
+        elif method == "sendMessage":
+            chat_id = int(params["chat_id"])
+            chat = self.chats[chat_id]
+            chat.message_id = chat.next_message_id
+            chat.next_message_id += 1
+            chat.text = params.get("text", "")
+            chat.buttons = _buttons(params.get("reply_markup"))
+            chat.sent.append(chat.text)
+            result = self.message(chat_id, chat.message_id, chat.text)
+        elif method == "editMessageText":
+            chat_id = int(params["chat_id"])
+            chat = self.chats[chat_id]
+            chat.message_id = int(params["message_id"])
+            chat.text = params.get("text", "")
+            chat.buttons = _buttons(params.get("reply_markup"))
+            result = self.message(chat_id, chat.message_id, chat.text)
+        else:
+            # answerCallbackQuery, sendChatAction, deleteWebhook ...
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    async def _get_updates(self, timeout):
+        updates = []
+        try:
+            updates.append(await asyncio.wait_for(self.updates.get(), timeout=min(timeout, 10) or 0.1))
+        except asyncio.TimeoutError:
+            return updates
+        while not self.updates.empty():
+            updates.append(self.updates.get_nowait())
+        return updates
+
+
+class FakeOpenAI:
+    def __init__(self, latency=0.8, jitter=0.2, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.app = web.Application()
+        self.app.router.add_post("/v1/chat/completions", self.handle)
+
+    async def handle(self, request):
+        body = await request.json()
+        self.calls += 1
+        await asyncio.sleep(max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)))
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", ())) // 4
+        content = "Не події турбують людей, а їхні думки про події. Зосередься на тому, що в твоїй владі."
+        return web.json_response({
+            "id": f"chatcmpl-fake{self.calls}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4,
+            },
+        })
+
+
+async def serve(app, port=0):
+    """Запускає aiohttp-застосунок на 127.0.0.1; повертає (runner, базовий URL)"""
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    host, bound_port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{bound_port}"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Заглушки Telegram Bot API та OpenAI")
+    parser.add_argument("--telegram-port", type=int, default=8081)
+    parser.add_argument("--openai-port", type=int, default=8082)
+    parser.add_argument("--telegram-latency-ms", type=float, default=0)
+    parser.add_argument("--openai-latency-ms", type=float, default=800)
+    args = parser.parse_args()
+
+    telegram = FakeTelegram(args.telegram_latency_ms / 1000)
+    openai = FakeOpenAI(args.openai_latency_ms / 1000)
+    _, telegram_url = await serve(telegram.app, args.telegram_port)
+    _, openai_url = await serve(openai.app, args.openai_port)
+    print(f"TELEGRAM_API_URL={telegram_url}")
+    print(f"OPENAI_BASE_URL={openai_url}/v1")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
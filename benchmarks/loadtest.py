@@ -0,0 +1,637 @@
+"""
+Навантажувальний тест бота та API: синтетичні юзери проходять сценарії gym, academy,
+library, mentor, lab і sync. Telegram Bot API та OpenAI замінені заглушками (benchmarks/fakes.py),
+Postgres — свій одноразовий кластер (initdb з PATH або PG_BIN) чи --database-url.
+
+API працює окремим процесом (uvicorn api_main:app), бот — у процесі тесту: апдейти
+подаються в dp.feed_update з main.py, а всі виклики Bot API йдуть по HTTP у заглушку.
+Для кожного сценарію: пропускна здатність (кроків/с), p50/p95/p99 кроку, запити до БД
+на один прохід сценарію (stoic_db_queries_total з metrics.py, обидва процеси).
+
+Запуск з кореня репозиторію:
+    python -m benchmarks.loadtest --users 50
+    python -m benchmarks.loadtest --users 50 --scale 0.5    # поверх фонових даних (seed_data.py)
+    python -m benchmarks.loadtest --database-url postgresql://postgres@localhost/stoic_load
+    python -m benchmarks.loadtest --update-baseline     # записати benchmarks/loadtest_baseline.json
+
+Порівняння з базовою лінією: більше запитів на сценарій — завжди регресія; медіана кроку
+і пропускна здатність — з допуском --tolerance і лише за тих самих параметрів прогону
+(хвости p95/p99 у звіті, але на спільній машині надто шумні, щоб на них падати).
+Код виходу 1 — регресія або помилки в сценаріях.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+from dotenv import load_dotenv
+
+from benchmarks import seed_data
+from benchmarks.fakes import FakeOpenAI, FakeTelegram, serve
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "loadtest_baseline.json")
+# Параметри, від яких залежать латентність і пропускна здатність
+COMPARABLE_PARAMS = ("users", "scale", "openai_latency_ms", "telegram_latency_ms")
+# Допуск для запитів на сценарій: фонові записи (буфер ходів, чекпоінт лімітів) трохи плавають
+QUERY_TOLERANCE = 0.1
+
+_QUERIES_LINE = re.compile(r"^stoic_db_queries_total\{[^}]*\} ([0-9.e+]+)$", re.MULTILINE)
+_SYNC_CODE = re.compile(r"`(\d{6})`")
+
+
+# --- Postgres ---
+
+@contextlib.contextmanager
+def local_postgres(pg_bin):
+    """Одноразовий кластер у тимчасовій теці, лише unix-сокет"""
+    workdir = tempfile.mkdtemp(prefix="stoic-loadtest-pg-")
+    data = os.path.join(workdir, "data")
+    pg_ctl = os.path.join(pg_bin, "pg_ctl")
+    subprocess.run(
+        [os.path.join(pg_bin, "initdb"), "-D", data, "-U", "postgres", "-A", "trust", "-E", "UTF8", "--locale=C"],
+        check=True, stdout=subprocess.DEVNULL,
+    )
+    subprocess.run(
+        [pg_ctl, "-D", data, "-l", os.path.join(workdir, "postgres.log"), "-w",
+         "-o", f"-c listen_addresses='' -k {workdir}", "start"],
+        check=True, stdout=subprocess.DEVNULL,
+    )
+    try:
+        yield f"postgresql://postgres@/postgres?host={workdir}"
+    finally:
+        subprocess.run([pg_ctl, "-D", data, "-m", "fast", "-w", "stop"], stdout=subprocess.DEVNULL)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def find_pg_bin(explicit):
+    if explicit:
+        return explicit
+    if os.getenv("PG_BIN"):
+        return os.getenv("PG_BIN")
+    initdb = shutil.which("initdb")
+    return os.path.dirname(initdb) if initdb else None
+
+
+# --- Статистика ---
+
+class FlowStats:
+    def __init__(self, name):
+        self.name = name
+        self.runs = 0
+        self.latencies = []
+        self.errors = defaultdict(int)
+        self.queries = 0
+        self.seconds = 0.0
+
+    def step(self, seconds):
+        self.latencies.append(seconds)
+
+    def error(self, kind):
+        self.errors[kind] += 1
+
+    def as_dict(self):
+        steps = len(self.latencies)
+        return {
+            "runs": self.runs,
+            "steps": steps,
+            "throughput": round(steps / self.seconds, 2) if self.seconds else 0.0,
+            "p50_ms": percentile(self.latencies, 50),
+            "p95_ms": percentile(self.latencies, 95),
+            "p99_ms": percentile(self.latencies, 99),
+            "queries_per_flow": round(self.queries / self.runs, 2) if self.runs else 0.0,
+            "queries_per_step": round(self.queries / steps, 2) if steps else 0.0,
+            "errors": dict(self.errors),
+        }
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(q / 100 * (len(ordered) - 1)))
+    return round(ordered[index] * 1000, 2)
+
+
+def count_queries(metrics_text):
+    return sum(float(value) for value in _QUERIES_LINE.findall(metrics_text))
+
+
+# --- Синтетичний юзер бота ---
+
+class BotUser:
+    """Юзер Telegram: пише команди і тисне кнопки з останнього повідомлення бота"""
+
+    def __init__(self, harness, user_id):
+        self.harness = harness
+        self.user_id = user_id
+        self.chat = harness.telegram.chats[user_id]
+        self.profile = {"id": user_id, "is_bot": False, "first_name": f"Load{user_id % 10000}"}
+        self.message_id = 0
+        self.tapped = {}
+        self.sync_code = None
+
+    def buttons(self, prefix):
+        return [data for data in self.chat.buttons if data.startswith(prefix)]
+
+    async def send(self, stats, text):
+        self.message_id += 1
+        message = {
+            "message_id": self.message_id,
+            "date": int(time.time()),
+            "chat": {"id": self.user_id, "type": "private"},
+            "from": self.profile,
+            "text": text,
+        }
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        await self.harness.feed(stats, {"message": message})
+
+    async def tap(self, stats, data):
+        # Повторний тап тієї ж кнопки швидше за DUPLICATE_WINDOW бот відкине — живий юзер так не тисне
+        key = (self.chat.message_id, data)
+        if key in self.tapped:
+            # +50 мс: бот бере свій час отримання апдейту, трохи пізніший за наш
+            wait = self.harness.duplicate_window + 0.05 - (time.monotonic() - self.tapped[key])
+            if wait > 0:
+                await asyncio.sleep(wait)
+        self.tapped[key] = time.monotonic()
+        await self.harness.feed(stats, {
+            "callback_query": {
+                "id": f"{self.user_id}-{self.message_id}-{data}",
+                "from": self.profile,
+                "chat_instance": str(self.user_id),
+                "data": data,
+                "message": self.harness.telegram.message(self.user_id, self.chat.message_id, self.chat.text),
+            }
+        })
+
+
+async def bot_start(user, stats, rng):
+    await user.send(stats, "/start")
+
+
+async def bot_gym(user, stats, rng):
+    await user.tap(stats, "mode_gym")
+    await user.tap(stats, "game_start")
+    for _ in range(20):
+        choices = user.buttons("anygame_")
+        if not choices:
+            break
+        await user.tap(stats, rng.choice(choices))
+        if "game_next" not in user.chat.buttons:
+            break
+        await user.tap(stats, "game_next")
+
+
+async def bot_academy(user, stats, rng):
+    await user.tap(stats, "mode_academy")
+    for _ in range(3):
+        for data in user.buttons("academy_read_"):
+            await user.tap(stats, data)
+        forward = user.buttons("academy_nav_next_")
+        if not forward:
+            break
+        await user.tap(stats, forward[0])
+
+
+async def bot_library(user, stats, rng):
+    await user.tap(stats, "library_page_0")
+    articles = user.buttons("library_open_")
+    if articles:
+        await user.tap(stats, rng.choice(articles))
+
+
+async def bot_mentor(user, stats, rng):
+    await user.tap(stats, "mode_ai")
+    await user.send(stats, "Як не злитися, коли колега вкотре зриває дедлайн?")
+    await user.tap(stats, "back_home")
+
+
+async def bot_sync(user, stats, rng):
+    await user.send(stats, "/sync")
+    match = _SYNC_CODE.search(user.chat.sent[-1]) if user.chat.sent else None
+    if match:
+        user.sync_code = match.group(1)
+    else:
+        stats.error("no_sync_code")
+
+
+# --- Синтетичний юзер API ---
+
+class ApiUser:
+    def __init__(self, harness, user_id):
+        self.harness = harness
+        self.user_id = user_id
+        self.token = None
+
+    async def call(self, stats, method, path, expected=(200,), **kwargs):
+        headers = dict(self.harness.api_headers)
+        if self.token:
+            headers["Authorization"] = self.token
+        started = time.perf_counter()
+        try:
+            response = await self.harness.http.request(method, path, headers=headers, **kwargs)
+        except httpx.HTTPError as e:
+            stats.error(type(e).__name__)
+            return None
+        finally:
+            stats.step(time.perf_counter() - started)
+        if response.status_code not in expected:
+            stats.error(f"{method} {path.split('?')[0]} {response.status_code}")
+            return None
+        return response.json()
+
+
+async def api_start(user, stats, rng):
+    body = await user.call(stats, "POST", "/api/auth/create_guest", json={
+        "user_id": user.user_id, "username": f"Load{user.user_id % 10000}", "birthdate": "1990-05-17",
+    })
+    if body:
+        user.token = body["token"]
+        await user.call(stats, "GET", "/api/home?include_scenario=true")
+
+
+async def api_gym(user, stats, rng):
+    for _ in range(20):
+        body = await user.call(stats, "GET", "/api/gym/scenario")
+        if not body or body.get("error"):
+            break
+        option = rng.choice(body["scenario"]["options"])
+        await user.call(stats, "POST", "/api/gym/answer", json={"level": body["level"], "score": option["score"]})
+
+
+async def api_academy(user, stats, rng):
+    today = await user.call(stats, "GET", "/api/academy/today")
+    if today:
+        await user.call(stats, "POST", "/api/academy/complete", json={"article_id": today["id"]})
+    page = await user.call(stats, "GET", "/api/academy/articles?cursor=&limit=20")
+    if page:
+        for article_id, *_ in rng.sample(page["items"], min(2, len(page["items"]))):
+            await user.call(stats, "POST", "/api/academy/complete", json={"article_id": article_id})
+    await user.call(stats, "GET", "/api/academy/status")
+
+
+async def api_library(user, stats, rng):
+    library = await user.call(stats, "GET", "/api/academy/library")
+    if library:
+        article_id = rng.choice(library)["id"]
+        await user.call(stats, "GET", f"/api/academy/articles/{article_id}")
+        await user.call(stats, "GET", f"/api/academy/check/{article_id}")
+
+
+async def api_mentor(user, stats, rng):
+    await user.call(stats, "POST", "/api/mentor/chat", json={
+        "messages": [{"role": "user", "content": "Як прийняти те, що не в моїй владі?"}],
+    })
+    await user.call(stats, "GET", "/api/mentor/history")
+
+
+async def api_lab(user, stats, rng):
+    for practice in ("breathing", "meditation", "sleep"):
+        await user.call(stats, "POST", "/api/lab/complete", json={"practice_type": practice, "duration_seconds": 300})
+
+
+async def api_sync(user, stats, rng):
+    """Код, виданий ботом (bot.sync), гаситься в API — перехід юзера з Telegram у додаток"""
+    if not user.sync_code:
+        return
+    body = await user.harness.api_user_call(stats, "POST", "/api/auth/sync", json={"code": user.sync_code})
+    if body:
+        user.token = body["token"]
+
+
+# (процес, сценарій, функція). Порядок важливий: library читає те, що пройдено в academy.
+FLOWS = [
+    ("bot", "start", bot_start),
+    ("api", "start", api_start),
+    ("bot", "gym", bot_gym),
+    ("api", "gym", api_gym),
+    ("bot", "academy", bot_academy),
+    ("api", "academy", api_academy),
+    ("bot", "library", bot_library),
+    ("api", "library", api_library),
+    ("bot", "mentor", bot_mentor),
+    ("api", "mentor", api_mentor),
+    ("api", "lab", api_lab),
+    ("bot", "sync", bot_sync),
+    ("api", "sync", api_sync),
+]
+
+
+# --- Прогін ---
+
+class Harness:
+    def __init__(self, args, database_url, workdir):
+        self.args = args
+        self.database_url = database_url
+        self.workdir = workdir
+        self.telegram = FakeTelegram(args.telegram_latency_ms / 1000)
+        self.openai = FakeOpenAI(args.openai_latency_ms / 1000, args.openai_jitter_ms / 1000, seed=args.seed)
+        self.api_headers = {}
+        self._update_id = 0
+
+    async def run(self):
+        runners = []
+        api = None
+        try:
+            runner, telegram_url = await serve(self.telegram.app)
+            runners.append(runner)
+            runner, openai_url = await serve(self.openai.app)
+            runners.append(runner)
+            self.prepare_env(telegram_url, openai_url)
+
+            await self.start_bot()
+            await self.seed_articles()
+            if self.args.scale:
+                await self.seed_users()
+            api = await self.start_api()
+            return await self.run_flows()
+        finally:
+            if api:
+                await self.stop_api(api)
+            if getattr(self, "bot", None):
+                await self.main.db.close()
+                await self.bot.session.close()
+            for runner in runners:
+                await runner.cleanup()
+
+    def prepare_env(self, telegram_url, openai_url):
+        bundle_path = os.path.join(self.workdir, "content.bundle")
+        os.environ.update({
+            "DATABASE_URL": self.database_url,
+            "CONTENT_BUNDLE_PATH": bundle_path,
+            "TELEGRAM_API_URL": telegram_url,
+            "OPENAI_BASE_URL": f"{openai_url}/v1",
+            "OPENAI_API_KEY": "loadtest",
+            "BOT_TOKEN": "123456:loadtest",
+            "METRICS_PORT": "0",
+        })
+        # Після CONTENT_BUNDLE_PATH: content_bundle читає шлях під час імпорту
+        from build_bundle import collect_from_files
+        from content_bundle import write_bundle
+
+        quotes, scenarios, articles = collect_from_files(os.path.join(ROOT, "academy.csv"))
+        self.articles = seed_data.full_year(articles["ua"])
+        write_bundle(bundle_path, quotes, scenarios, articles)
+        load_dotenv()
+        if os.getenv("APP_SECRET_KEY"):
+            self.api_headers["X-App-Token"] = os.getenv("APP_SECRET_KEY")
+
+    async def start_api(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        log = open(os.path.join(self.workdir, "api.log"), "wb")
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api_main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning"],
+            cwd=ROOT, env=os.environ.copy(), stdout=log, stderr=subprocess.STDOUT,
+        )
+        self.http = httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", timeout=60,
+            limits=httpx.Limits(max_connections=self.args.users * 2),
+        )
+        for _ in range(300):
+            if process.poll() is not None:
+                break
+            try:
+                await self.http.get("/")
+                return process
+            except httpx.HTTPError:
+                await asyncio.sleep(0.1)
+        log.close()
+        with open(log.name, encoding="utf-8", errors="replace") as f:
+            print(f.read()[-3000:])
+        raise RuntimeError("API не піднявся")
+
+    async def stop_api(self, process):
+        await self.http.aclose()
+        # SIGINT — щоб lifespan дописав буфер ходів і зберіг ліміти, як при звичайній зупинці
+        process.send_signal(signal.SIGINT)
+        try:
+            await asyncio.to_thread(process.wait, 15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    async def start_bot(self):
+        import main
+        from aiogram.types import Update
+
+        from bot_middleware import DUPLICATE_WINDOW
+
+        self.main = main
+        self.update_type = Update
+        self.duplicate_window = DUPLICATE_WINDOW
+        logging.getLogger().setLevel(logging.DEBUG if self.args.verbose else logging.WARNING)
+        if not self.args.verbose:
+            # Перевищення QUERY_BUDGET видно в підсумку як queries_per_step
+            logging.getLogger("query_trace").setLevel(logging.ERROR)
+
+        await main.db.connect()
+        await main.db.create_tables()
+        await main.db.create_academy_table()
+        await main.db.create_progress_table()
+        await main.db.create_lab_tables()
+        await main.db.create_erasure_tables()
+        self.bot = main.create_bot()
+
+    async def seed_articles(self):
+        """Статті бандла і в БД з тими самими id: бібліотека та список статей API читають таблицю"""
+        async with self.main.db.pool.acquire() as conn:
+            if await conn.fetchval("SELECT EXISTS (SELECT 1 FROM academy_articles)"):
+                return
+            await seed_data.copy_articles(conn, self.articles)
+
+    async def seed_users(self):
+        """Фонові юзери з історією (seed_data.py): запити йдуть по таблицях продакшн-розміру"""
+        started = time.perf_counter()
+        async with self.main.db.pool.acquire() as conn:
+            if await conn.fetchval("SELECT EXISTS (SELECT 1 FROM users WHERE user_id = $1)", seed_data.FIRST_USER_ID):
+                print("Фонові юзери вже засіяні — використовуємо наявні")
+                return
+            totals = await seed_data.generate(conn, self.args.scale, self.args.seed, log=lambda message: None)
+        print(f"Засіяно {totals['users']} юзерів, {totals['game_history']} ходів за {time.perf_counter() - started:.0f} с")
+
+    async def feed(self, stats, update):
+        self._update_id += 1
+        update = self.update_type.model_validate({"update_id": self._update_id, **update}, context={"bot": self.bot})
+        started = time.perf_counter()
+        try:
+            await self.main.dp.feed_update(self.bot, update)
+        except Exception as e:
+            stats.error(type(e).__name__)
+        finally:
+            stats.step(time.perf_counter() - started)
+
+    async def api_user_call(self, stats, method, path, **kwargs):
+        # bot.sync -> api.sync: юзер бота ще не має токена API
+        return await ApiUser(self, None).call(stats, method, path, **kwargs)
+
+    async def queries_total(self):
+        bot_text = self.main.metrics.render()[0].decode()
+        api_text = (await self.http.get("/metrics")).text
+        return count_queries(bot_text) + count_queries(api_text)
+
+    async def run_flows(self):
+        args = self.args
+        # Унікальні id на кожен прогін: повторний запуск на тій самій базі не змішує юзерів
+        base = 7_000_000_000_000 + (int(time.time()) % 100_000) * 10_000
+        bot_users = [BotUser(self, base + i) for i in range(args.users)]
+        api_users = [ApiUser(self, base + 5_000 + i) for i in range(args.users)]
+        selected = set(args.flows.split(",")) if args.flows else None
+
+        report = {}
+        for process, flow, func in FLOWS:
+            if selected and flow not in selected and flow != "start":
+                continue
+            name = f"{process}.{flow}"
+            stats = FlowStats(name)
+            users = bot_users if (process == "bot" or flow == "sync") else api_users
+            rng = random.Random(f"{args.seed}:{name}")
+
+            queries_before = await self.queries_total()
+            started = time.perf_counter()
+            await asyncio.gather(*(func(user, stats, random.Random(rng.random())) for user in users))
+            stats.seconds = time.perf_counter() - started
+            # Логер запитів asyncpg спрацьовує через call_soon, а /metrics API — окремим запитом
+            await asyncio.sleep(0.05)
+            stats.queries = await self.queries_total() - queries_before
+            stats.runs = len(users)
+
+            report[name] = stats.as_dict()
+            print_row(name, report[name])
+        return report
+
+
+# --- Звіт і базова лінія ---
+
+HEADER = f"{'flow':<14}{'steps':>7}{'steps/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'q/flow':>8}{'q/step':>8}  errors"
+
+
+def print_row(name, row):
+    errors = ", ".join(f"{kind}×{count}" for kind, count in row["errors"].items()) or "-"
+    print(
+        f"{name:<14}{row['steps']:>7}{row['throughput']:>9}{row['p50_ms']:>9}{row['p95_ms']:>9}"
+        f"{row['p99_ms']:>9}{row['queries_per_flow']:>8}{row['queries_per_step']:>8}  {errors}"
+    )
+
+
+def compare(report, baseline, tolerance):
+    """Список регресій відносно базової лінії"""
+    failures = []
+    same_params = all(report["params"].get(k) == baseline["params"].get(k) for k in COMPARABLE_PARAMS)
+    if not same_params:
+        print("⚠️ Параметри прогону відрізняються від базової лінії: латентність і пропускна здатність не порівнюються")
+
+    for name, base in baseline["flows"].items():
+        current = report["flows"].get(name)
+        if current is None:
+            continue
+        allowed = base["queries_per_flow"] * (1 + QUERY_TOLERANCE) + 0.5
+        if current["queries_per_flow"] > allowed:
+            failures.append(f"{name}: {current['queries_per_flow']} запитів на сценарій (було {base['queries_per_flow']})")
+        if not same_params:
+            continue
+        if current["p50_ms"] > base["p50_ms"] * (1 + tolerance):
+            failures.append(f"{name}: p50 {current['p50_ms']} мс (було {base['p50_ms']})")
+        if current["throughput"] < base["throughput"] * (1 - tolerance):
+            failures.append(f"{name}: {current['throughput']} кроків/с (було {base['throughput']})")
+    return failures
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Навантажувальний тест бота та API")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--flows", help="Лише ці сценарії через кому (gym,academy,...); start виконується завжди")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scale", type=float, default=0, help="Фонові дані seed_data.py (1 = 100 тис. юзерів)")
+    parser.add_argument("--database-url", help="Одноразова база замість власного кластера")
+    parser.add_argument("--pg-bin", help="Тека з initdb/pg_ctl (за замовчуванням PG_BIN або PATH)")
+    parser.add_argument("--openai-latency-ms", type=float, default=800)
+    parser.add_argument("--openai-jitter-ms", type=float, default=200)
+    parser.add_argument("--telegram-latency-ms", type=float, default=20)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Допуск для p50 і пропускної здатності")
+    parser.add_argument("--report", help="Куди записати звіт JSON")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    if not 0 < args.users <= 5_000:
+        parser.error("--users: від 1 до 5000")
+    if args.flows and args.update_baseline:
+        parser.error("базова лінія пишеться лише з повного прогону (без --flows)")
+
+    workdir = tempfile.mkdtemp(prefix="stoic-loadtest-")
+    try:
+        with contextlib.ExitStack() as stack:
+            database_url = args.database_url
+            if not database_url:
+                pg_bin = find_pg_bin(args.pg_bin)
+                if not pg_bin:
+                    parser.error("немає initdb: вкажіть --pg-bin / PG_BIN або --database-url")
+                database_url = stack.enter_context(local_postgres(pg_bin))
+            print(HEADER)
+            flows = await Harness(args, database_url, workdir).run()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "params": {
+            "users": args.users,
+            "seed": args.seed,
+            "scale": args.scale,
+            "openai_latency_ms": args.openai_latency_ms,
+            "telegram_latency_ms": args.telegram_latency_ms,
+        },
+        "flows": flows,
+    }
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    errors = [name for name, row in flows.items() if row["errors"]]
+    if errors:
+        print(f"❌ Помилки в сценаріях: {', '.join(errors)}")
+        sys.exit(1)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"✅ Базову лінію записано в {args.baseline}")
+        return
+
+    if args.flows:
+        # Сценарії залежать один від одного (library читає пройдене в academy)
+        print("Частковий прогін — без порівняння з базовою лінією")
+        return
+    if not os.path.exists(args.baseline):
+        print("Базової лінії немає — запустіть з --update-baseline")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    failures = compare(report, baseline, args.tolerance)
+    if failures:
+        print("❌ Регресія відносно базової лінії:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("✅ Без регресій відносно базової лінії")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
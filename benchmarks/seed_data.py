@@ -0,0 +1,356 @@
+"""
+Генератор синтетичних даних продакшн-масштабу для роботи з продуктивністю.
+Схема — та сама, що створюють міграції Database.create_* (db.py); колонки для COPY
+беруться з information_schema, тож нові колонки з дефолтами генератор не ламають.
+
+--scale 1 — 100 тис. юзерів і ~12 млн ходів у game_history (~8 млн з retention 6 міс.): активність з довгим хвостом
+(більшість зайшла кілька разів, одиниці грають щодня), рахунок і рівень — сума
+згенерованих ходів, уроків і практик. Історія лягає в помісячні партиції з тими самими
+межами retention, що лишає partitions.maintain() (HISTORY_RETENTION; без нього — за весь
+час); daily_user_stats — завжди за весь час.
+Однаковий --seed (і --today) дає однакові дані.
+
+Лише для одноразової бази! Запуск з кореня репозиторію (потрібен DATABASE_URL):
+    python -m benchmarks.seed_data --scale 0.05 --seed 42
+    python -m benchmarks.seed_data --scale 1 --truncate
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+from dotenv import load_dotenv
+
+import partitions
+from academy_progress import bitmap_from_ids, bitmap_to_bytes
+from constants import ACADEMY_DAILY_LIMIT, ACADEMY_REWARD, GYM_DAILY_ENERGY, LAB_MAX_POINTS_PER_SESSION
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USERS_PER_SCALE = 100_000
+FIRST_USER_ID = 100_000_000
+# Юзерів на одну пачку COPY (тримає пам'ять сталою на будь-якому масштабі)
+CHUNK_USERS = 2_000
+# Як давно зареєструвався найстаріший юзер
+HISTORY_DAYS = 540
+
+# Частка юзерів, що користуються розділом
+ACADEMY_SHARE = 0.45
+FULL_ACADEMY_SHARE = 0.03
+MENTOR_SHARE = 0.25
+JOURNAL_SHARE = 0.15
+LAB_SHARE = 0.2
+BIRTHDATE_SHARE = 0.4
+
+TABLES = [
+    "users", "daily_user_stats", "game_history", "user_academy_progress",
+    "mentor_history", "journal", "lab_history",
+]
+
+NAMES = [
+    "Олена", "Андрій", "Марія", "Олександр", "Ірина", "Дмитро", "Наталія", "Сергій", "Юлія", "Максим",
+    "Тетяна", "Богдан", "Оксана", "Василь", "Катерина", "Ярослав", "Анна", "Тарас", "Софія", "Микола",
+]
+QUESTIONS = [
+    "Як не злитися, коли колега вкотре зриває дедлайн?",
+    "Мене звільнили. Як прийняти це спокійно?",
+    "Як перестати думати про те, що про мене скажуть інші?",
+    "Що робити, коли все валиться з рук і немає сил?",
+    "Як пережити розставання і не жити минулим?",
+    "Як не тривожитися через новини щоранку?",
+]
+ANSWER_SENTENCES = [
+    "Розрізняй те, що в твоїй владі, і те, що ні.",
+    "Не події турбують людей, а їхні думки про події.",
+    "Перешкода на шляху стає шляхом.",
+    "Ти маєш владу над своїм розумом, а не над зовнішніми подіями — усвідом це, і знайдеш силу.",
+    "Запитай себе: чи матиме це значення через рік?",
+    "Сенека казав: ми страждаємо частіше в уяві, ніж насправді.",
+    "Зроби те, що залежить від тебе, і прийми решту як погоду.",
+    "Почни з малого кроку сьогодні, а не з ідеального плану на завтра.",
+]
+JOURNAL_LINES = [
+    "Сьогодні я помітив, як швидко реагую на дрібниці.",
+    "Вдячний за спокійний ранок і каву без поспіху.",
+    "Не вийшло стримати роздратування на нараді — завтра спробую паузу в три вдихи.",
+    "Прогулянка без телефону повернула ясність думок.",
+    "Згадав, що час — єдине, що справді моє.",
+]
+LAB_PRACTICES = ["breathing", "meditation", "sleep"]
+
+
+def full_year(articles):
+    """Статті на кожен день року: результат не залежить від дати прогону (academy.csv покриває лише частину)"""
+    taken = {(article["day"], article["month"]) for article in articles.values()}
+    templates = list(articles.values())
+    next_id = max(articles) + 1
+    for offset in range(366):
+        day = date(2024, 1, 1) + timedelta(days=offset)
+        if (day.day, day.month) in taken:
+            continue
+        template = templates[next_id % len(templates)]
+        articles[next_id] = {
+            **template, "id": next_id, "day": day.day, "month": day.month,
+            "title": f"{template['title']} ({day.day:02}.{day.month:02})",
+        }
+        next_id += 1
+    return articles
+
+
+async def copy_articles(conn, articles):
+    """Статті з явними id (ті самі, що в бандлі) + послідовність після них"""
+    await conn.copy_records_to_table(
+        "academy_articles",
+        columns=["id", "day", "month", "title", "content", "reflection"],
+        records=[(a["id"], a["day"], a["month"], a["title"], a["content"], a["reflection"]) for a in articles.values()],
+    )
+    await conn.execute(
+        "SELECT setval(pg_get_serial_sequence('academy_articles', 'id'), (SELECT MAX(id) FROM academy_articles))"
+    )
+
+
+async def article_ids(conn):
+    """id статей Академії; порожню таблицю заповнює з academy.csv (доповненого до року)"""
+    ids = [row["id"] for row in await conn.fetch("SELECT id FROM academy_articles ORDER BY id")]
+    if ids:
+        return ids
+    from build_bundle import collect_from_files
+
+    _, _, articles = collect_from_files(os.path.join(ROOT, "academy.csv"))
+    articles = full_year(articles["ua"])
+    await copy_articles(conn, articles)
+    return sorted(articles)
+
+
+async def table_columns(conn, table):
+    rows = await conn.fetch(
+        "SELECT column_name FROM information_schema.columns WHERE table_schema = current_schema() AND table_name = $1",
+        table,
+    )
+    return {row["column_name"] for row in rows}
+
+
+# --- Генерація ---
+
+class Content:
+    def __init__(self, articles):
+        from data import SCENARIOS
+
+        self.articles = articles
+        # Бали варіантів кожного сценарію (гравець обирає з тих самих, що й у грі)
+        self.scenarios = [sorted(o["score"] for o in s["options"]) for _, s in sorted(SCENARIOS.items())]
+
+
+def _kept_since(table, today):
+    """Найстаріший день, який лишає retention таблиці (date.min — retention вимкнено)"""
+    months = partitions.TABLES[table].retention_months
+    return partitions.add_months(today, -months) if months else date.min
+
+
+def _at(rng, day):
+    """Випадковий час протягом дня, вдень частіше"""
+    return datetime.combine(day, datetime.min.time()) + timedelta(seconds=int(rng.triangular(6, 24, 20) * 3600))
+
+
+def generate_user(rng, user_id, today, content, rows):
+    """Один юзер з історією; рядки додаються в rows[таблиця] як dict"""
+    signup_ago = int(HISTORY_DAYS * rng.random() ** 2)  # аудиторія росте: нових більше
+    signup = today - timedelta(days=signup_ago)
+    last_active = signup
+    score = 0
+
+    # Stoic Gym: активні дні з довгим хвостом, до GYM_DAILY_ENERGY ходів на день
+    active_days = min(signup_ago + 1, int(rng.paretovariate(1.1) * 10))
+    skill = rng.uniform(0.3, 0.9)
+    level = 1
+    game_since = _kept_since("game_history", today)
+    for offset in sorted(rng.sample(range(signup_ago + 1), active_days)):
+        day = signup + timedelta(days=offset)
+        moves = GYM_DAILY_ENERGY if rng.random() < 0.6 else rng.randint(1, GYM_DAILY_ENERGY - 1)
+        points = []
+        for _ in range(moves):
+            if level <= len(content.scenarios):
+                scenario_id, options = level, content.scenarios[level - 1]
+            else:
+                scenario_id = rng.randint(1, len(content.scenarios))
+                options = content.scenarios[scenario_id - 1]
+            earned = options[-1] if rng.random() < skill else rng.choice(options)
+            points.append(earned)
+            if day >= game_since:
+                rows["game_history"].append(
+                    {"user_id": user_id, "level_num": scenario_id, "points_earned": earned, "played_at": day}
+                )
+            level += 1
+        rows["daily_user_stats"].append({
+            "user_id": user_id, "day": day, "moves": moves, "points": sum(points),
+            "mistakes": sum(p < 0 for p in points), "wisdoms": sum(p > 0 for p in points),
+        })
+        score += sum(points)
+        last_active = max(last_active, day)
+
+    # Академія: частина юзерів читає кілька уроків, одиниці — всі
+    bitmap = None
+    read_ids = []
+    if rng.random() < ACADEMY_SHARE:
+        if rng.random() < FULL_ACADEMY_SHARE / ACADEMY_SHARE:
+            count = len(content.articles)
+        else:
+            count = int(rng.paretovariate(1.2) * 3)
+        count = min(count, len(content.articles), ACADEMY_DAILY_LIMIT * (signup_ago + 1))
+        read_ids = rng.sample(content.articles, count)
+        days = sorted(rng.sample(range(signup_ago + 1), math.ceil(count / ACADEMY_DAILY_LIMIT)))
+        for i, article_id in enumerate(read_ids):
+            day = signup + timedelta(days=days[i // ACADEMY_DAILY_LIMIT])
+            rows["user_academy_progress"].append({"user_id": user_id, "article_id": article_id, "read_at": _at(rng, day)})
+            last_active = max(last_active, day)
+        score += ACADEMY_REWARD * count
+        bitmap = bitmap_to_bytes(bitmap_from_ids(read_ids))
+
+    # Ментор: сесії з довгим хвостом, у сесії кілька пар питання-відповідь
+    mentor_since = _kept_since("mentor_history", today)
+    if rng.random() < MENTOR_SHARE:
+        for _ in range(int(rng.paretovariate(1.3))):
+            day = signup + timedelta(days=rng.randint(0, signup_ago))
+            moment = _at(rng, day)
+            session = []
+            for _ in range(rng.randint(1, 8)):
+                question = rng.choice(QUESTIONS)
+                answer = " ".join(rng.sample(ANSWER_SENTENCES, rng.randint(3, 6)))
+                session.append({"user_id": user_id, "role": "user", "content": question, "created_at": moment})
+                moment += timedelta(seconds=rng.randint(3, 15))
+                session.append({"user_id": user_id, "role": "assistant", "content": answer, "created_at": moment})
+                moment += timedelta(seconds=rng.randint(30, 180))
+            # Сесію генеруємо завжди, щоб решта даних не залежала від HISTORY_RETENTION
+            if day >= mentor_since:
+                rows["mentor_history"].extend(session)
+            last_active = max(last_active, day)
+
+    # Щоденник: без retention, записи за весь час
+    if rng.random() < JOURNAL_SHARE:
+        for _ in range(int(rng.paretovariate(1.4) * 2)):
+            day = signup + timedelta(days=rng.randint(0, signup_ago))
+            text = " ".join(rng.sample(JOURNAL_LINES, rng.randint(1, 3)))
+            rows["journal"].append({"user_id": user_id, "entry_text": text, "created_at": _at(rng, day)})
+            last_active = max(last_active, day)
+
+    # Лабораторія: бали за хвилини практики, не більше LAB_MAX_POINTS_PER_SESSION
+    lab_since = _kept_since("lab_history", today)
+    if rng.random() < LAB_SHARE:
+        for _ in range(int(rng.paretovariate(1.5) * 2)):
+            day = signup + timedelta(days=rng.randint(0, signup_ago))
+            earned = min(rng.randint(1, 20), LAB_MAX_POINTS_PER_SESSION)
+            score += earned
+            session = {
+                "user_id": user_id, "practice_type": rng.choice(LAB_PRACTICES),
+                "score_earned": earned, "completed_at": _at(rng, day),
+            }
+            if day >= lab_since:
+                rows["lab_history"].append(session)
+            last_active = max(last_active, day)
+
+    birthdate = None
+    if rng.random() < BIRTHDATE_SHARE:
+        birthdate = date(1960, 1, 1) + timedelta(days=rng.randint(0, 48 * 365))
+    rows["users"].append({
+        "user_id": user_id,
+        "username": rng.choice(NAMES) if rng.random() < 0.9 else None,
+        "score": score,
+        "level": level,
+        "birthdate": birthdate,
+        "last_active_date": last_active,
+        "auth_token": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "academy_count": len(read_ids),
+        "academy_bitmap": bitmap,
+    })
+
+
+async def ensure_history_partitions(conn, today):
+    """Партиції за весь згенерований період (міграції створюють лише поточну і наступні)"""
+    oldest = today - timedelta(days=HISTORY_DAYS)
+    for spec in partitions.TABLES.values():
+        months = (today.year - oldest.year) * 12 + today.month - oldest.month
+        if spec.retention_months is not None:
+            months = min(months, spec.retention_months)
+        for i in range(1, months + 1):
+            await partitions.create_partition(conn, spec, partitions.add_months(today, -i))
+
+
+async def generate(conn, scale, seed, today=None, first_id=FIRST_USER_ID, log=print):
+    """Засіває scale * USERS_PER_SCALE юзерів з історією; повертає {таблиця: рядків}"""
+    today = today or date.today()
+    users = max(1, int(scale * USERS_PER_SCALE))
+    rng = random.Random(seed)
+
+    taken = await conn.fetchval(
+        "SELECT COUNT(*) FROM users WHERE user_id >= $1 AND user_id < $2", first_id, first_id + users
+    )
+    if taken:
+        raise RuntimeError(f"У діапазоні id {first_id}..{first_id + users - 1} вже є {taken} юзерів (--truncate)")
+
+    content = Content(await article_ids(conn))
+    await ensure_history_partitions(conn, today)
+    columns = {table: await table_columns(conn, table) for table in TABLES}
+
+    totals = dict.fromkeys(TABLES, 0)
+    started = time.perf_counter()
+    for chunk_start in range(0, users, CHUNK_USERS):
+        rows = {table: [] for table in TABLES}
+        for user_id in range(first_id + chunk_start, first_id + min(users, chunk_start + CHUNK_USERS)):
+            generate_user(rng, user_id, today, content, rows)
+        # users першими: на них посилаються FK історії
+        for table in TABLES:
+            if not rows[table]:
+                continue
+            names = [name for name in rows[table][0] if name in columns[table]]
+            await conn.copy_records_to_table(
+                table, columns=names, records=[tuple(row[name] for name in names) for row in rows[table]]
+            )
+            totals[table] += len(rows[table])
+        done = min(users, chunk_start + CHUNK_USERS)
+        log(f"  {done}/{users} юзерів, {totals['game_history']} ходів ({time.perf_counter() - started:.0f} с)")
+
+    for table in TABLES:
+        await conn.execute(f"ANALYZE {table}")
+    return totals
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Синтетичні дані продакшн-масштабу")
+    parser.add_argument("--scale", type=float, default=0.05, help=f"1 = {USERS_PER_SCALE} юзерів")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--today", type=date.fromisoformat, help="Дата, від якої рахується історія (YYYY-MM-DD)")
+    parser.add_argument("--first-id", type=int, default=FIRST_USER_ID)
+    parser.add_argument("--truncate", action="store_true", help="Очистити таблиці юзерів та історії перед засівом")
+    args = parser.parse_args()
+
+    from db import Database
+
+    db = Database()
+    await db.connect()
+    if not db.pool:
+        return
+    try:
+        # Схема — з міграцій db.py, як у бота та API
+        await db.create_tables()
+        await db.create_academy_table()
+        await db.create_progress_table()
+        await db.create_lab_tables()
+        await db.create_erasure_tables()
+        async with db.pool.acquire() as conn:
+            if args.truncate:
+                await conn.execute(f"TRUNCATE {', '.join(TABLES)}, sync_codes, rate_limits RESTART IDENTITY CASCADE")
+            started = time.perf_counter()
+            totals = await generate(conn, args.scale, args.seed, args.today, args.first_id)
+        print(f"✅ Засіяно за {time.perf_counter() - started:.0f} с:")
+        for table, count in totals.items():
+            print(f"  {table}: {count}")
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from metrics import DUPLICATE_CALLBACKS
+
+# Апдейти одного юзера обробляються по черзі (aiogram запускає кожен апдейт окремою
+# задачею), а повторний тап тієї ж кнопки протягом DUPLICATE_WINDOW секунд відкидається
+# одразу: хендлер (і його запити до БД) не запускається вдруге, хід не зараховується двічі.
+
+DUPLICATE_WINDOW = 1.0
+
+
+class _UserLock:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        # Скільки апдейтів тримають або чекають лок; 0 — запис прибирається
+        self.users = 0
+
+
+class UserSerializeMiddleware(BaseMiddleware):
+    def __init__(self, duplicate_window=DUPLICATE_WINDOW):
+        self.duplicate_window = duplicate_window
+        self._locks = {}
+        # (user_id, message_id, data) -> час останнього тапу
+        self._recent = {}
+        self._purged_at = 0.0
+        # Відкинуті дублікати за префіксом callback_data (anygame, academy, game ...)
+        self.dropped = Counter()
+
+    async def __call__(self, handler, event: Update, data):
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        callback = event.callback_query
+        if callback is not None and self._is_duplicate(user.id, callback):
+            prefix = (callback.data or "").split("_")[0]
+            self.dropped[prefix] += 1
+            DUPLICATE_CALLBACKS.labels(prefix).inc()
+            try:
+                await callback.answer()
+            except Exception as e:
+                logging.info(f"Дубль callback без відповіді: {e}")
+            return None
+
+        entry = self._locks.get(user.id)
+        if entry is None:
+            entry = self._locks[user.id] = _UserLock()
+        entry.users += 1
+        try:
+            async with entry.lock:
+                return await handler(event, data)
+        finally:
+            entry.users -= 1
+            if entry.users == 0:
+                del self._locks[user.id]
+
+    def _is_duplicate(self, user_id, callback):
+        now = time.monotonic()
+        if now - self._purged_at > self.duplicate_window:
+            self._purge(now)
+        message_id = callback.message.message_id if callback.message else callback.inline_message_id
+        key = (user_id, message_id, callback.data)
+        seen = self._recent.get(key)
+        self._recent[key] = now
+        return seen is not None and now - seen < self.duplicate_window
+
+    def _purge(self, now):
+        expired = [key for key, seen in self._recent.items() if now - seen >= self.duplicate_window]
+        for key in expired:
+            del self._recent[key]
+        self._purged_at = now
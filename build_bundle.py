@@ -0,0 +1,167 @@
+import argparse
+import asyncio
+import csv
+import os
+
+import asyncpg
+from dotenv import load_dotenv
+
+from content_bundle import BUNDLE_PATH, ContentBundle, write_bundle
+
+# Компілює весь контент (цитати, сценарії ua/en, статті Академії) в один бандл.
+# Запускати після кожного оновлення текстів (upload_academy.py, translate_db.py).
+load_dotenv()
+
+
+async def collect_from_db(db_url):
+    """Забирає контент з Postgres (джерело правди з перекладами)"""
+    conn = await asyncpg.connect(db_url)
+    try:
+        quote_rows = await conn.fetch("SELECT id, text, author, category FROM quotes ORDER BY id")
+        quotes = {
+            row["id"]: {"text": row["text"], "author": row["author"], "category": row["category"]}
+            for row in quote_rows
+        }
+
+        scenarios = {"ua": {}, "en": {}}
+        scenario_rows = await conn.fetch("SELECT id, text, text_en FROM scenarios ORDER BY id")
+        option_rows = await conn.fetch(
+            """
+            SELECT scenario_id, option_id, text, text_en, score, msg, msg_en
+            FROM scenario_options ORDER BY id ASC
+            """
+        )
+        for row in scenario_rows:
+            scenarios["ua"][row["id"]] = {"id": row["id"], "text": row["text"], "options": []}
+            scenarios["en"][row["id"]] = {"id": row["id"], "text": row["text_en"], "options": []}
+        for opt in option_rows:
+            if opt["scenario_id"] not in scenarios["ua"]:
+                continue
+            scenarios["ua"][opt["scenario_id"]]["options"].append(
+                {"id": opt["option_id"], "text": opt["text"], "score": opt["score"], "msg": opt["msg"]}
+            )
+            scenarios["en"][opt["scenario_id"]]["options"].append(
+                {"id": opt["option_id"], "text": opt["text_en"], "score": opt["score"], "msg": opt["msg_en"]}
+            )
+
+        articles = {"ua": {}, "en": {}}
+        article_rows = await conn.fetch(
+            """
+            SELECT id, day, month, title, content, reflection, title_en, content_en, reflection_en
+            FROM academy_articles ORDER BY id
+            """
+        )
+        for row in article_rows:
+            base = {"id": row["id"], "day": row["day"], "month": row["month"]}
+            articles["ua"][row["id"]] = {
+                **base,
+                "title": row["title"],
+                "content": row["content"],
+                "reflection": row["reflection"],
+            }
+            articles["en"][row["id"]] = {
+                **base,
+                "title": row["title_en"],
+                "content": row["content_en"],
+                "reflection": row["reflection_en"],
+            }
+        return quotes, scenarios, articles
+    finally:
+        await conn.close()
+
+
+def collect_from_files(csv_path):
+    """
+    Офлайн-збірка з data.py та academy.csv (тільки українська).
+    id статей ідуть у порядку CSV — так само, як їх видасть upload_academy.py на чистій базі;
+    на живій базі це не гарантовано, тому main() звіряє їх з academy_articles.
+    """
+    from data import SCENARIOS, STOIC_DB
+
+    quotes = {i: dict(q) for i, q in enumerate(STOIC_DB, start=1)}
+    scenarios = {
+        "ua": {
+            s_id: {
+                "id": s_id,
+                "text": s["text"],
+                "options": [
+                    {"id": o["id"], "text": o["text"], "score": o["score"], "msg": o["msg"]}
+                    for o in s["options"]
+                ],
+            }
+            for s_id, s in SCENARIOS.items()
+        }
+    }
+    articles = {"ua": {}}
+    with open(csv_path, mode="r", encoding="utf-8") as f:
+        for a_id, row in enumerate(csv.DictReader(f), start=1):
+            articles["ua"][a_id] = {
+                "id": a_id,
+                "day": int(row["day"]),
+                "month": int(row["month"]),
+                "title": row["title"],
+                "content": row["content"],
+                "reflection": row["reflection"],
+            }
+    return quotes, scenarios, articles
+
+
+async def check_article_ids(db_url, articles):
+    """
+    id статей з CSV мають збігатися з academy_articles.id: прогрес і бітмапа Академії
+    зберігають саме id з бази, тож зсув тихо підмінив би статті. Повертає список розбіжностей.
+    """
+    conn = await asyncpg.connect(db_url)
+    try:
+        rows = await conn.fetch("SELECT id, day, month, title FROM academy_articles")
+    finally:
+        await conn.close()
+    in_db = {row["id"]: (row["day"], row["month"], row["title"]) for row in rows}
+    problems = []
+    for a_id, article in articles.items():
+        expected = in_db.pop(a_id, None)
+        if expected != (article["day"], article["month"], article["title"]):
+            problems.append(f"id {a_id}: у CSV {article['day']}.{article['month']} «{article['title']}», у базі {expected}")
+    problems.extend(f"id {a_id}: є в базі, немає в CSV" for a_id in sorted(in_db))
+    return problems
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Збірка бандлу контенту")
+    parser.add_argument("--source", choices=["db", "files"], default="db")
+    parser.add_argument("--csv", default="academy.csv")
+    parser.add_argument("--out", default=BUNDLE_PATH)
+    parser.add_argument(
+        "--unchecked-ids", action="store_true",
+        help="лише для локальної розробки: не звіряти id статей з базою (--source files без DATABASE_URL)",
+    )
+    args = parser.parse_args()
+    db_url = os.getenv("DATABASE_URL")
+
+    if args.source == "db":
+        if not db_url:
+            parser.error("для --source db потрібен DATABASE_URL")
+        quotes, scenarios, articles = await collect_from_db(db_url)
+    else:
+        quotes, scenarios, articles = collect_from_files(args.csv)
+        if db_url:
+            problems = await check_article_ids(db_url, articles["ua"])
+            if problems:
+                print("❌ id статей у CSV не збігаються з academy_articles:")
+                print("\n".join(f"   {p}" for p in problems[:20]))
+                raise SystemExit(1)
+        elif not args.unchecked_ids:
+            parser.error("--source files без DATABASE_URL не може звірити id статей з базою; "
+                         "для продакшн-бандлу збирайте з бази, для розробки додайте --unchecked-ids")
+
+    size = write_bundle(args.out, quotes, scenarios, articles)
+    bundle = ContentBundle.open(args.out)
+    print(
+        f"✅ Бандл {args.out} зібрано ({size} байт, версія {bundle.content_version:08x}): "
+        f"{len(quotes)} цитат, {bundle.scenarios_count()} сценаріїв, {len(articles['ua'])} статей."
+    )
+    bundle.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,5 +1,11 @@
+# --- ЛІМІТИ (rate_limit.py) ---
+GYM_DAILY_ENERGY = 5        # Енергія Stoic Gym на день (1 сценарій = 1 енергія)
+AI_DAILY_LIMIT = 50         # Повідомлень Ментору на день (~1.5$ в місяць макс. на юзера)
+AI_COOLDOWN_SECONDS = 5     # Пауза між повідомленнями Ментору (спам-фільтр)
+
 # --- НАГОРОДИ (БАЛИ) ---
 ACADEMY_REWARD = 5          # За прочитаний урок бали
+ACADEMY_DAILY_LIMIT = 5     # Уроків Академії на день
 
 # --- ЛАБОРАТОРІЯ (Правила) ---
 LAB_POINTS_PER_MINUTE = 1         # 1 бал за 1 хвилину
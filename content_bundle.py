@@ -0,0 +1,181 @@
+import json
+import mmap
+import os
+import random
+import struct
+import zlib
+
+# Бінарний бандл контенту (цитати, сценарії, статті Академії).
+# Збирається скриптом build_bundle.py і мапиться в пам'ять (mmap) ботом та API,
+# тож читання контенту не потребує запитів до БД, а сторінки файлу спільні для процесів.
+#
+# Формат (little-endian):
+#   header:   magic(8s) | format_version(H) | sections(H) | content_version(I)
+#   sections: tag(4s) | index_offset(I) | count(I)          × sections
+#   index:    key(I) | offset(I) | length(I)                 × count, відсортовано за key
+#   records:  JSON (utf-8)
+
+BUNDLE_MAGIC = b"STOICBND"
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_PATH = os.getenv("CONTENT_BUNDLE_PATH", "content.bundle")
+
+_HEADER = struct.Struct("<8sHHI")
+_SECTION = struct.Struct("<4sII")
+_ENTRY = struct.Struct("<III")
+
+# Секції бандлу
+QUOTES = b"QUOT"
+SCENARIOS_UA = b"SCUA"
+SCENARIOS_EN = b"SCEN"
+ARTICLES_UA = b"ARUA"
+ARTICLES_EN = b"AREN"
+# Індекс (day, month) -> id статті: key = month * 100 + day, offset = id, length = 0
+ARTICLE_DATES = b"ADAT"
+
+
+def date_key(day: int, month: int) -> int:
+    return month * 100 + day
+
+
+def write_bundle(path, quotes, scenarios, articles):
+    """
+    Записує бандл у файл.
+    quotes: {id: dict}, scenarios: {lang: {id: dict}}, articles: {lang: {id: dict}}
+    """
+    blobs = bytearray()
+    sections = []
+
+    def add_section(tag, items):
+        entries = []
+        for key, value in sorted(items.items()):
+            data = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            entries.append((key, len(blobs), len(data)))
+            blobs.extend(data)
+        sections.append((tag, entries))
+
+    add_section(QUOTES, quotes)
+    add_section(SCENARIOS_UA, scenarios.get("ua", {}))
+    add_section(SCENARIOS_EN, scenarios.get("en", {}))
+    add_section(ARTICLES_UA, articles.get("ua", {}))
+    add_section(ARTICLES_EN, articles.get("en", {}))
+    sections.append(
+        (
+            ARTICLE_DATES,
+            sorted((date_key(a["day"], a["month"]), a_id, 0) for a_id, a in articles.get("ua", {}).items()),
+        )
+    )
+
+    # Версія контенту — CRC32 усіх записів: змінюється лише разом із текстами
+    content_version = zlib.crc32(blobs)
+    header_size = _HEADER.size + _SECTION.size * len(sections)
+    index_size = sum(_ENTRY.size * len(entries) for _, entries in sections)
+    records_offset = header_size + index_size
+
+    out = bytearray(_HEADER.pack(BUNDLE_MAGIC, BUNDLE_FORMAT_VERSION, len(sections), content_version))
+    index = bytearray()
+    for tag, entries in sections:
+        out += _SECTION.pack(tag, header_size + len(index), len(entries))
+        for key, offset, length in entries:
+            # Для ADAT offset зберігає id статті, а не зміщення запису
+            if tag != ARTICLE_DATES:
+                offset += records_offset
+            index += _ENTRY.pack(key, offset, length)
+    out += index
+    out += blobs
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(out)
+    # Атомарна заміна, щоб запущені процеси не побачили напівзаписаний файл
+    os.replace(tmp_path, path)
+    return len(out)
+
+
+class ContentBundle:
+    """Read-only доступ до змапленого бандлу контенту"""
+
+    def __init__(self, buf):
+        self._buf = buf
+        magic, fmt_version, count, content_version = _HEADER.unpack_from(buf, 0)
+        if magic != BUNDLE_MAGIC or fmt_version != BUNDLE_FORMAT_VERSION:
+            raise ValueError("Unsupported content bundle format")
+        self.content_version = content_version
+        self._sections = {}
+        for i in range(count):
+            tag, offset, entries = _SECTION.unpack_from(buf, _HEADER.size + i * _SECTION.size)
+            self._sections[tag] = (offset, entries)
+
+    @classmethod
+    def open(cls, path=BUNDLE_PATH):
+        """Мапить файл бандлу. Повертає None, якщо файлу немає або він пошкоджений."""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return cls(buf)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"⚠️ Content bundle ignored ({path}): {e}")
+            return None
+
+    def close(self):
+        self._buf.close()
+
+    # --- Низькорівневий пошук ---
+    def _entry(self, tag, i):
+        offset, _ = self._sections[tag]
+        return _ENTRY.unpack_from(self._buf, offset + i * _ENTRY.size)
+
+    def _count(self, tag):
+        return self._sections.get(tag, (0, 0))[1]
+
+    def _find(self, tag, key):
+        """Бінарний пошук по індексу секції"""
+        lo, hi = 0, self._count(tag) - 1
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            entry = self._entry(tag, mid)
+            if entry[0] == key:
+                return entry
+            if entry[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        return None
+
+    def _record(self, entry):
+        _, offset, length = entry
+        return json.loads(self._buf[offset:offset + length])
+
+    def _get(self, tag, key):
+        entry = self._find(tag, key)
+        return self._record(entry) if entry else None
+
+    # --- Цитати ---
+    def random_quote(self):
+        count = self._count(QUOTES)
+        if not count:
+            return None
+        return self._record(self._entry(QUOTES, random.randrange(count)))
+
+    # --- Сценарії ---
+    def scenarios_count(self):
+        return self._count(SCENARIOS_UA)
+
+    def scenario(self, scenario_id: int, lang: str = "ua"):
+        # Якщо перекладу в бандлі немає (офлайн-збірка) — віддаємо українську версію
+        if lang == "en":
+            return self._get(SCENARIOS_EN, scenario_id) or self._get(SCENARIOS_UA, scenario_id)
+        return self._get(SCENARIOS_UA, scenario_id)
+
+    # --- Академія ---
+    def article_by_id(self, article_id: int, lang: str = "ua"):
+        if lang == "en":
+            return self._get(ARTICLES_EN, article_id) or self._get(ARTICLES_UA, article_id)
+        return self._get(ARTICLES_UA, article_id)
+
+    def article_by_date(self, day: int, month: int, lang: str = "ua"):
+        entry = self._find(ARTICLE_DATES, date_key(day, month))
+        if not entry:
+            return None
+        return self.article_by_id(entry[1], lang)
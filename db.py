@@ -1,26 +1,188 @@
 import os
-import uuid
 from datetime import datetime
-from constants import ACADEMY_REWARD
+from academy_progress import ProgressCache, UserProgress, bitmap_from_bytes
+from constants import ACADEMY_DAILY_LIMIT, ACADEMY_REWARD
+from content_bundle import ContentBundle
+from move_buffer import MoveBuffer
+import erasure
+import metrics
+import partitions
+import query_trace
+import rate_limit
+import slow_queries
+from utils import get_academy_rank
 
 import asyncpg
 from dotenv import load_dotenv
 
 load_dotenv()
 
-
+# Список статей: SQL збирається один раз на мову, а не f-рядком на кожен виклик
+_ARTICLE_TITLE_COL = {"ua": "title", "en": "title_en"}
+
+_ARTICLES_JSON_SQL = {
+    lang: f"""
+        SELECT COALESCE(json_agg(t ORDER BY t.month, t.day), '[]'::json)::text
+        FROM (
+            SELECT id, day, month, {col} as title FROM academy_articles
+            ORDER BY month, day LIMIT $1 OFFSET $2
+        ) t
+    """
+    for lang, col in _ARTICLE_TITLE_COL.items()
+}
+
+# Keyset по (month, day, id): глибокі сторінки коштують як перша.
+# Беремо limit + 1 рядок, щоб дізнатися has_more без COUNT(*).
+_ARTICLES_PAGE_SQL = {
+    lang: f"""
+        WITH page AS (
+            SELECT id, day, month, {col} AS title,
+                   row_number() OVER (ORDER BY month, day, id) AS rn
+            FROM (
+                SELECT id, day, month, {col} FROM academy_articles
+                WHERE (month, day, id) > ($1, $2, $3)
+                ORDER BY month, day, id
+                LIMIT $4 + 1
+            ) p
+        )
+        SELECT
+            COALESCE(json_agg(json_build_array(id, day, month, title) ORDER BY rn) FILTER (WHERE rn <= $4), '[]'::json)::text AS items,
+            COUNT(*) > $4 AS has_more,
+            (array_agg(month ORDER BY rn DESC) FILTER (WHERE rn <= $4))[1] AS last_month,
+            (array_agg(day ORDER BY rn DESC) FILTER (WHERE rn <= $4))[1] AS last_day,
+            (array_agg(id ORDER BY rn DESC) FILTER (WHERE rn <= $4))[1] AS last_id
+        FROM page
+    """
+    for lang, col in _ARTICLE_TITLE_COL.items()
+}
+
+# Реєстрація одним запитом, що повертає токен. Існуючий рядок оновлюємо тільки якщо є що доповнити
+# (ім'я, дата народження, токен старого юзера) — повторний /start не плодить мертві версії рядка.
+# Новий токен генерується лише для вставки нового юзера або старого юзера без токена; виданий
+# токен ніколи не перевидається, щоб не розлогінити юзера. Якщо паралельна реєстрація того ж
+# юзера закомітилась після нашого знімка, запит поверне NULL — тоді токен дочитує add_user*.
+_ADD_USER_SQL = """
+    WITH current AS (
+        SELECT auth_token FROM users WHERE user_id = $1
+    ), updated AS (
+        UPDATE users
+        SET username = COALESCE(username, $2),
+            birthdate = COALESCE(birthdate, $3),
+            auth_token = COALESCE(auth_token, gen_random_uuid()::text)
+        WHERE user_id = $1
+          AND (username IS NULL OR auth_token IS NULL OR (birthdate IS NULL AND $3::date IS NOT NULL))
+        RETURNING auth_token
+    ), inserted AS (
+        INSERT INTO users (user_id, username, birthdate, auth_token)
+        SELECT $1, $2, $3, gen_random_uuid()::text
+        WHERE NOT EXISTS (SELECT 1 FROM current)
+        ON CONFLICT (user_id) DO NOTHING
+        RETURNING auth_token
+    )
+    SELECT auth_token FROM inserted
+    UNION ALL
+    SELECT auth_token FROM updated
+    UNION ALL
+    SELECT auth_token FROM current WHERE NOT EXISTS (SELECT 1 FROM updated)
+"""
+
+_ADD_USERS_BULK_SQL = """
+    WITH data AS (
+        SELECT DISTINCT ON (user_id) user_id, username, birthdate
+        FROM unnest($1::bigint[], $2::text[], $3::date[]) AS d(user_id, username, birthdate)
+        ORDER BY user_id
+    ), current AS (
+        SELECT u.user_id, u.auth_token FROM users u JOIN data d ON d.user_id = u.user_id
+    ), updated AS (
+        UPDATE users u
+        SET username = COALESCE(u.username, d.username),
+            birthdate = COALESCE(u.birthdate, d.birthdate),
+            auth_token = COALESCE(u.auth_token, gen_random_uuid()::text)
+        FROM data d
+        WHERE u.user_id = d.user_id
+          AND (u.username IS NULL OR u.auth_token IS NULL OR (u.birthdate IS NULL AND d.birthdate IS NOT NULL))
+        RETURNING u.user_id, u.auth_token
+    ), inserted AS (
+        INSERT INTO users (user_id, username, birthdate, auth_token)
+        SELECT user_id, username, birthdate, gen_random_uuid()::text FROM data
+        WHERE user_id NOT IN (SELECT user_id FROM current)
+        ON CONFLICT (user_id) DO NOTHING
+        RETURNING user_id, auth_token
+    )
+    SELECT user_id, auth_token FROM inserted
+    UNION ALL
+    SELECT user_id, auth_token FROM updated
+    UNION ALL
+    SELECT user_id, auth_token FROM current WHERE user_id NOT IN (SELECT user_id FROM updated)
+"""
+
+# Історія Ментора та щоденник читаються як "останні N записів юзера": індекс у порядку
+# видачі. Текст у INCLUDE не кладемо — рядок B-tree обмежений ~2.7 КБ, а повідомлення ні.
+_HISTORY_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_journal_user_created ON journal (user_id, created_at DESC) INCLUDE (id)",
+    "CREATE INDEX IF NOT EXISTS idx_mentor_history_user_created ON mentor_history (user_id, created_at DESC) INCLUDE (role)",
+]
+
+
+# Час кожного методу і кількість його запитів — у метриках Prometheus (metrics.py)
+@metrics.instrument_database
 class Database:
     def __init__(self):
         self.db_url = os.getenv("DATABASE_URL")
         self.pool = None
+        # Змаплений бандл контенту (build_bundle.py). Якщо його немає — читаємо з БД.
+        self.bundle = None
+        # In-memory LRU бітмап прогресу Академії (academy_progress.py)
+        self.progress = ProgressCache()
+        # Write-behind буфер ходів Stoic Gym (move_buffer.py)
+        self.moves = MoveBuffer(self)
+        # Фонове видалення акаунтів (erasure.py)
+        self.erasure = erasure.ErasureService(self)
+        # Ліміти юзерів у пам'яті: енергія, Ментор, квоти Академії та Лабораторії (rate_limit.py)
+        self.limits = rate_limit.RateLimiter(self)
+        # Семплер повільних запитів з EXPLAIN (slow_queries.py, вмикається SLOW_QUERY_MS)
+        self.slow_queries = slow_queries.SlowQuerySampler(self)
+
+    async def _init_connection(self, conn):
+        # Кожен запит з'єднання потрапляє в метрики, трасу поточного апдейту і семплер
+        await metrics.setup_connection(conn)
+        query_trace.setup_connection(conn)
+        self.slow_queries.setup_connection(conn)
 
     async def connect(self):
         if not self.pool:
             try:
-                self.pool = await asyncpg.create_pool(self.db_url)
+                self.pool = await asyncpg.create_pool(self.db_url, init=self._init_connection)
                 print("✅ Connected to Database")
             except Exception as e:
                 print(f"❌ Database connection failed: {e}")
+        if self.pool:
+            metrics.watch_pool(self.pool)
+            # Денні квоти лімітера скидаються за тим самим поясом, що й CURRENT_DATE у базі
+            rate_limit.use_database_timezone(await self.pool.fetchval("SHOW TimeZone"))
+            self.moves.start()
+            self.limits.start()
+            self.slow_queries.start()
+        if not self.bundle:
+            self.bundle = ContentBundle.open()
+            if self.bundle:
+                print(f"📦 Content bundle loaded (v{self.bundle.content_version:08x})")
+
+    async def close(self):
+        """Дописує буфер ходів, зберігає ліміти і закриває пул (при зупинці бота/API)"""
+        if self.pool:
+            await self.slow_queries.close()
+            await self.moves.close()
+            await self.limits.close()
+            await self.pool.close()
+            self.pool = None
+
+    async def maintain_partitions(self):
+        """Щоденно: партиції історії наперед + архівація старих (partitions.py)"""
+        async with self.pool.acquire() as conn:
+            archived = await partitions.maintain(conn)
+        for path in archived:
+            print(f"📦 Archived partition: {path}")
 
     async def create_tables(self):
         """Створює таблиці користувачів, журналу та історії"""
@@ -40,41 +202,25 @@ class Database:
             """
             )
 
-            # 2. Таблиця журналу (щоденник)
-            await conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS journal (
-                    id SERIAL PRIMARY KEY,
-                    user_id BIGINT,
-                    entry_text TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """
-            )
-
-            # 3. НОВА: Таблиця історії Ментора
-            await conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS mentor_history (
-                    id SERIAL PRIMARY KEY,
-                    user_id BIGINT,
-                    role VARCHAR(20), -- 'user' або 'assistant'
-                    content TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    CONSTRAINT fk_user FOREIGN KEY(user_id) REFERENCES users(user_id) ON DELETE CASCADE
-                )
-            """
-            )
+            # 2-4. Журнал, історія Ментора та ігор — помісячні партиції (partitions.py).
+            # Стару звичайну таблицю старт не чіпає — її конвертує `python partitions.py convert`.
+            for table in ("journal", "mentor_history", "game_history"):
+                await partitions.ensure_table(conn, table)
+            for index_sql in _HISTORY_INDEXES:
+                await conn.execute(index_sql)
 
-            # 4. Таблиця історії ігор (для щоденного звіту)
+            # Денна зведенка Stoic Gym: оновлюється тією ж інструкцією, що й game_history
+            # (move_buffer.py). Для старих даних — backfill_daily_stats.py
             await conn.execute(
                 """
-                CREATE TABLE IF NOT EXISTS game_history (
-                    id SERIAL PRIMARY KEY,
+                CREATE TABLE IF NOT EXISTS daily_user_stats (
                     user_id BIGINT,
-                    level_num INTEGER,
-                    points_earned INTEGER,
-                    played_at DATE DEFAULT CURRENT_DATE
+                    day DATE,
+                    moves INTEGER NOT NULL DEFAULT 0,
+                    points INTEGER NOT NULL DEFAULT 0,
+                    mistakes INTEGER NOT NULL DEFAULT 0,
+                    wisdoms INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (user_id, day)
                 )
             """
             )
@@ -88,6 +234,10 @@ class Database:
                     CONSTRAINT fk_sync_user FOREIGN KEY(user_id) REFERENCES users(user_id) ON DELETE CASCADE
                 )
             """)
+            # Прострочені коди прибирає видача нових (sync_service.py) — по цьому індексу
+            await conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_sync_codes_expires ON sync_codes (expires_at)"
+            )
 
             # МІГРАЦІЇ: Додаємо колонки для старих користувачів (якщо їх немає)
             try:
@@ -123,31 +273,38 @@ class Database:
             except Exception as e:
                 print(f"Migration AI limits log: {e}")
 
+            # Ліміти тепер у rate_limits; колонки energy та ai_* вище лишаються для старих даних
+            await rate_limit.create_tables(conn)
+
 
     async def add_user(self, user_id, username, birthdate=None):
-        new_token = str(uuid.uuid4()) # Генеруємо унікальний ключ для юзера
-        
+        """Реєструє юзера (або доповнює існуючого) і повертає його auth_token одним запитом"""
         async with self.pool.acquire() as conn:
-            await conn.execute(
-                """
-                INSERT INTO users (user_id, username, birthdate, auth_token)
-                VALUES ($1, $2, $3, $4)
-                ON CONFLICT (user_id) DO UPDATE 
-                SET username = COALESCE(users.username, EXCLUDED.username),
-                    birthdate = COALESCE(users.birthdate, EXCLUDED.birthdate)
-                    -- Токен ми НЕ оновлюємо, якщо він вже є, щоб не розлогінити юзера
-                """,
-                user_id,
-                username,
-                birthdate,
-                new_token 
-            )
-            # Якщо у старого юзера ще немає токена (він був зареєстрований раніше),
-            # треба його додати:
-            await conn.execute(
-                "UPDATE users SET auth_token = $1 WHERE user_id = $2 AND auth_token IS NULL",
-                new_token, user_id
-            )
+            token = await conn.fetchval(_ADD_USER_SQL, user_id, username, birthdate)
+            if token is None:
+                # Паралельна реєстрація: новий знімок уже бачить її рядок
+                token = await conn.fetchval("SELECT auth_token FROM users WHERE user_id = $1", user_id)
+            return token
+
+    async def add_users_bulk(self, users, chunk_size=5000):
+        """
+        Масовий імпорт реєстрацій пристроїв: users — список (user_id, username, birthdate).
+        Повертає {user_id: auth_token} для всіх, нових і існуючих.
+        """
+        tokens = {}
+        async with self.pool.acquire() as conn:
+            for i in range(0, len(users), chunk_size):
+                user_ids, usernames, birthdates = zip(*users[i:i + chunk_size])
+                rows = await conn.fetch(_ADD_USERS_BULK_SQL, list(user_ids), list(usernames), list(birthdates))
+                tokens.update((row["user_id"], row["auth_token"]) for row in rows)
+                # Паралельна реєстрація: новий знімок уже бачить її рядки
+                missing = [uid for uid in set(user_ids) if tokens.get(uid) is None]
+                if missing:
+                    rows = await conn.fetch(
+                        "SELECT user_id, auth_token FROM users WHERE user_id = ANY($1::bigint[])", missing
+                    )
+                    tokens.update((row["user_id"], row["auth_token"]) for row in rows)
+        return tokens
             
     async def get_user_id_by_token(self, token: str):
         """Знаходить user_id за токеном авторизації"""
@@ -194,6 +351,24 @@ class Database:
             position = await conn.fetchval(query, user_id)
             return position or 0
 
+    async def get_user_overview(self, user_id):
+        """
+        get_stats + get_user_position + get_birthdate одним запитом на одному з'єднанні.
+        Повертає (score, level, name, birthdate, position).
+        """
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(
+                """
+                SELECT u.score, u.level, u.username, u.birthdate,
+                       (SELECT COUNT(*) + 1 FROM users o WHERE o.score > u.score) AS position
+                FROM users u WHERE u.user_id = $1
+                """,
+                user_id,
+            )
+            if row:
+                return row["score"], row["level"], row["username"], row["birthdate"], row["position"]
+            return 0, 1, "Мандрівник", None, 1
+
     async def count_users(self):
         async with self.pool.acquire() as conn:
             return await conn.fetchval("SELECT COUNT(*) FROM users")
@@ -222,7 +397,7 @@ class Database:
         async with self.pool.acquire() as conn:
             row = await conn.fetchrow(
                 """
-                SELECT user_id, username, score, level, birthdate, energy 
+                SELECT user_id, username, score, level, birthdate
                 FROM users WHERE user_id = $1
                 """, user_id
             )
@@ -241,62 +416,25 @@ class Database:
                 if data.get('birthdate'):
                     data['birthdate'] = data['birthdate'].isoformat()
                 
+                data['energy'] = await self.check_energy(user_id)
                 return data
             return None
 
     # --- ЕНЕРГІЯ ---
 
     async def check_energy(self, user_id):
-        """
-        Перевіряє енергію.
-        Якщо настав новий день - відновлює до 5.
-        Повертає поточну енергію.
-        """
-        async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT energy, last_active_date FROM users WHERE user_id = $1", user_id
-            )
-
-            if not row:
-                return 0
-
-            current_energy = row["energy"]
-            # Конвертуємо в date, бо база може повернути datetime
-            last_date = row["last_active_date"]
-            today = datetime.now().date()
+        """Поточна енергія (нового дня відновлюється до GYM_DAILY_ENERGY)"""
+        return await self.limits.remaining(user_id, "energy")
 
-            # Якщо останній раз грали не сьогодні — відновлюємо енергію
-            if last_date < today:
-                current_energy = 5
-                await conn.execute(
-                    "UPDATE users SET energy = 5, last_active_date = $1 WHERE user_id = $2",
-                    today,
-                    user_id,
-                )
-
-            return current_energy
-
-    async def decrease_energy(self, user_id):
-        """Зменшує енергію на 1"""
-        async with self.pool.acquire() as conn:
-            await conn.execute(
-                "UPDATE users SET energy = energy - 1 WHERE user_id = $1", user_id
-            )
+    async def spend_energy(self, user_id):
+        """Списує 1 енергію. Повертає залишок або None, якщо енергії немає."""
+        if await self.limits.acquire(user_id, "energy"):
+            return None
+        return await self.limits.remaining(user_id, "energy")
 
     async def add_energy(self, user_id, amount=1):
-        """Додає енергію (але не більше ліміту 5)"""
-        async with self.pool.acquire() as conn:
-            current = await conn.fetchval(
-                "SELECT energy FROM users WHERE user_id = $1", user_id
-            )
-            if current is not None and current < 5:
-                await conn.execute(
-                    "UPDATE users SET energy = energy + $1 WHERE user_id = $2",
-                    amount,
-                    user_id,
-                )
-                return True
-            return False
+        """Додає енергію (але не більше денного ліміту)"""
+        return await self.limits.release(user_id, "energy", amount)
 
     # --- ЩОДЕННИК (JOURNAL) ---
 
@@ -318,6 +456,21 @@ class Database:
                 limit,
             )
 
+    async def get_journal_entries_json(self, user_id, limit=5):
+        """Те саме, що get_journal_entries, але Postgres одразу віддає готовий JSON-масив"""
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval(
+                """
+                SELECT COALESCE(json_agg(t ORDER BY t.created_at DESC), '[]'::json)::text
+                FROM (
+                    SELECT id, entry_text, created_at FROM journal
+                    WHERE user_id = $1 ORDER BY created_at DESC LIMIT $2
+                ) t
+                """,
+                user_id,
+                limit,
+            )
+
     async def delete_journal_entry(self, user_id, entry_id):
         """Видаляє запис щоденника, перевіряючи власника"""
         async with self.pool.acquire() as conn:
@@ -328,43 +481,42 @@ class Database:
     # --- ІСТОРІЯ ІГОР (GAME HISTORY) ---
 
     async def log_move(self, user_id, level, points):
-        """Записує результат ходу в історію"""
-        async with self.pool.acquire() as conn:
-            await conn.execute(
-                "INSERT INTO game_history (user_id, level_num, points_earned) VALUES ($1, $2, $3)",
-                user_id,
-                level,
-                points,
-            )
+        """Записує результат ходу в історію (через буфер, пачками у фоні)"""
+        await self.moves.add(user_id, level, points)
 
     async def get_daily_summary(self, user_id):
         """Повертає статистику за сьогодні"""
-        async with self.pool.acquire() as conn:
-            # Беремо всі записи за сьогоднішню дату
-            rows = await conn.fetch(
-                """
-                SELECT points_earned FROM game_history
-                WHERE user_id = $1 AND played_at = CURRENT_DATE
-            """,
-                user_id,
-            )
+        async def read():
+            async with self.pool.acquire() as conn:
+                # Готова зведенка за сьогодні — пошук по первинному ключу
+                return await conn.fetchrow(
+                    """
+                    SELECT moves, points, mistakes, wisdoms FROM daily_user_stats
+                    WHERE user_id = $1 AND day = CURRENT_DATE
+                """,
+                    user_id,
+                )
 
-            if not rows:
-                return None
+        # + ходи, які ще чекають у буфері
+        row, records = await self.moves.read_with_pending(user_id, read)
+        pending = [record[2] for record in records]
 
-            total_moves = len(rows)
-            total_points = sum(r["points_earned"] for r in rows)
-            # Рахуємо помилки (де бали < 0)
-            mistakes = sum(1 for r in rows if r["points_earned"] < 0)
-            # Рахуємо ідеальні рішення (де бали > 0)
-            wisdoms = sum(1 for r in rows if r["points_earned"] > 0)
+        if not row and not pending:
+            return None
 
-            return {
-                "moves": total_moves,
-                "points": total_points,
-                "mistakes": mistakes,
-                "wisdoms": wisdoms,
-            }
+        total_moves = (row["moves"] if row else 0) + len(pending)
+        total_points = (row["points"] if row else 0) + sum(pending)
+        # Рахуємо помилки (де бали < 0)
+        mistakes = (row["mistakes"] if row else 0) + sum(1 for p in pending if p < 0)
+        # Рахуємо ідеальні рішення (де бали > 0)
+        wisdoms = (row["wisdoms"] if row else 0) + sum(1 for p in pending if p > 0)
+
+        return {
+            "moves": total_moves,
+            "points": total_points,
+            "mistakes": mistakes,
+            "wisdoms": wisdoms,
+        }
 
     # Академія Стоїцизму
     async def create_academy_table(self):
@@ -399,8 +551,16 @@ class Database:
                 # Якщо констрейнт вже існує, база видасть помилку, ми її ігноруємо
                 pass
 
+            # 3. Індекс під keyset-пагінацію списку статей
+            await conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_academy_articles_month_day_id ON academy_articles (month, day, id)"
+            )
+
     async def get_article_by_date(self, day: int, month: int, lang: str = "ua"):
         """Отримує статтю на конкретну дату вибраною мовою"""
+        if self.bundle:
+            return self.bundle.article_by_date(day, month, lang)
+
         # Визначаємо колонки
         t_col = "title_en" if lang == "en" else "title"
         c_col = "content_en" if lang == "en" else "content"
@@ -444,104 +604,208 @@ class Database:
                 )
             """
             )
+            # Індекс під keyset-пагінацію Бібліотеки (найновіші спочатку)
+            await conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_academy_progress_user_read
+                ON user_academy_progress (user_id, read_at DESC, article_id DESC)
+                """
+            )
+
+            # МІГРАЦІЯ: лічильник вивчених статей у users замість COUNT(*) на кожну сторінку.
+            # При першому додаванні колонки заповнюємо її з існуючого прогресу.
+            has_counter = await conn.fetchval(
+                """
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'users' AND column_name = 'academy_count'
+                """
+            )
+            if not has_counter:
+                async with conn.transaction():
+                    await conn.execute(
+                        "ALTER TABLE users ADD COLUMN IF NOT EXISTS academy_count INTEGER DEFAULT 0"
+                    )
+                    await conn.execute(
+                        """
+                        UPDATE users u SET academy_count = p.cnt
+                        FROM (
+                            SELECT user_id, COUNT(*) AS cnt FROM user_academy_progress GROUP BY user_id
+                        ) p
+                        WHERE u.user_id = p.user_id
+                        """
+                    )
+
+            # МІГРАЦІЯ: бітмап прочитаних статей (біт = id статті).
+            # NULL означає "ще не зібрано" — збирається ліниво функцією academy_bitmap_of.
+            await conn.execute(
+                "ALTER TABLE users ADD COLUMN IF NOT EXISTS academy_bitmap BYTEA"
+            )
+            await conn.execute(
+                """
+                CREATE OR REPLACE FUNCTION academy_bitmap_of(p_user_id BIGINT) RETURNS BYTEA AS $$
+                    SELECT COALESCE(decode(string_agg(lpad(to_hex(b.val), 2, '0'), '' ORDER BY b.idx), 'hex'), ''::bytea)
+                    FROM (
+                        SELECT g.idx, COALESCE(bit_or(1 << (p.article_id % 8)), 0) AS val
+                        FROM generate_series(
+                            0,
+                            COALESCE((SELECT MAX(article_id) / 8 FROM user_academy_progress WHERE user_id = p_user_id), -1)
+                        ) AS g(idx)
+                        LEFT JOIN user_academy_progress p ON p.user_id = p_user_id AND p.article_id / 8 = g.idx
+                        GROUP BY g.idx
+                    ) b
+                $$ LANGUAGE sql STABLE
+                """
+            )
+            # Зарахування уроку одним викликом: денний ліміт, прогрес, бали, лічильник і бітмап.
+            # FOR UPDATE на рядку юзера — подвійний тап чи паралельний запит з додатку
+            # не проскочать ліміт. p_daily_limit NULL — без ліміту.
+            await conn.execute(
+                """
+                CREATE OR REPLACE FUNCTION complete_article(
+                    p_user_id BIGINT, p_article_id INT, p_daily_limit INT, p_reward INT
+                ) RETURNS TABLE (
+                    limit_reached BOOLEAN, is_new BOOLEAN, new_score INT,
+                    total_learned INT, daily_count INT, bitmap BYTEA
+                ) AS $$
+                BEGIN
+                    SELECT COALESCE(u.score, 0), COALESCE(u.academy_count, 0), u.academy_bitmap
+                    INTO new_score, total_learned, bitmap
+                    FROM users u WHERE u.user_id = p_user_id FOR UPDATE;
+                    IF NOT FOUND THEN
+                        RETURN;
+                    END IF;
+
+                    SELECT COUNT(*) INTO daily_count FROM user_academy_progress p
+                    WHERE p.user_id = p_user_id AND p.read_at >= CURRENT_DATE;
+
+                    limit_reached := FALSE;
+                    is_new := NOT EXISTS (
+                        SELECT 1 FROM user_academy_progress p
+                        WHERE p.user_id = p_user_id AND p.article_id = p_article_id
+                    );
+                    IF is_new AND daily_count >= p_daily_limit THEN
+                        limit_reached := TRUE;
+                        is_new := FALSE;
+                    END IF;
+
+                    IF is_new THEN
+                        INSERT INTO user_academy_progress (user_id, article_id) VALUES (p_user_id, p_article_id);
+                        UPDATE users u SET
+                            score = COALESCE(u.score, 0) + p_reward,
+                            academy_count = COALESCE(u.academy_count, 0) + 1,
+                            academy_bitmap = CASE
+                                WHEN u.academy_bitmap IS NULL THEN academy_bitmap_of(p_user_id)
+                                ELSE set_bit(
+                                    u.academy_bitmap || decode(repeat('00', GREATEST(0, p_article_id / 8 + 1 - length(u.academy_bitmap))), 'hex'),
+                                    p_article_id, 1
+                                )
+                            END
+                        WHERE u.user_id = p_user_id
+                        RETURNING u.score, u.academy_count, u.academy_bitmap INTO new_score, total_learned, bitmap;
+                        daily_count := daily_count + 1;
+                    ELSIF bitmap IS NULL THEN
+                        bitmap := academy_bitmap_of(p_user_id);
+                    END IF;
+                    RETURN NEXT;
+                END;
+                $$ LANGUAGE plpgsql
+                """
+            )
+
+    async def complete_article(self, user_id, article_id, daily_limit=ACADEMY_DAILY_LIMIT, score=ACADEMY_REWARD):
+        """
+        Зараховує урок одним запитом. Повертає dict (limit_reached, is_new, new_score,
+        total_learned, daily_count, rank) — досить, щоб перемалювати екран без дозапитів.
+        None — юзера немає.
+        """
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(
+                "SELECT * FROM complete_article($1, $2, $3, $4)",
+                user_id, article_id, daily_limit, max(score, 0)
+            )
+        if not row:
+            return None
+
+        # Відповідь містить увесь бітмап і денний лічильник — кеш прогресу стає точним
+        self.progress.put(user_id, UserProgress(bitmap_from_bytes(row["bitmap"]), row["daily_count"]))
+        self.limits.observe(user_id, "academy", row["daily_count"])
+        result = dict(row)
+        del result["bitmap"]
+        result["rank"] = get_academy_rank(result["total_learned"])
+        return result
+
+    def academy_limit_reached(self, user_id, article_id):
+        """
+        Відмова без БД: денну квоту уроків вичерпано, а статтю точно ще не прочитано.
+        Повторне відкриття прочитаної статті complete_article не рахує в квоту, тому
+        без прогресу в кеші (не знаємо, чи прочитана) рішення лишаємо базі.
+        """
+        if not self.limits.exhausted(user_id, "academy"):
+            return False
+        progress = self.progress.get(user_id)
+        return progress is not None and not progress.is_read(article_id)
 
     async def mark_article_as_read(self, user_id, article_id, score=ACADEMY_REWARD):
         """
-        Позначає статтю як прочитану.
+        Позначає статтю як прочитану (без денного ліміту).
         Повертає кортеж: (is_new: bool, new_total_score: int)
         """
+        result = await self.complete_article(user_id, article_id, daily_limit=None, score=score)
+        if not result:
+            return False, None
+        return result["is_new"], result["new_score"]
+
+    async def get_user_progress(self, user_id: int) -> UserProgress:
+        """Прогрес Академії з кешу; при промаху — один запит (з лінивою збіркою бітмапа)"""
+        progress = self.progress.get(user_id)
+        if progress:
+            return progress
+
         async with self.pool.acquire() as conn:
-            async with conn.transaction():
-                # 1. Пробуємо вставити запис у прогрес
-                # ON CONFLICT DO NOTHING гарантує, що ми не додамо дублікат
-                result = await conn.execute(
-                    """
-                    INSERT INTO user_academy_progress (user_id, article_id)
-                    VALUES ($1, $2) ON CONFLICT DO NOTHING
-                    """,
-                    user_id,
-                    article_id,
+            row = await conn.fetchrow(
+                """
+                WITH rebuilt AS (
+                    UPDATE users SET academy_bitmap = academy_bitmap_of($1)
+                    WHERE user_id = $1 AND academy_bitmap IS NULL
+                    RETURNING academy_bitmap
                 )
-                
-                # Якщо "INSERT 0 1" — значить вставили (стаття нова). 
-                # Якщо "INSERT 0 0" — значить вже була.
-                is_new = (result == "INSERT 0 1")
-
-                # 2. Оновлюємо або отримуємо рахунок
-                if is_new and score > 0:
-                    # Якщо стаття нова -> додаємо бали і одразу отримуємо нову суму
-                    new_total_score = await conn.fetchval(
-                        "UPDATE users SET score = score + $1 WHERE user_id = $2 RETURNING score",
-                        score, user_id
-                    )
-                else:
-                    # Якщо стаття стара (або балів 0) -> просто беремо поточний рахунок без змін
-                    new_total_score = await conn.fetchval(
-                        "SELECT score FROM users WHERE user_id = $1", 
-                        user_id
-                    )
-                
-                return is_new, new_total_score
+                SELECT
+                    COALESCE((SELECT academy_bitmap FROM rebuilt), u.academy_bitmap) AS bitmap,
+                    (
+                        SELECT COUNT(*) FROM user_academy_progress
+                        WHERE user_id = $1 AND read_at >= CURRENT_DATE
+                    ) AS daily
+                FROM users u WHERE u.user_id = $1
+                """,
+                user_id,
+            )
+        progress = UserProgress(
+            bitmap_from_bytes(row["bitmap"]) if row else 0,
+            row["daily"] if row else 0,
+        )
+        self.progress.put(user_id, progress)
+        return progress
 
     async def get_academy_progress(self, user_id: int, lang: str = "ua"):
         """Повертає кількість прочитаних статей та локалізований шкільний клас"""
-        async with self.pool.acquire() as conn:
-            count = await conn.fetchval(
-                "SELECT COUNT(*) FROM user_academy_progress WHERE user_id = $1", user_id
-            )
-
-            if count < 1:
-                rank = "👶 Preschooler (Not started)" if lang == "en" else "👶 Дошкільня (Ще не почав)"
-            elif count < 5:
-                rank = "1️⃣ Grade 1 (Novice)" if lang == "en" else "1️⃣ 1-й Клас (Новачок)"
-            elif count < 10:
-                rank = "2️⃣ Grade 2 (Curious)" if lang == "en" else "2️⃣ 2-й Клас (Допитливий)"
-            elif count < 20:
-                rank = "3️⃣ Grade 3 (Listener)" if lang == "en" else "3️⃣ 3-й Клас (Слухач)"
-            elif count < 35:
-                rank = "4️⃣ Grade 4 (Junior Student)" if lang == "en" else "4️⃣ 4-й Клас (Молодший учень)"
-            elif count < 50:
-                rank = "5️⃣ Grade 5 (Explorer)" if lang == "en" else "5️⃣ 5-й Клас (Дослідник)"
-            elif count < 70:
-                rank = "6️⃣ Grade 6 (Practitioner)" if lang == "en" else "6️⃣ 6-й Клас (Практик)"
-            elif count < 100:
-                rank = "7️⃣ Grade 7 (Logician)" if lang == "en" else "7️⃣ 7-й Клас (Логік)"
-            elif count < 150:
-                rank = "8️⃣ Grade 8 (Analyst)" if lang == "en" else "8️⃣ 8-й Клас (Аналітик)"
-            elif count < 200:
-                rank = "9️⃣ Grade 9 (Gymnasist)" if lang == "en" else "9️⃣ 9-й Клас (Гімназист)"
-            elif count < 300:
-                rank = "🔟 Grade 10 (Philosopher)" if lang == "en" else "🔟 10-й Клас (Філософ)"
-            elif count < 365:
-                rank = "1️⃣1️⃣ Grade 11 (Graduate)" if lang == "en" else "1️⃣1️⃣ 11-й Клас (Випускник)"
-            else:
-                rank = "🎓 Master of Stoicism (University)" if lang == "en" else "🎓 Магістр Стоїцизму (Університет)"
-
-            return count, rank
+        progress = await self.get_user_progress(user_id)
+        return progress.count, get_academy_rank(progress.count, lang)
 
     async def is_article_read(self, user_id, article_id):
         """Перевіряє, чи читав користувач цю статтю раніше"""
-        async with self.pool.acquire() as conn:
-            exists = await conn.fetchval(
-                "SELECT 1 FROM user_academy_progress WHERE user_id = $1 AND article_id = $2",
-                user_id,
-                article_id,
-            )
-            return bool(exists)
+        progress = await self.get_user_progress(user_id)
+        return progress.is_read(article_id)
 
     async def get_daily_academy_count(self, user_id):
         """Рахує кількість уроків, засвоєних сьогодні"""
-        async with self.pool.acquire() as conn:
-            return await conn.fetchval(
-                """
-                SELECT COUNT(*) FROM user_academy_progress 
-                WHERE user_id = $1 AND read_at::date = CURRENT_DATE
-                """,
-                user_id,
-            )
+        progress = await self.get_user_progress(user_id)
+        return progress.today_count()
 
     async def get_article_by_id(self, article_id: int, lang: str = "ua"):
         """Отримує статтю за ID вибраною мовою"""
+        if self.bundle:
+            return self.bundle.article_by_id(article_id, lang)
+
         t_col = "title_en" if lang == "en" else "title"
         c_col = "content_en" if lang == "en" else "content"
         r_col = "reflection_en" if lang == "en" else "reflection"
@@ -559,7 +823,10 @@ class Database:
         now = datetime.now()
         current_day = now.day
         current_month = now.month
-        
+
+        if self.bundle:
+            return self.bundle.article_by_date(current_day, current_month, lang) or self.bundle.article_by_id(1, lang)
+
         # Визначаємо колонки
         t_col = "title_en" if lang == "en" else "title"
         c_col = "content_en" if lang == "en" else "content"
@@ -582,6 +849,25 @@ class Database:
             
             return dict(row) if row else None
 
+    async def get_articles_json(self, limit=50, offset=0, lang: str = "ua"):
+        """Список статей (id, day, month, title) готовим JSON-масивом з Postgres"""
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval(
+                _ARTICLES_JSON_SQL["en" if lang == "en" else "ua"], limit, offset
+            )
+
+    async def get_articles_page_json(self, after=(0, 0, 0), limit=50, lang: str = "ua"):
+        """
+        Keyset-сторінка статей після ключа after = (month, day, id).
+        Повертає (items_json, has_more, last_key): items — компактні масиви [id, day, month, title].
+        """
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(
+                _ARTICLES_PAGE_SQL["en" if lang == "en" else "ua"], *after, limit
+            )
+            last_key = (row["last_month"], row["last_day"], row["last_id"]) if row["last_id"] else None
+            return row["items"], row["has_more"], last_key
+
     async def get_user_library(self, user_id, limit=5, offset=0):
         """Повертає список вивчених статей з пагінацією"""
         async with self.pool.acquire() as conn:
@@ -600,12 +886,45 @@ class Database:
             )
             return [dict(row) for row in rows]
 
-    async def count_user_library(self, user_id):
-        """Рахує загальну кількість вивчених статей"""
+    async def get_user_library_page(self, user_id, limit=10, older_than=None, newer_than=None):
+        """
+        Keyset-сторінка Бібліотеки за ключем (read_at, article_id), найновіші спочатку.
+        older_than — наступна сторінка, newer_than — попередня.
+        Повертає (articles, has_more): has_more — чи є ще записи в цьому ж напрямку.
+        """
         async with self.pool.acquire() as conn:
-            return await conn.fetchval(
-                "SELECT COUNT(*) FROM user_academy_progress WHERE user_id = $1", user_id
+            if newer_than:
+                rows = await conn.fetch(
+                    """
+                    SELECT a.id, a.title, a.day, a.month, u.read_at
+                    FROM user_academy_progress u
+                    JOIN academy_articles a ON a.id = u.article_id
+                    WHERE u.user_id = $1 AND (u.read_at, u.article_id) > ($2, $3)
+                    ORDER BY u.read_at ASC, u.article_id ASC
+                    LIMIT $4
+                    """,
+                    user_id, *newer_than, limit + 1,
+                )
+                return [dict(row) for row in reversed(rows[:limit])], len(rows) > limit
+
+            cursor = older_than or (datetime.max, 0)
+            rows = await conn.fetch(
+                """
+                SELECT a.id, a.title, a.day, a.month, u.read_at
+                FROM user_academy_progress u
+                JOIN academy_articles a ON a.id = u.article_id
+                WHERE u.user_id = $1 AND (u.read_at, u.article_id) < ($2, $3)
+                ORDER BY u.read_at DESC, u.article_id DESC
+                LIMIT $4
+                """,
+                user_id, *cursor, limit + 1,
             )
+            return [dict(row) for row in rows[:limit]], len(rows) > limit
+
+    async def count_user_library(self, user_id):
+        """Кількість вивчених статей (з кешу прогресу, без COUNT(*))"""
+        progress = await self.get_user_progress(user_id)
+        return progress.count
 
     # --- НОВІ ТАБЛИЦІ ДЛЯ ЦИТАТ ТА ГРИ ---
     async def create_content_tables(self):
@@ -649,45 +968,67 @@ class Database:
     async def create_lab_tables(self):
         """Створює таблицю історії для Stoic Lab"""
         async with self.pool.acquire() as conn:
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS lab_history (
-                    id SERIAL PRIMARY KEY,
-                    user_id BIGINT,
-                    practice_type TEXT,
-                    score_earned INTEGER,
-                    completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    CONSTRAINT fk_lab_user FOREIGN KEY(user_id) REFERENCES users(user_id) ON DELETE CASCADE
-                )
-            """)
+            await partitions.ensure_table(conn, "lab_history")
+            # Атомарне зарахування сесії: FOR UPDATE на рядку юзера серіалізує паралельні
+            # та повторні запити, тож сума за сьогодні не може проскочити денний ліміт
+            await conn.execute(
+                """
+                CREATE OR REPLACE FUNCTION complete_lab_session(
+                    p_user_id BIGINT, p_practice_type TEXT, p_score INT, p_daily_limit INT
+                ) RETURNS TABLE (added_score INT, total_score INT) AS $$
+                DECLARE
+                    v_today INT;
+                BEGIN
+                    SELECT COALESCE(u.score, 0) INTO total_score
+                    FROM users u WHERE u.user_id = p_user_id FOR UPDATE;
+                    IF NOT FOUND THEN
+                        RETURN;
+                    END IF;
+
+                    SELECT COALESCE(SUM(h.score_earned), 0) INTO v_today
+                    FROM lab_history h
+                    WHERE h.user_id = p_user_id
+                      AND h.completed_at >= CURRENT_DATE AND h.completed_at < CURRENT_DATE + 1;
+
+                    -- Коригування "хвоста": ліміт 50, вже є 48, заробив 5 -> даємо тільки 2
+                    added_score := GREATEST(LEAST(p_score, p_daily_limit - v_today), 0);
+                    IF added_score > 0 THEN
+                        UPDATE users u SET score = COALESCE(u.score, 0) + added_score
+                        WHERE u.user_id = p_user_id
+                        RETURNING u.score INTO total_score;
+                        INSERT INTO lab_history (user_id, practice_type, score_earned)
+                        VALUES (p_user_id, p_practice_type, added_score);
+                    END IF;
+                    RETURN NEXT;
+                END;
+                $$ LANGUAGE plpgsql
+                """
+            )
 
-    async def save_lab_practice(self, user_id: int, practice_type: str, score: int):
-        """Оновлює бали юзера та записує практику в історію (транзакція)"""
+    async def complete_lab_practice(self, user_id: int, practice_type: str, score: int, daily_limit: int):
+        """
+        Зараховує сесію Лабораторії одним викликом complete_lab_session: денний ліміт,
+        бали та історія під локом рядка юзера. Повертає (added_score, total_score) або None.
+        """
         async with self.pool.acquire() as conn:
-            async with conn.transaction():
-                # 1. Оновлюємо бали в таблиці users
-                await conn.execute(
-                    "UPDATE users SET score = score + $1 WHERE user_id = $2",
-                    score, user_id
-                )
-                # 2. Записуємо в лог лаби
-                await conn.execute(
-                    """
-                    INSERT INTO lab_history (user_id, practice_type, score_earned)
-                    VALUES ($1, $2, $3)
-                    """,
-                    user_id, practice_type, score
-                )
-                # Повертаємо новий рахунок
-                new_score = await conn.fetchval("SELECT score FROM users WHERE user_id = $1", user_id)
-                return new_score
-            
+            row = await conn.fetchrow(
+                "SELECT added_score, total_score FROM complete_lab_session($1, $2, $3, $4)",
+                user_id, practice_type, score, daily_limit
+            )
+        if not row:
+            return None
+        if row["added_score"] < score:
+            # Ліміт обрізав сесію — далі сьогодні відмовляємо в пам'яті, без локу в БД
+            self.limits.observe(user_id, "lab_points", daily_limit)
+        return row["added_score"], row["total_score"]
+
     async def get_today_lab_points(self, user_id: int) -> int:
         """Рахує суму score_earned за сьогоднішню дату"""
         async with self.pool.acquire() as conn:
             total = await conn.fetchval(
                 """
                 SELECT SUM(score_earned) FROM lab_history 
-                WHERE user_id = $1 AND completed_at::date = CURRENT_DATE
+                WHERE user_id = $1 AND completed_at >= CURRENT_DATE AND completed_at < CURRENT_DATE + 1
                 """,
                 user_id
             )
@@ -695,6 +1036,9 @@ class Database:
             return total if total else 0
 
     async def get_random_quote(self):
+        if self.bundle:
+            return self.bundle.random_quote()
+
         async with self.pool.acquire() as conn:
             row = await conn.fetchrow(
                 "SELECT text, author, category FROM quotes ORDER BY RANDOM() LIMIT 1"
@@ -702,6 +1046,9 @@ class Database:
             return dict(row) if row else None
 
     async def get_scenario_by_level(self, level: int, lang: str = "ua"):
+        if self.bundle:
+            return self.bundle.scenario(level, lang)
+
         async with self.pool.acquire() as conn:
             # Вибираємо колонку залежно від мови
             text_col = "text_en" if lang == "en" else "text"
@@ -732,6 +1079,9 @@ class Database:
             
     async def get_scenarios_count(self):
         """Повертає загальну кількість сценаріїв у базі"""
+        if self.bundle:
+            return self.bundle.scenarios_count()
+
         async with self.pool.acquire() as conn:
             return await conn.fetchval("SELECT COUNT(*) FROM scenarios")
 
@@ -784,78 +1134,44 @@ class Database:
                 limit,
             )
             
-    async def check_ai_limit(self, user_id: int, limit_per_day: int = 50):
-        """
-        Перевіряє, чи можна юзеру писати AI.
-        Повертає True, якщо можна. Викидає помилку або повертає False, якщо ні.
-        """
+    async def get_mentor_history_json(self, user_id, limit=50):
+        """Історія Ментора готовим JSON-масивом з Postgres (без Record -> dict -> JSON)"""
         async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT ai_message_count, last_ai_request, last_ai_reset FROM users WHERE user_id = $1", 
-                user_id
-            )
-            
-            if not row: return False
-            
-            count = row['ai_message_count']
-            last_req = row['last_ai_request']
-            last_reset = row['last_ai_reset']
-            now = datetime.now() # Тут треба import datetime
-            today = now.date()
-
-            # 1. Скидання лічильника, якщо настав новий день
-            if last_reset < today:
-                count = 0
-                await conn.execute(
-                    "UPDATE users SET ai_message_count = 0, last_ai_reset = $1 WHERE user_id = $2",
-                    today, user_id
-                )
-
-            # 2. Перевірка Кулдауну (спам-фільтр): 5 секунд
-            if last_req:
-                # Конвертуємо в naive datetime, якщо треба, або просто порівнюємо
-                # (залежить від налаштувань БД, спростимо:)
-                diff = (now - last_req).total_seconds()
-                if diff < 5: 
-                    return "cooldown" # Занадто швидко
-
-            # 3. Перевірка Денного ліміту
-            if count >= limit_per_day:
-                return "limit_reached"
-
-            # Якщо все ок - збільшуємо лічильник
-            await conn.execute(
+            return await conn.fetchval(
                 """
-                UPDATE users 
-                SET ai_message_count = ai_message_count + 1, 
-                    last_ai_request = $1 
-                WHERE user_id = $2
+                SELECT COALESCE(json_agg(t ORDER BY t.created_at DESC), '[]'::json)::text
+                FROM (
+                    SELECT role, content, created_at
+                    FROM mentor_history
+                    WHERE user_id = $1
+                    ORDER BY created_at DESC
+                    LIMIT $2
+                ) t
                 """,
-                now, user_id
+                user_id,
+                limit,
             )
-            
-            return "ok"
+
+    async def check_ai_limit(self, user_id: int):
+        """
+        Перевіряє, чи можна юзеру писати AI, і якщо так — списує повідомлення.
+        Повертає "ok", "cooldown" (пауза AI_COOLDOWN_SECONDS) або "limit_reached" (денний ліміт).
+        """
+        blocked = await self.limits.acquire(user_id, "ai_cooldown", "ai_daily")
+        if blocked == "ai_cooldown":
+            return "cooldown"
+        if blocked == "ai_daily":
+            return "limit_reached"
+        return "ok"
       
-    # Повне видалення користувача та всіх пов'язаних даних   
-    async def delete_user_data(self, user_id: int):
-        """Повне видалення користувача та всіх пов'язаних даних (Compliance check)"""
+    # Повне видалення користувача та всіх пов'язаних даних
+    async def create_erasure_tables(self):
+        """erasure_jobs, індекси по user_id та каскадні FK (викликати після решти create_*)"""
         async with self.pool.acquire() as conn:
-            async with conn.transaction():
-                # 1. Видаляємо дані з таблиць, де немає автоматичного CASCADE
-                await conn.execute("DELETE FROM journal WHERE user_id = $1", user_id)
-                await conn.execute("DELETE FROM game_history WHERE user_id = $1", user_id)
-                await conn.execute("DELETE FROM user_academy_progress WHERE user_id = $1", user_id)
-                
-                # 2. Таблиці mentor_history, sync_codes та lab_history 
-                # мають CONSTRAINT ... ON DELETE CASCADE, тому вони видаляться 
-                # автоматично при видаленні з таблиці users. 
-                # Але ми можемо додати їх явно для надійності:
-                await conn.execute("DELETE FROM mentor_history WHERE user_id = $1", user_id)
-                await conn.execute("DELETE FROM sync_codes WHERE user_id = $1", user_id)
-                await conn.execute("DELETE FROM lab_history WHERE user_id = $1", user_id)
-
-                # 3. Видаляємо самого користувача (головний тригер)
-                result = await conn.execute("DELETE FROM users WHERE user_id = $1", user_id)
-                
-                # Повертаємо True, якщо користувач був видалений
-                return result == "DELETE 1"
+            await erasure.create_tables(conn)
+
+    async def delete_user_data(self, user_id: int):
+        """Повне видалення користувача та всіх пов'язаних даних (Compliance check), одразу, без задачі"""
+        timings = await self.erasure.erase(user_id)
+        # True, якщо користувач був видалений
+        return timings["users"]["rows"] == 1
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import time
+import uuid
+
+import metrics
+
+# Видалення акаунта (право на забуття). Ендпоінт лише створює задачу в erasure_jobs
+# і одразу повертає її id; дані видаляються у фоні порціями по CHUNK_SIZE рядків
+# короткими окремими інструкціями, щоб не тримати локи і не гальмувати інший трафік.
+
+CHUNK_SIZE = 5000
+# Пауза між порціями: віддаємо пул і диск живим запитам
+CHUNK_PAUSE = 0.02
+
+
+class ErasureTable:
+    def __init__(self, name, key, index=None):
+        self.name = name
+        # Ключ рядка для адресного DELETE порції (для партицій — разом з ключем партиції)
+        self.key = key
+        # Індекс по user_id, без якого кожна порція сканувала б усю таблицю
+        self.index = index
+
+    def chunk_sql(self):
+        key = ", ".join(self.key)
+        return f"""
+            DELETE FROM {self.name} WHERE ({key}) IN (
+                SELECT {key} FROM {self.name} WHERE user_id = $1 LIMIT $2
+            )
+        """
+
+
+# Порядок видалення. journal і mentor_history мають індекси з міграції історії (db._HISTORY_INDEXES).
+# game_history та daily_user_stats без FK: їх пише буфер ходів, і пачка з ходом
+# щойно видаленого юзера не повинна падати назавжди — тому чистимо їх явно.
+TABLES = [
+    ErasureTable("game_history", ("id", "played_at"),
+                 "CREATE INDEX IF NOT EXISTS idx_game_history_user ON game_history (user_id, played_at)"),
+    ErasureTable("daily_user_stats", ("user_id", "day")),
+    ErasureTable("mentor_history", ("id", "created_at")),
+    ErasureTable("journal", ("id", "created_at")),
+    ErasureTable("lab_history", ("id", "completed_at"),
+                 "CREATE INDEX IF NOT EXISTS idx_lab_history_user ON lab_history (user_id, completed_at)"),
+    ErasureTable("user_academy_progress", ("user_id", "article_id")),
+    ErasureTable("rate_limits", ("user_id", "name")),
+    ErasureTable("sync_codes", ("code",),
+                 "CREATE INDEX IF NOT EXISTS idx_sync_codes_user ON sync_codes (user_id)"),
+]
+
+# Каскад як страховка: рядок, що проскочив між порціями, піде разом з users
+_CASCADE_FKS = [
+    ("user_academy_progress", "fk_academy_progress_user"),
+]
+
+
+async def create_tables(conn):
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS erasure_jobs (
+            id UUID PRIMARY KEY,
+            user_id BIGINT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending', -- pending / running / done / failed
+            timings JSONB NOT NULL DEFAULT '{}'::jsonb,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+        """
+    )
+    for table in TABLES:
+        if table.index:
+            await conn.execute(table.index)
+    for table, constraint in _CASCADE_FKS:
+        exists = await conn.fetchval("SELECT 1 FROM pg_constraint WHERE conname = $1", constraint)
+        if not exists:
+            # NOT VALID: старі рядки не перевіряємо (і не блокуємо таблицю скануванням)
+            await conn.execute(
+                f"""
+                ALTER TABLE {table} ADD CONSTRAINT {constraint}
+                FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE NOT VALID
+                """
+            )
+
+
+class ErasureService:
+    def __init__(self, db, chunk_size=CHUNK_SIZE, chunk_pause=CHUNK_PAUSE):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.chunk_pause = chunk_pause
+        self._tasks = set()
+
+    async def start(self, user_id):
+        """Створює задачу і запускає її у фоні. Повертає id задачі або None, якщо юзера немає."""
+        async with self.db.pool.acquire() as conn:
+            if not await conn.fetchval("SELECT 1 FROM users WHERE user_id = $1", user_id):
+                return None
+            job_id = await conn.fetchval(
+                "INSERT INTO erasure_jobs (id, user_id) VALUES ($1, $2) RETURNING id",
+                uuid.uuid4(),
+                user_id,
+            )
+        self._spawn(job_id, user_id)
+        return str(job_id)
+
+    def _spawn(self, job_id, user_id):
+        task = metrics.background_task(self.run(job_id, user_id), "erasure")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def resume(self):
+        """Після рестарту процесу доводимо незавершені задачі (видалення ідемпотентне)"""
+        async with self.db.pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT id, user_id FROM erasure_jobs WHERE status IN ('pending', 'running')"
+            )
+        for row in rows:
+            self._spawn(row["id"], row["user_id"])
+
+    async def get_job(self, job_id):
+        try:
+            job_uuid = uuid.UUID(job_id)
+        except ValueError:
+            return None
+        async with self.db.pool.acquire() as conn:
+            row = await conn.fetchrow(
+                "SELECT id, status, timings::text, error, created_at, finished_at FROM erasure_jobs WHERE id = $1",
+                job_uuid,
+            )
+        if not row:
+            return None
+        job = dict(row)
+        job["id"] = str(job["id"])
+        job["timings"] = json.loads(job["timings"])
+        return job
+
+    async def run(self, job_id, user_id):
+        async with self.db.pool.acquire() as conn:
+            await conn.execute("UPDATE erasure_jobs SET status = 'running' WHERE id = $1", job_id)
+        try:
+            timings = await self.erase(user_id)
+        except Exception as e:
+            print(f"❌ Erasure job {job_id} failed: {e}")
+            async with self.db.pool.acquire() as conn:
+                await conn.execute(
+                    "UPDATE erasure_jobs SET status = 'failed', error = $2, finished_at = NOW() WHERE id = $1",
+                    job_id,
+                    str(e),
+                )
+            return
+        async with self.db.pool.acquire() as conn:
+            await conn.execute(
+                """
+                UPDATE erasure_jobs SET status = 'done', timings = $2::jsonb, finished_at = NOW()
+                WHERE id = $1
+                """,
+                job_id,
+                json.dumps(timings),
+            )
+
+    async def erase(self, user_id):
+        """
+        Видаляє всі дані юзера. Повертає {таблиця: {"rows": n, "ms": t}};
+        timings["users"]["rows"] == 1 означає, що юзер існував.
+        """
+        # Спершу дописуємо буфер, щоб ходи юзера не з'явились у БД після видалення
+        await self.db.moves.flush()
+        timings = {}
+        for table in TABLES:
+            timings[table.name] = await self._erase_table(table, user_id)
+
+        # Фінал однією короткою транзакцією: хвости, що дописались за час порцій, і сам юзер
+        started = time.perf_counter()
+        async with self.db.pool.acquire() as conn:
+            async with conn.transaction():
+                for table in TABLES:
+                    result = await conn.execute(f"DELETE FROM {table.name} WHERE user_id = $1", user_id)
+                    timings[table.name]["rows"] += int(result.split()[-1])
+                result = await conn.execute("DELETE FROM users WHERE user_id = $1", user_id)
+        timings["users"] = {"rows": int(result.split()[-1]), "ms": round((time.perf_counter() - started) * 1000, 2)}
+        self.db.progress.invalidate(user_id)
+        self.db.limits.forget(user_id)
+        return timings
+
+    async def _erase_table(self, table, user_id):
+        sql = table.chunk_sql()
+        rows = 0
+        started = time.perf_counter()
+        while True:
+            async with self.db.pool.acquire() as conn:
+                result = await conn.execute(sql, user_id, self.chunk_size)
+            deleted = int(result.split()[-1])
+            rows += deleted
+            if deleted < self.chunk_size:
+                break
+            await asyncio.sleep(self.chunk_pause)
+        return {"rows": rows, "ms": round((time.perf_counter() - started) * 1000, 2)}
@@ -0,0 +1,105 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+# HTTP-кешування контенту API: сильні ETag з хешу тіла, If-None-Match -> 304,
+# та кеш уже серіалізованих тіл, щоб повторні запити не кодували JSON заново.
+
+# Контент однаковий для всіх юзерів, але маршрути вимагають Authorization,
+# тому лише кеш клієнта: спільний кеш (CDN) віддав би відповідь чужим і анонімам.
+# Довге stale — тільки для контенту з бандла (версія змінюється лише при перезбірці)
+CONTENT_CACHE_CONTROL = "private, max-age=300, stale-while-revalidate=86400"
+# Контент напряму з бази може змінитися будь-коли: без stale-вікна
+DB_CONTENT_CACHE_CONTROL = "private, max-age=300"
+# Персональні відповіді: тільки кеш клієнта і завжди з ревалідацією
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+def serialize(payload) -> bytes:
+    return orjson.dumps(payload, default=str)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON-відповідь через orjson (своя, бо fastapi.responses.ORJSONResponse застаріла)"""
+
+    def render(self, content) -> bytes:
+        return serialize(content)
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+class CachedBody:
+    __slots__ = ("body", "etag", "expires_at")
+
+    def __init__(self, body: bytes, expires_at=None):
+        self.body = body
+        self.etag = make_etag(body)
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """LRU-кеш серіалізованих відповідей. ttl=None — запис живе до зміни версії контенту."""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+
+    def get(self, key):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        if item.expires_at is not None and item.expires_at < time.monotonic():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return item
+
+    def put(self, key, payload, ttl=None):
+        return self.put_body(key, serialize(payload), ttl)
+
+    def put_body(self, key, body: bytes, ttl=None):
+        """Кладе вже готове JSON-тіло (наприклад, json_agg з Postgres)"""
+        item = CachedBody(body, time.monotonic() + ttl if ttl else None)
+        self._items[key] = item
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+        return item
+
+    def clear(self):
+        self._items.clear()
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Для If-None-Match порівняння слабке: W/"x" == "x"
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def cached_response(request: Request, item: CachedBody, cache_control=CONTENT_CACHE_CONTROL) -> Response:
+    """200 з готовим тілом або 304, якщо у клієнта вже є ця версія"""
+    headers = {"ETag": item.etag, "Cache-Control": cache_control}
+    if etag_matches(request, item.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=item.body, media_type="application/json", headers=headers)
+
+
+def conditional_response(request: Request, payload, cache_control=PRIVATE_CACHE_CONTROL) -> Response:
+    """ETag/304 для відповіді, яку не можна класти в спільний кеш"""
+    return cached_response(request, CachedBody(serialize(payload)), cache_control)
@@ -0,0 +1,197 @@
+from functools import lru_cache
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+# Рендер-шар бота: статичні клавіатури та тексти будуються один раз при імпорті,
+# динамічні екрани (Академія, Бібліотека, Gym) — з мемоізованих фрагментів.
+
+
+def _single(text, callback_data):
+    return InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text=text, callback_data=callback_data)]])
+
+
+def _build_main_menu():
+    """Головне меню"""
+    builder = InlineKeyboardBuilder()
+    builder.button(text="⚔️ Stoic Gym (Гра)", callback_data="mode_gym")
+    builder.button(text="📖 Академія (Теорія)", callback_data="mode_academy")
+    builder.button(text="🤖 Ментор (AI)", callback_data="mode_ai")
+    builder.button(
+        text="🧘‍♂️ Lab (Лабараторні)", url="https://t.me/StoicTrainerLab_ua_bot"
+    )
+    builder.button(text="🧙‍♂️ Оракул (Цитати)", callback_data="mode_quotes")
+    builder.button(text="⏳ Memento Mori (Час)", callback_data="mode_memento")
+    builder.button(text="👤 Мій Профіль", callback_data="mode_profile")
+    builder.button(text="🏆 Топ Стоїків", callback_data="mode_top")
+    builder.button(text="📚 Допомога", callback_data="show_help")
+    builder.button(text="✉️ Написати автору", callback_data="send_feedback")
+    builder.adjust(1, 1, 2, 2, 2, 2)
+    return builder.as_markup()
+
+
+def _build_menu(*buttons):
+    """Вертикальне меню з пар (текст, callback_data)"""
+    builder = InlineKeyboardBuilder()
+    for text, callback_data in buttons:
+        builder.button(text=text, callback_data=callback_data)
+    builder.adjust(1)
+    return builder.as_markup()
+
+
+# --- СТАТИЧНІ КЛАВІАТУРИ ---
+MAIN_MENU = _build_main_menu()
+
+QUOTE_KEYBOARD = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [InlineKeyboardButton(text="🔄 Інша цитата", callback_data="refresh_quote")],
+        [InlineKeyboardButton(text="🔙 В меню", callback_data="back_home")],
+    ]
+)
+
+BACK_HOME_KB = _single("🔙 В меню", "back_home")
+BACK_HOME_ALT_KB = _single("🔙 Назад в меню", "back_home")
+CANCEL_KB = _single("🔙 Скасувати", "back_home")
+MENTOR_EXIT_KB = _single("🔙 Вийти з діалогу", "back_home")
+MENTOR_END_KB = _single("🔙 Завершити", "back_home")
+JOURNAL_BACK_KB = _single("🔙 Назад", "mode_profile")
+ACADEMY_BACK_KB = _single("🔙 В Академію", "mode_academy")
+
+MEMENTO_KB = _build_menu(("🔄 Змінити дату", "reset_memento"), ("🔙 В меню", "back_home"))
+ENERGY_OUT_KB = _build_menu(("📝 Запис у щоденник", "journal_write"), ("🔙 В меню", "back_home"))
+
+GYM_MENU_KB = _build_menu(("▶️ Продовжити тренування", "game_start"), ("🔙 В меню", "back_home"))
+GYM_MENU_WITH_RESET_KB = _build_menu(
+    ("▶️ Продовжити тренування", "game_start"),
+    ("🔄 Почати заново", "reset_gym_confirm"),
+    ("🔙 В меню", "back_home"),
+)
+
+
+def _build_reset_confirm():
+    builder = InlineKeyboardBuilder()
+    builder.button(text="✅ Так, скинути все", callback_data="reset_gym_final")
+    builder.button(text="❌ Ні, повернутися", callback_data="mode_gym")
+    return builder.as_markup()
+
+
+RESET_CONFIRM_KB = _build_reset_confirm()
+RESET_DONE_KB = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [InlineKeyboardButton(text="▶️ Почати тренування", callback_data="game_start")],
+        [InlineKeyboardButton(text="🔙 В меню", callback_data="back_home")],
+    ]
+)
+
+
+def _build_game_result(has_energy):
+    kb = InlineKeyboardBuilder()
+    kb.button(text="🔙 В меню", callback_data="back_home")
+    # Якщо енергії 0, міняємо кнопку на "Підсумок", щоб юзер розумів, що це кінець
+    if has_energy:
+        kb.button(text="▶️ Продовжити", callback_data="game_next")
+    else:
+        kb.button(text="📊 Підсумок дня", callback_data="game_next")
+    kb.adjust(2)
+    return kb.as_markup()
+
+
+GAME_RESULT_KB = _build_game_result(True)
+GAME_RESULT_LAST_KB = _build_game_result(False)
+
+# --- СТАТИЧНІ ТЕКСТИ ---
+HOME_TEXT = "👋 **Вітаю в Stoic Trainer!**\n\nОбери режим для тренування духу:"
+
+RESET_CONFIRM_TEXT = (
+    "⚠️ **Увага!** Ти впевнений, що хочеш скинути свій прогрес?\n"
+    "Твій рахунок і рівень будуть обнулені."
+)
+
+RESET_DONE_TEXT = (
+    "✅ **Прогрес скинуто!**\n\n"
+    "Твій шлях стоїка починається знову. Натисни 'Почати тренування'."
+)
+
+MENTOR_INTRO_TEXT = (
+    "🤖 **Зал Роздумів**\n\n"
+    "Я — цифрова тінь Марка Аврелія. Я тут, щоб вислухати твої тривоги.\n\n"
+    "👇 Напиши мені, що тебе турбує, або запитай поради. \n"
+    "_(Наприклад: 'Як перестати злитися на колег?' або 'Я втратив мотивацію')_"
+)
+
+JOURNAL_INTRO_TEXT = (
+    "📝 **Щоденник Стоїка**\n\n"
+    "Марк Аврелій писав: «Наші думки визначають якість нашого життя».\n\n"
+    "👇Запиши свій головний урок за сьогодні або те, за що ти вдячний. "
+    "Це допоможе закріпити мудрість на практиці."
+)
+
+FEEDBACK_INTRO_TEXT = (
+    "✉️ **Зв'язок з розробником**\n\n"
+    "Напиши своє повідомлення (відгук, ідею або знайдену помилку) і я передам його автору.\n\n"
+    "👇 *Чекаю на твій текст:*"
+)
+
+# --- ДИНАМІЧНІ ЕКРАНИ (мемоізовані фрагменти) ---
+GAME_LABELS = ["A", "B", "C", "D"]
+
+
+@lru_cache(maxsize=2048)
+def academy_keyboard(article_id, day, month, is_read, limit_reached):
+    """Клавіатура статті Академії. Варіантів небагато: ~366 статей × 3 стани."""
+    kb = InlineKeyboardBuilder()
+
+    if limit_reached and not is_read:
+        next_callback = "academy_limit_reached"
+        next_text = "➡️ (Відпочинок)"
+    else:
+        next_callback = f"academy_nav_next_{day}_{month}"
+        next_text = "➡️ Наступний"
+
+    if is_read:
+        kb.button(text="🌟 Вже вивчено", callback_data="academy_already_done")
+    else:
+        kb.button(text="Зарахувати урок (+5 балів)", callback_data=f"academy_read_{article_id}")
+
+    kb.button(text="⬅️ Минулий", callback_data=f"academy_nav_prev_{day}_{month}")
+    kb.button(text=next_text, callback_data=next_callback)
+    kb.button(text="🔙 В меню", callback_data="back_home")
+    kb.button(text="📚 Бібліотека", callback_data="library_page_0")
+    kb.adjust(1, 2, 2)
+    return kb.as_markup()
+
+
+@lru_cache(maxsize=4096)
+def library_article_button(article_id, day, month, title):
+    """Кнопка статті в Бібліотеці (однакова для всіх юзерів)"""
+    title = title[:23] + ".." if len(title) > 25 else title
+    return InlineKeyboardButton(text=f"📜 {day:02d}.{month:02d} | {title}", callback_data=f"library_open_{article_id}")
+
+
+def library_keyboard(articles, prev_data=None, next_data=None):
+    """Збирає сторінку Бібліотеки з готових кнопок. prev/next_data — callback з курсором або None."""
+    rows = [
+        [library_article_button(art["id"], art["day"], art["month"], art["title"])]
+        for art in articles
+    ]
+    nav_buttons = []
+    if prev_data:
+        nav_buttons.append(InlineKeyboardButton(text="⬅️ Туди", callback_data=prev_data))
+    if next_data:
+        nav_buttons.append(InlineKeyboardButton(text="Сюди ➡️", callback_data=next_data))
+    if nav_buttons:
+        rows.append(nav_buttons)
+    rows.append([InlineKeyboardButton(text="🔙 В Академію", callback_data="mode_academy")])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+@lru_cache(maxsize=512)
+def game_choices_keyboard(scenario_id, option_ids):
+    """Кнопки варіантів для сценарію. option_ids — кортеж у порядку показу."""
+    builder = InlineKeyboardBuilder()
+    for i, opt_id in enumerate(option_ids):
+        lbl = GAME_LABELS[i] if i < len(GAME_LABELS) else str(i + 1)
+        builder.button(text=f"🔹 {lbl}", callback_data=f"anygame_{scenario_id}_{opt_id}")
+    builder.button(text="🔙 В меню", callback_data="back_home")
+    builder.adjust(2, 2, 1)
+    return builder.as_markup()
@@ -2,31 +2,68 @@ import asyncio
 import logging
 import os
 import random
+import time
 from datetime import datetime
 from urllib.parse import quote
-from constants import ACADEMY_REWARD
+from constants import ACADEMY_DAILY_LIMIT, ACADEMY_REWARD, AI_COOLDOWN_SECONDS, GYM_DAILY_ENERGY
 
 from aiogram import Bot, Dispatcher, F, types
 from aiogram import html
 from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from dotenv import load_dotenv
 
 from academy_service import format_article
+import sync_service
 from ai_service import get_stoic_advice
+from bot_middleware import UserSerializeMiddleware
+import metrics
+import query_trace
 from data import HELP_TEXT
 from db import Database
-from utils import get_stoic_rank
+from pagination import datetime_to_micros, micros_to_datetime
+from keyboards import (
+    ACADEMY_BACK_KB,
+    BACK_HOME_ALT_KB,
+    BACK_HOME_KB,
+    CANCEL_KB,
+    ENERGY_OUT_KB,
+    FEEDBACK_INTRO_TEXT,
+    GAME_LABELS,
+    GAME_RESULT_KB,
+    GAME_RESULT_LAST_KB,
+    GYM_MENU_KB,
+    GYM_MENU_WITH_RESET_KB,
+    HOME_TEXT,
+    JOURNAL_BACK_KB,
+    JOURNAL_INTRO_TEXT,
+    MAIN_MENU,
+    MEMENTO_KB,
+    MENTOR_END_KB,
+    MENTOR_EXIT_KB,
+    MENTOR_INTRO_TEXT,
+    QUOTE_KEYBOARD,
+    RESET_CONFIRM_KB,
+    RESET_CONFIRM_TEXT,
+    RESET_DONE_KB,
+    RESET_DONE_TEXT,
+    academy_keyboard,
+    game_choices_keyboard,
+    library_keyboard,
+)
+from utils import STOIC_RANKS
 
 # --- НАЛАШТУВАННЯ ---
 load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
+# Власний Bot API server або заглушка навантажувального тесту (benchmarks/fakes.py)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")
 
 # --- FSM: СТАНИ ---
 class MementoMori(StatesGroup):
@@ -47,34 +84,25 @@ db = Database()
 # --- ІНІЦІАЛІЗАЦІЯ ---
 logging.basicConfig(level=logging.INFO)
 dp = Dispatcher()
+# Апдейти юзера по черзі + відкидання подвійних тапів (bot_middleware.py)
+user_serialize = UserSerializeMiddleware()
+dp.update.outer_middleware(user_serialize)
+# Запити до БД на апдейт, попередження понад QUERY_BUDGET (query_trace.py)
+dp.update.outer_middleware(query_trace.TraceMiddleware())
+# Час хендлерів за префіксом callback_data / командою (metrics.py)
+dp.callback_query.middleware(metrics.HandlerMetricsMiddleware())
+dp.message.middleware(metrics.HandlerMetricsMiddleware())
 
 # --- КЛАВІАТУРИ ---
+# Статичні клавіатури збираються один раз у keyboards.py
 def get_main_menu():
     """Головне меню"""
-    builder = InlineKeyboardBuilder()
-    builder.button(text="⚔️ Stoic Gym (Гра)", callback_data="mode_gym")
-    builder.button(text="📖 Академія (Теорія)", callback_data="mode_academy")
-    builder.button(text="🤖 Ментор (AI)", callback_data="mode_ai")
-    builder.button(
-        text="🧘‍♂️ Lab (Лабараторні)", url="https://t.me/StoicTrainerLab_ua_bot"
-    )
-    builder.button(text="🧙‍♂️ Оракул (Цитати)", callback_data="mode_quotes")
-    builder.button(text="⏳ Memento Mori (Час)", callback_data="mode_memento")
-    builder.button(text="👤 Мій Профіль", callback_data="mode_profile")
-    builder.button(text="🏆 Топ Стоїків", callback_data="mode_top")
-    builder.button(text="📚 Допомога", callback_data="show_help")
-    builder.button(text="✉️ Написати автору", callback_data="send_feedback")
-    builder.adjust(1, 1, 2, 2, 2, 2)
-    return builder.as_markup()
+    return MAIN_MENU
 
 
 def get_quote_keyboard():
     """Меню для цитат"""
-    buttons = [
-        [InlineKeyboardButton(text="🔄 Інша цитата", callback_data="refresh_quote")],
-        [InlineKeyboardButton(text="🔙 В меню", callback_data="back_home")],
-    ]
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
+    return QUOTE_KEYBOARD
 
 
 # --- ЛОГІКА ПРОФІЛЮ ТА РАНГІВ ---
@@ -85,14 +113,7 @@ async def show_profile(callback: types.CallbackQuery):
     birth_date = await db.get_birthdate(user_id)
     energy = await db.check_energy(user_id)
     academy_count, academy_rank = await db.get_academy_progress(user_id)
-    game_rank = get_stoic_rank(score)
-
-    thresholds = [50, 150, 500, 1000, 2500, 5000]
-    next_rank_score = 0
-    for t in thresholds:
-        if score < t:
-            next_rank_score = t
-            break
+    game_rank, next_rank_score, _ = STOIC_RANKS.resolve(score)
 
     progress_msg = ""
     if next_rank_score > 0:
@@ -110,7 +131,7 @@ async def show_profile(callback: types.CallbackQuery):
         f"🏅 Звання: **{game_rank}**\n"
         f"💎 Бали мудрості: **{score}**{progress_msg}\n"
         f"🏔️ Пройдено рівнів: **{level - 1}**\n"
-        f"⚡ Енергія: **{energy}/5**\n\n"
+        f"⚡ Енергія: **{energy}/{GYM_DAILY_ENERGY}**\n\n"
         f"🎓 **АКАДЕМІЯ (Теорія)**\n"
         f"🏫 Клас: **{academy_rank}**\n"
         f"📚 Пройдено уроків: **{academy_count}**\n\n"
@@ -169,7 +190,7 @@ async def back_to_main_menu(callback: types.CallbackQuery, state: FSMContext):
     await state.clear()
     try:
         await callback.message.edit_text(
-            "👋 **Вітаю в Stoic Trainer!**\n\nОбери режим для тренування духу:",
+            HOME_TEXT,
             reply_markup=get_main_menu(),
             parse_mode="Markdown",
         )
@@ -203,41 +224,24 @@ async def cmd_sync(message: types.Message):
 
 
 # --- ЛОГІКА: Академія ---
-async def render_article(callback: types.CallbackQuery, article, user_id):
-    is_read = await db.is_article_read(user_id, article["id"])
-    daily_count = await db.get_daily_academy_count(user_id)
+async def render_article(callback: types.CallbackQuery, article, user_id, is_read=None, daily_count=None):
+    # Після зарахування уроку стан уже відомий — зайвих запитів не робимо
+    if is_read is None:
+        is_read = await db.is_article_read(user_id, article["id"])
+    if daily_count is None:
+        daily_count = await db.get_daily_academy_count(user_id)
     
     full_text = format_article(article)
-    limit_info = f"\n\n📊 Сьогодні засвоєно: **{daily_count}/5** уроків."
+    limit_info = f"\n\n📊 Сьогодні засвоєно: **{daily_count}/{ACADEMY_DAILY_LIMIT}** уроків."
     final_text = full_text + limit_info
     
     if len(final_text) > 4000:
         final_text = final_text[:3990] + "...\n\n*(Текст скорочено через ліміти Telegram)*"
 
-    kb = InlineKeyboardBuilder()
-    
-    # Логіка кнопок
-    if daily_count >= 5 and not is_read:
-        next_callback = "academy_limit_reached"
-        next_text = "➡️ (Відпочинок)"
-    else:
-        next_callback = f"academy_nav_next_{article['day']}_{article['month']}"
-        next_text = "➡️ Наступний"
-
-    if is_read:
-        kb.button(text="🌟 Вже вивчено", callback_data="academy_already_done")
-    else:
-        # ЗМІНА 1: Пишемо правильну нагороду (+5 балів)
-        kb.button(text="Зарахувати урок (+5 балів)", callback_data=f"academy_read_{article['id']}")
-
-    kb.button(text="⬅️ Минулий", callback_data=f"academy_nav_prev_{article['day']}_{article['month']}")
-    kb.button(text=next_text, callback_data=next_callback)
-    kb.button(text="🔙 В меню", callback_data="back_home")
-    kb.button(text="📚 Бібліотека", callback_data="library_page_0")
-    kb.adjust(1, 2, 2)
+    kb = academy_keyboard(article["id"], article["day"], article["month"], is_read, daily_count >= ACADEMY_DAILY_LIMIT)
 
     try:
-        await callback.message.edit_text(final_text, reply_markup=kb.as_markup(), parse_mode="Markdown")
+        await callback.message.edit_text(final_text, reply_markup=kb, parse_mode="Markdown")
     except Exception:
         pass
 
@@ -284,7 +288,7 @@ async def handle_already_read(callback: types.CallbackQuery):
 
 @dp.callback_query(F.data == "academy_limit_reached")
 async def handle_limit_reached_nav(callback: types.CallbackQuery):
-    await callback.answer("Ти засвоїв 5 уроків сьогодні!\n\n Відпочинь, і завтра продовжимо! 🏛️", show_alert=True)
+    await callback.answer(f"Ти засвоїв {ACADEMY_DAILY_LIMIT} уроків сьогодні!\n\n Відпочинь, і завтра продовжимо! 🏛️", show_alert=True)
 
 
 # 👇 ГОЛОВНІ ЗМІНИ ТУТ
@@ -293,32 +297,32 @@ async def handle_read_article(callback: types.CallbackQuery):
     article_id = int(callback.data.split("_")[2])
     user_id = callback.from_user.id
     
-    # 1. Перевірка ліміту
-    daily_count = await db.get_daily_academy_count(user_id)
-    if daily_count >= 5:
+    # Квоту на сьогодні вже вичерпано (а стаття нова) — відповідаємо з пам'яті, без БД
+    if db.academy_limit_reached(user_id, article_id):
+        await handle_limit_reached_nav(callback)
+        return
+
+    # Ліміт, зарахування і новий стан — одним атомарним викликом
+    result = await db.complete_article(user_id, article_id, ACADEMY_DAILY_LIMIT)
+    if not result:
+        await callback.answer("Спочатку натисни /start")
+        return
+    if result["limit_reached"]:
         await handle_limit_reached_nav(callback)
         return
 
-    # 2. ЗМІНА 2: Отримуємо (статус, новий_рахунок)
-    # db.py за замовчуванням дає 2 бали, тому тут score передавати не треба
-    is_new, new_total_score = await db.mark_article_as_read(user_id, article_id)
-    
     article = await db.get_article_by_id(article_id)
 
     if article:
-        # Отримуємо прогрес для статистики
-        new_count, rank = await db.get_academy_progress(user_id)
-        new_daily = await db.get_daily_academy_count(user_id)
-        
         # Оновлюємо сторінку (кнопка зміниться на "Вже вивчено")
-        await render_article(callback, article, user_id)
+        await render_article(callback, article, user_id, is_read=True, daily_count=result["daily_count"])
         
-        if is_new:
-            # 3. Показуємо красиве повідомлення з новим рахунком
+        if result["is_new"]:
+            # Показуємо красиве повідомлення з новим рахунком
             await callback.answer(
                 f"🎉 Урок зараховано! (+{ACADEMY_REWARD}) балів\n"
-                f"🏆 Рахунок: {new_total_score}\n"
-                f"📅 Сьогодні: {new_daily}/5", 
+                f"🏆 Рахунок: {result['new_score']}\n"
+                f"📅 Сьогодні: {result['daily_count']}/{ACADEMY_DAILY_LIMIT}", 
                 show_alert=True
             )
         else:
@@ -328,43 +332,60 @@ async def handle_read_article(callback: types.CallbackQuery):
         await callback.answer("Помилка: статті немає.")
 
 # --- БІБЛІОТЕКА ---
+LIBRARY_PAGE_SIZE = 10
+
+
+def library_cursor_data(page, direction, article):
+    """callback_data з keyset-курсором: library_page_<page>_<n|p>_<read_at мкс>_<article_id>"""
+    return f"library_page_{page}_{direction}_{datetime_to_micros(article['read_at'])}_{article['id']}"
+
+
 @dp.callback_query(F.data.startswith("library_page_"))
 async def show_library_page(callback: types.CallbackQuery):
     user_id = callback.from_user.id
+    # library_page_0 — перша сторінка; далі курсор по (read_at, article_id)
+    older_than = newer_than = None
     try:
-        page = int(callback.data.split("_")[2])
+        parts = callback.data.split("_")
+        page = int(parts[2])
+        if len(parts) == 6:
+            key = (micros_to_datetime(int(parts[4])), int(parts[5]))
+            if parts[3] == "p":
+                newer_than = key
+            else:
+                older_than = key
     except (IndexError, ValueError):
+        page, older_than, newer_than = 0, None, None
+    if not older_than and not newer_than:
         page = 0
-    LIMIT = 10
-    offset = page * LIMIT
-    articles = await db.get_user_library(user_id, limit=LIMIT, offset=offset)
+
+    articles, has_more = await db.get_user_library_page(
+        user_id, limit=LIBRARY_PAGE_SIZE, older_than=older_than, newer_than=newer_than
+    )
     total_count = await db.count_user_library(user_id)
-    import math
-    total_pages = math.ceil(total_count / LIMIT) if total_count > 0 else 1
+    total_pages = max(1, -(-total_count // LIBRARY_PAGE_SIZE))
 
     if not articles:
-        kb = InlineKeyboardBuilder()
-        kb.button(text="🔙 В Академію", callback_data="mode_academy")
         try:
-            await callback.message.edit_text("📚 Тут поки пусто.", reply_markup=kb.as_markup(), parse_mode="Markdown")
+            await callback.message.edit_text("📚 Тут поки пусто.", reply_markup=ACADEMY_BACK_KB, parse_mode="Markdown")
         except Exception: pass
         try: await callback.answer()
         except TelegramBadRequest: pass
         return
 
     text = f"📚 **Бібліотека** (Стор. {page + 1}/{total_pages})\nВсього записів: **{total_count}**\n\n👇 *Натисни, щоб відкрити:*"
-    kb = InlineKeyboardBuilder()
-    for art in articles:
-        title = art["title"][:23] + ".." if len(art["title"]) > 25 else art["title"]
-        kb.row(InlineKeyboardButton(text=f"📜 {art['day']:02d}.{art['month']:02d} | {title}", callback_data=f"library_open_{art['id']}"))
-
-    nav_buttons = []
-    if page > 0: nav_buttons.append(InlineKeyboardButton(text="⬅️ Туди", callback_data=f"library_page_{page - 1}"))
-    if total_count > offset + LIMIT: nav_buttons.append(InlineKeyboardButton(text="Сюди ➡️", callback_data=f"library_page_{page + 1}"))
-    if nav_buttons: kb.row(*nav_buttons)
-    kb.row(InlineKeyboardButton(text="🔙 В Академію", callback_data="mode_academy"))
-
-    try: await callback.message.edit_text(text, reply_markup=kb.as_markup(), parse_mode="Markdown")
+    # Назад на першу сторінку — без курсора; вперед є завжди, якщо ми прийшли "назад"
+    if page <= 0:
+        prev_data = None
+    elif page == 1:
+        prev_data = "library_page_0"
+    else:
+        prev_data = library_cursor_data(page - 1, "p", articles[0])
+    has_next = has_more if not newer_than else True
+    next_data = library_cursor_data(page + 1, "n", articles[-1]) if has_next else None
+    kb = library_keyboard(articles, prev_data, next_data)
+
+    try: await callback.message.edit_text(text, reply_markup=kb, parse_mode="Markdown")
     except Exception: pass
     try: await callback.answer()
     except TelegramBadRequest: pass
@@ -426,9 +447,7 @@ def generate_memento_text(birth_date: datetime):
 
 @dp.callback_query(F.data == "reset_memento")
 async def reset_memento_date(callback: types.CallbackQuery, state: FSMContext):
-    kb = InlineKeyboardBuilder()
-    kb.button(text="🔙 Скасувати", callback_data="back_home")
-    try: await callback.message.edit_text("🔄 Введи нову дату народження (наприклад: `24.08.1991`):", reply_markup=kb.as_markup(), parse_mode="Markdown")
+    try: await callback.message.edit_text("🔄 Введи нову дату народження (наприклад: `24.08.1991`):", reply_markup=CANCEL_KB, parse_mode="Markdown")
     except Exception: pass
     await state.set_state(MementoMori.waiting_for_birthdate)
     try: await callback.answer()
@@ -441,16 +460,10 @@ async def start_memento(callback: types.CallbackQuery, state: FSMContext):
     if saved_date:
         birth_date = datetime(saved_date.year, saved_date.month, saved_date.day)
         text = generate_memento_text(birth_date)
-        kb = InlineKeyboardBuilder()
-        kb.button(text="🔄 Змінити дату", callback_data="reset_memento")
-        kb.button(text="🔙 В меню", callback_data="back_home")
-        kb.adjust(1)
-        try: await callback.message.edit_text(text, reply_markup=kb.as_markup(), parse_mode="Markdown")
+        try: await callback.message.edit_text(text, reply_markup=MEMENTO_KB, parse_mode="Markdown")
         except Exception: pass
     else:
-        kb = InlineKeyboardBuilder()
-        kb.button(text="🔙 Назад в меню", callback_data="back_home")
-        try: await callback.message.edit_text("⏳ **Memento Mori**\n\nВведи дату народження (наприклад: `1995` або `24.08.1995`):", reply_markup=kb.as_markup(), parse_mode="Markdown")
+        try: await callback.message.edit_text("⏳ **Memento Mori**\n\nВведи дату народження (наприклад: `1995` або `24.08.1995`):", reply_markup=BACK_HOME_ALT_KB, parse_mode="Markdown")
         except Exception: pass
         await state.set_state(MementoMori.waiting_for_birthdate)
     try: await callback.answer()
@@ -459,26 +472,20 @@ async def start_memento(callback: types.CallbackQuery, state: FSMContext):
 @dp.message(MementoMori.waiting_for_birthdate)
 async def process_birthdate(message: types.Message, state: FSMContext):
     date_text = message.text.strip()
-    kb_error = InlineKeyboardBuilder()
-    kb_error.button(text="🔙 Скасувати", callback_data="back_home")
     try:
         birth_date = datetime.strptime(date_text, "%d.%m.%Y")
     except ValueError:
         try:
             birth_date = datetime.strptime(date_text, "%Y")
         except ValueError:
-            await message.answer("⚠️ Невірний формат. Спробуй ще раз.", reply_markup=kb_error.as_markup())
+            await message.answer("⚠️ Невірний формат. Спробуй ще раз.", reply_markup=CANCEL_KB)
             return
     if birth_date > datetime.now() or (datetime.now().year - birth_date.year) > 110:
-        await message.answer("🐢 Введи реальну дату.", reply_markup=kb_error.as_markup())
+        await message.answer("🐢 Введи реальну дату.", reply_markup=CANCEL_KB)
         return
     await db.set_birthdate(message.from_user.id, birth_date.date())
     result_text = generate_memento_text(birth_date)
-    kb = InlineKeyboardBuilder()
-    kb.button(text="🔄 Змінити дату", callback_data="reset_memento")
-    kb.button(text="🔙 В меню", callback_data="back_home")
-    kb.adjust(1)
-    await message.answer(result_text, reply_markup=kb.as_markup(), parse_mode="Markdown")
+    await message.answer(result_text, reply_markup=MEMENTO_KB, parse_mode="Markdown")
     await state.clear()
 
 
@@ -498,21 +505,14 @@ async def start_gym(callback: types.CallbackQuery):
     else:
         mode_title = f"♾️ Бескінечний режим (Рівень {level})"
 
-    builder = InlineKeyboardBuilder()
-    builder.button(text="▶️ Продовжити тренування", callback_data="game_start")
-
-    if level > 1 or score > 0:
-        builder.button(text="🔄 Почати заново", callback_data="reset_gym_confirm")
+    kb = GYM_MENU_WITH_RESET_KB if level > 1 or score > 0 else GYM_MENU_KB
 
-    builder.button(text="🔙 В меню", callback_data="back_home")
-    builder.adjust(1)
-    
     await callback.message.edit_text(
         f"⚔️ **Stoic Gym**\n"
         f"📍 {mode_title}\n\n" 
         f"🏆 Твій рахунок: **{score}** балів\n\n"
         "Продовжуй свій шлях до мудрості.",
-        reply_markup=builder.as_markup(),
+        reply_markup=kb,
         parse_mode="Markdown",
     )
     await callback.answer()
@@ -520,10 +520,13 @@ async def start_gym(callback: types.CallbackQuery):
 @dp.callback_query(F.data == "game_start")
 async def start_game_from_button(callback: types.CallbackQuery):
     user_id = callback.from_user.id
-    await callback.message.edit_text("⚔️ **Тренування розпочато!**", parse_mode="Markdown")
-    await asyncio.sleep(1)
-    await send_level(user_id, callback.message)
     await callback.answer()
+    # Рівень готується паралельно із заставкою, а не після неї
+    prepared = asyncio.ensure_future(prepare_level(user_id))
+    # Методи aiogram — pydantic-моделі, gather їх не приймає (не хешуються), тому через задачу
+    intro = asyncio.ensure_future(callback.message.edit_text("⚔️ **Тренування розпочато!**", parse_mode="Markdown"))
+    await asyncio.gather(intro, asyncio.sleep(GAME_INTRO_SECONDS))
+    await send_level(user_id, callback.message, prepared)
 
 @dp.callback_query(F.data == "mode_top")
 async def show_leaderboard(callback: types.CallbackQuery):
@@ -535,12 +538,13 @@ async def show_leaderboard(callback: types.CallbackQuery):
     if not top_users:
         text += "Поки що ніхто не набрав балів. Будь першим!"
     else:
-        for i, (uid, name, score) in enumerate(top_users, start=1):
+        ranks = STOIC_RANKS.resolve_many([score for _, _, score in top_users])
+        for i, ((uid, name, score), rank) in enumerate(zip(top_users, ranks), start=1):
             # Медальки для перших трьох
             medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else "🔹"
 
             # Визначення рангу (беремо тільки смайл, наприклад "🦉")
-            rank_emoji = get_stoic_rank(score).split()[0]
+            rank_emoji = rank.name.split()[0]
 
             # Екрануємо ім'я, щоб символи < > & не ламали HTML
             if name:
@@ -551,11 +555,7 @@ async def show_leaderboard(callback: types.CallbackQuery):
             # Формат: 🥇 1. <b>Ім'я</b> (🦉) — 350
             text += f"{medal} {i}. <b>{safe_name}</b> ({rank_emoji}) — {score}\n"
 
-    kb = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 В меню", callback_data="back_home")]
-        ]
-    )
+    kb = BACK_HOME_KB
 
     try:
         await callback.message.edit_text(text, reply_markup=kb, parse_mode="HTML")
@@ -574,15 +574,8 @@ async def go_to_next_level(callback: types.CallbackQuery):
 @dp.callback_query(F.data == "journal_write")
 async def start_journal(callback: types.CallbackQuery, state: FSMContext):
     await callback.message.edit_text(
-        "📝 **Щоденник Стоїка**\n\n"
-        "Марк Аврелій писав: «Наші думки визначають якість нашого життя».\n\n"
-        "👇Запиши свій головний урок за сьогодні або те, за що ти вдячний. "
-        "Це допоможе закріпити мудрість на практиці.",
-        reply_markup=InlineKeyboardMarkup(
-            inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Скасувати", callback_data="back_home")]
-            ]
-        ),
+        JOURNAL_INTRO_TEXT,
+        reply_markup=CANCEL_KB,
         parse_mode="Markdown",
     )
     await state.set_state(JournalState.waiting_for_entry)
@@ -594,74 +587,42 @@ async def process_journal(message: types.Message, state: FSMContext):
         await message.answer("Спробуй написати трохи розгорнутіше.")
         return
     await db.save_journal_entry(message.from_user.id, message.text)
-    await message.answer("✅ **Запис збережено.**", reply_markup=InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="🔙 В меню", callback_data="back_home")]]), parse_mode="Markdown")
+    await message.answer("✅ **Запис збережено.**", reply_markup=BACK_HOME_KB, parse_mode="Markdown")
     await state.clear()
 
 @dp.callback_query(F.data == "journal_view")
 async def view_journal(callback: types.CallbackQuery):
     entries = await db.get_journal_entries(callback.from_user.id)
     text = "📜 **Твої записи:**\n\n" + ("".join([f"🗓 *{e['created_at'].strftime('%d.%m.%y')}*: {e['entry_text']}\n\n" for e in entries]) if entries else "Порожньо.")
-    kb = InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="🔙 Назад", callback_data="mode_profile")]])
-    await callback.message.edit_text(text, reply_markup=kb, parse_mode="Markdown")
+    await callback.message.edit_text(text, reply_markup=JOURNAL_BACK_KB, parse_mode="Markdown")
 
 async def generate_sync_code(user_id):
     """Генерує 6-значний код і зберігає в БД на 10 хвилин"""
-    code = "".join([str(random.randint(0, 9)) for _ in range(6)])
-    async with db.pool.acquire() as conn:
-        await conn.execute("DELETE FROM sync_codes WHERE user_id = $1", user_id)
-        await conn.execute("INSERT INTO sync_codes (code, user_id) VALUES ($1, $2)", code, user_id)
-    return code
-
-async def clear_expired_codes():
-    async with db.pool.acquire() as conn:
-        await conn.execute("DELETE FROM sync_codes WHERE expires_at < CURRENT_TIMESTAMP")
-        logging.info("🧹 Старі коди синхронізації видалено.")
+    return await sync_service.issue_code(db, user_id)
 
 # --- ФУНКЦІЯ ДЛЯ ВІДПРАВКИ РІВНЯ ---
-async def send_level(user_id, message_to_edit):
-    # 1. ОТРИМАННЯ ДАНИХ ТА ЕНЕРГІЇ
-    score, current_level, _ = await db.get_stats(user_id)
-    energy = await db.check_energy(user_id)
-    max_scenarios = await db.get_scenarios_count()
+# Рівень показується у два кроки: prepare_level збирає все без побічних ефектів
+# (тому його можна запускати наперед), send_level списує енергію і редагує повідомлення.
 
-    # 2. ПЕРЕВІРКА ЕНЕРГІЇ
-    if energy <= 0:
-        summary = await db.get_daily_summary(user_id)
-        
-        if summary and summary["points"] != 0:
-            if summary["mistakes"] == 0:
-                feedback = "🌟 **Бездоганний день!** Твій розум був гострим, як меч."
-            elif summary["mistakes"] > summary["wisdoms"]:
-                feedback = "🌪 **День випробувань.** Сьогодні емоції часто брали гору."
-            else:
-                feedback = "⚖️ **Гідний результат.** Ти діяв зважено."
-            
-            stats_text = (
-                f"\n\n📊 **Підсумок сесії:**\n"
-                f"✅ Мудрих рішень: **{summary['wisdoms']}**\n"
-                f"❌ Емоційних зривів: **{summary['mistakes']}**\n"
-                f"💎 Зароблено балів: **{summary['points']}**"
-            )
-        else:
-            feedback = "🧘‍♂️ **Час для роздумів.**"
-            stats_text = "\n\nСьогодні ти не проходив нових випробувань."
+# Заставка "Тренування розпочато" висить не менше цього часу, поки готується рівень
+GAME_INTRO_SECONDS = 0.4
+# Заготовлений рівень N+1 старіє (юзер міг грати в додатку)
+LEVEL_PREFETCH_TTL = 600
+# Не більше стільки заготовок (юзери, що пішли без "Продовжити")
+LEVEL_PREFETCH_MAX = 10000
 
-        kb = InlineKeyboardBuilder()
-        kb.button(text="📝 Запис у щоденник", callback_data="journal_write")
-        kb.button(text="🔙 В меню", callback_data="back_home")
-        kb.adjust(1)
+# user_id -> (момент запуску, задача prepare_level)
+_level_prefetch = {}
 
-        await message_to_edit.edit_text(
-            f"🌙 **Енергія вичерпана**\n\n"
-            f"{feedback}{stats_text}\n\n"
-            "Стоїцизм вимагає пауз для осмислення. Обдумай уроки і повертайся завтра.\n\n"
-            "⚡ Енергія відновиться зранку.",
-            reply_markup=kb.as_markup(),
-            parse_mode="Markdown"
-        )
-        return
 
-    # 3. ВИБІР СЦЕНАРІЮ ТА ЗАГОЛОВКА (Linear vs Endless)
+async def prepare_level(user_id):
+    """Сценарій поточного рівня: {"header", "body", "kb"} або None, якщо сценарію немає"""
+    (score, current_level, _), max_scenarios = await asyncio.gather(
+        db.get_stats(user_id),
+        db.get_scenarios_count(),
+    )
+
+    # ВИБІР СЦЕНАРІЮ ТА ЗАГОЛОВКА (Linear vs Endless)
     if current_level <= max_scenarios:
         target_scenario_id = current_level
         # Чіткий заголовок для сюжету
@@ -672,52 +633,127 @@ async def send_level(user_id, message_to_edit):
         header = f"♾️ **Бескінечний режим | Рівень {current_level}**"
 
     scenario_data = await db.get_scenario_by_level(target_scenario_id)
-    
     if not scenario_data:
-        await message_to_edit.edit_text(
-            "📜 Помилка бази даних: сценарій не знайдено.", 
-            reply_markup=get_main_menu()
-        )
-        return
-
-    # СПИСУЄМО ЕНЕРГІЮ
-    await db.decrease_energy(user_id)
-    new_energy = energy - 1 
+        return None
 
-    # 4. ПІДГОТОВКА ВАРІАНТІВ
+    # ПІДГОТОВКА ВАРІАНТІВ
     options = scenario_data["options"].copy()
     random.shuffle(options)
 
-    labels = ["A", "B", "C", "D"]
-    builder = InlineKeyboardBuilder()
     text_opts = ""
-
     for i, opt in enumerate(options):
-        lbl = labels[i] if i < len(labels) else str(i+1)
+        lbl = GAME_LABELS[i] if i < len(GAME_LABELS) else str(i+1)
         text_opts += f"**{lbl})** {opt['text']}\n\n"
-        builder.button(text=f"🔹 {lbl}", callback_data=f"anygame_{target_scenario_id}_{opt['id']}")
+    kb = game_choices_keyboard(target_scenario_id, tuple(opt["id"] for opt in options))
+
+    return {
+        "header": header,
+        "body": f"{scenario_data['text']}\n\n👇 **Твій вибір:**\n\n{text_opts}",
+        "kb": kb,
+    }
+
+
+def prefetch_level(user_id):
+    """Починає готувати наступний рівень у фоні (після відповіді на поточний)"""
+    old = _level_prefetch.pop(user_id, None)
+    if old:
+        old[1].cancel()
+    task = metrics.background_task(prepare_level(user_id), "level_prefetch")
+    # Помилку заготовки не логуємо як "never retrieved": send_level просто підготує рівень заново
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    _level_prefetch[user_id] = (time.monotonic(), task)
+    while len(_level_prefetch) > LEVEL_PREFETCH_MAX:
+        # Найстаріша заготовка — перша в dict
+        _, stale = _level_prefetch.pop(next(iter(_level_prefetch)))
+        stale.cancel()
+
+
+def take_prefetched_level(user_id):
+    """Задача з заготовленим рівнем або None (немає чи застаріла)"""
+    entry = _level_prefetch.pop(user_id, None)
+    if not entry:
+        return None
+    started_at, task = entry
+    if time.monotonic() - started_at > LEVEL_PREFETCH_TTL:
+        task.cancel()
+        return None
+    return task
+
+
+async def show_energy_out(user_id, message_to_edit):
+    summary = await db.get_daily_summary(user_id)
+    
+    if summary and summary["points"] != 0:
+        if summary["mistakes"] == 0:
+            feedback = "🌟 **Бездоганний день!** Твій розум був гострим, як меч."
+        elif summary["mistakes"] > summary["wisdoms"]:
+            feedback = "🌪 **День випробувань.** Сьогодні емоції часто брали гору."
+        else:
+            feedback = "⚖️ **Гідний результат.** Ти діяв зважено."
+        
+        stats_text = (
+            f"\n\n📊 **Підсумок сесії:**\n"
+            f"✅ Мудрих рішень: **{summary['wisdoms']}**\n"
+            f"❌ Емоційних зривів: **{summary['mistakes']}**\n"
+            f"💎 Зароблено балів: **{summary['points']}**"
+        )
+    else:
+        feedback = "🧘‍♂️ **Час для роздумів.**"
+        stats_text = "\n\nСьогодні ти не проходив нових випробувань."
 
-    builder.button(text="🔙 В меню", callback_data="back_home")
-    builder.adjust(2, 2, 1)
+    await message_to_edit.edit_text(
+        f"🌙 **Енергія вичерпана**\n\n"
+        f"{feedback}{stats_text}\n\n"
+        "Стоїцизм вимагає пауз для осмислення. Обдумай уроки і повертайся завтра.\n\n"
+        "⚡ Енергія відновиться зранку.",
+        reply_markup=ENERGY_OUT_KB,
+        parse_mode="Markdown"
+    )
+
+
+async def send_level(user_id, message_to_edit, prepared=None):
+    """prepared — задача prepare_level, запущена заздалегідь (заставка, заготовка N+1)"""
+    if prepared is None:
+        prepared = take_prefetched_level(user_id)
+    if prepared is None:
+        prepared = asyncio.ensure_future(prepare_level(user_id))
+
+    # 1. СПИСУЄМО ЕНЕРГІЮ (перевірка і списання — одна операція в пам'яті)
+    new_energy = await db.spend_energy(user_id)
+
+    # 2. ЕНЕРГІЇ НЕМАЄ
+    if new_energy is None:
+        prepared.cancel()
+        await show_energy_out(user_id, message_to_edit)
+        return
+
+    try:
+        level = await prepared
+    except Exception as e:
+        # Заготовка впала (наприклад, пул БД був зайнятий) — готуємо ще раз
+        logging.info(f"Заготовка рівня не вдалася: {e}")
+        level = await prepare_level(user_id)
+
+    if not level:
+        # Сценарій не показали — енергію повертаємо
+        await db.add_energy(user_id)
+        await message_to_edit.edit_text(
+            "📜 Помилка бази даних: сценарій не знайдено.", 
+            reply_markup=get_main_menu()
+        )
+        return
 
     await message_to_edit.edit_text(
-        f"{header} | ⚡ {new_energy}/5\n\n"
-        f"{scenario_data['text']}\n\n"
-        f"👇 **Твій вибір:**\n\n{text_opts}",
-        reply_markup=builder.as_markup(),
+        f"{level['header']} | ⚡ {new_energy}/{GYM_DAILY_ENERGY}\n\n{level['body']}",
+        reply_markup=level["kb"],
         parse_mode="Markdown"
     )
 
 @dp.callback_query(F.data == "reset_gym_confirm")
 async def confirm_reset(callback: types.CallbackQuery):
-    builder = InlineKeyboardBuilder()
-    builder.button(text="✅ Так, скинути все", callback_data="reset_gym_final")
-    builder.button(text="❌ Ні, повернутися", callback_data="mode_gym")
-
     await callback.message.edit_text(
-        "⚠️ **Увага!** Ти впевнений, що хочеш скинути свій прогрес?\n"
-        "Твій рахунок і рівень будуть обнулені.",
-        reply_markup=builder.as_markup(),
+        RESET_CONFIRM_TEXT,
+        reply_markup=RESET_CONFIRM_KB,
         parse_mode="Markdown",
     )
     await callback.answer()
@@ -727,20 +763,14 @@ async def reset_gym(callback: types.CallbackQuery):
     user_id = callback.from_user.id
     # Скидаємо в базі: score=0, level=1
     await db.update_game_progress(user_id, 0, 1)
+    # Заготовлений рівень більше не актуальний
+    task = take_prefetched_level(user_id)
+    if task:
+        task.cancel()
 
     await callback.message.edit_text(
-        "✅ **Прогрес скинуто!**\n\n"
-        "Твій шлях стоїка починається знову. Натисни 'Почати тренування'.",
-        reply_markup=InlineKeyboardMarkup(
-            inline_keyboard=[
-                [
-                    InlineKeyboardButton(
-                        text="▶️ Почати тренування", callback_data="game_start"
-                    )
-                ],
-                [InlineKeyboardButton(text="🔙 В меню", callback_data="back_home")],
-            ]
-        ),
+        RESET_DONE_TEXT,
+        reply_markup=RESET_DONE_KB,
         parse_mode="Markdown",
     )
     await callback.answer()
@@ -786,23 +816,16 @@ async def handle_game_choice(callback: types.CallbackQuery):
             # 4. ОНОВЛЮЄМО БАЗУ
             await db.update_game_progress(user_id, new_score, new_level)
             await db.log_move(user_id, scenario_id, points_change)
+            if energy_left > 0:
+                # Наступний рівень готуємо наперед — "Продовжити" покаже його одразу
+                prefetch_level(user_id)
 
             # Формуємо візуальний фідбек
             indicator = "🟢" if points_change > 0 else "🔴" if points_change < 0 else "⚪"
             score_feedback = f"{indicator} **{points_change} балів мудрості**"
 
-            # 5. СТВОРЮЄМО КЛАВІАТУРУ
-            kb = InlineKeyboardBuilder()
-            kb.button(text="🔙 В меню", callback_data="back_home")
-            
-            # --- ЛОГІКА РОЗУМНОЇ КНОПКИ ---
-            if energy_left > 0:
-                kb.button(text="▶️ Продовжити", callback_data="game_next")
-            else:
-                # Якщо енергії 0, міняємо кнопку на "Підсумок", щоб юзер розумів, що це кінець
-                kb.button(text="📊 Підсумок дня", callback_data="game_next")
-            
-            kb.adjust(2)
+            # 5. КЛАВІАТУРА (розумна кнопка: "Продовжити" або "Підсумок дня")
+            kb = GAME_RESULT_KB if energy_left > 0 else GAME_RESULT_LAST_KB
 
             # 6. ФОРМУЄМО ТЕКСТ
             msg_text = (
@@ -819,7 +842,7 @@ async def handle_game_choice(callback: types.CallbackQuery):
             # 7. ВІДПРАВЛЯЄМО РЕЗУЛЬТАТ
             try:
                 await callback.message.edit_text(
-                    msg_text, reply_markup=kb.as_markup(), parse_mode="Markdown"
+                    msg_text, reply_markup=kb, parse_mode="Markdown"
                 )
             except Exception as e:
                 logging.error(f"Game edit error: {e}")
@@ -866,19 +889,8 @@ async def send_daily_quote(bot: Bot):
 @dp.callback_query(F.data == "mode_ai")
 async def start_ai_mentor(callback: types.CallbackQuery, state: FSMContext):
     await callback.message.edit_text(
-        "🤖 **Зал Роздумів**\n\n"
-        "Я — цифрова тінь Марка Аврелія. Я тут, щоб вислухати твої тривоги.\n\n"
-        "👇 Напиши мені, що тебе турбує, або запитай поради. \n"
-        "_(Наприклад: 'Як перестати злитися на колег?' або 'Я втратив мотивацію')_",
-        reply_markup=InlineKeyboardMarkup(
-            inline_keyboard=[
-                [
-                    InlineKeyboardButton(
-                        text="🔙 Вийти з діалогу", callback_data="back_home"
-                    )
-                ]
-            ]
-        ),
+        MENTOR_INTRO_TEXT,
+        reply_markup=MENTOR_EXIT_KB,
         parse_mode="Markdown",
     )
     await state.set_state(MentorState.chatting)
@@ -896,10 +908,10 @@ async def process_ai_chat(message: types.Message, state: FSMContext, bot: Bot):
         return
 
     # 2. ПЕРЕВІРКА ЛІМІТІВ (Rate Limiting + Daily Quota)
-    status_limit = await db.check_ai_limit(user_id, limit_per_day=50)
+    status_limit = await db.check_ai_limit(user_id)
 
     if status_limit == "cooldown":
-        await message.reply("⏳ Ти пишеш занадто швидко. Зроби вдих і видих (почекай 5 секунд).")
+        await message.reply(f"⏳ Ти пишеш занадто швидко. Зроби вдих і видих (почекай {AI_COOLDOWN_SECONDS} секунд).")
         return
 
     if status_limit == "limit_reached":
@@ -922,7 +934,7 @@ async def process_ai_chat(message: types.Message, state: FSMContext, bot: Bot):
     await message.answer(
         f"🏛 **Марк Аврелій:**\n\n{ai_response}",
         parse_mode="Markdown",
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="🔙 Завершити", callback_data="back_home")]]),
+        reply_markup=MENTOR_END_KB,
     )
 
 # Команда /help
@@ -938,11 +950,7 @@ async def show_help_callback(callback: types.CallbackQuery):
     # Використовуємо змінну з data.py
     await callback.message.edit_text(
         HELP_TEXT,
-        reply_markup=InlineKeyboardMarkup(
-            inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 В меню", callback_data="back_home")]
-            ]
-        ),
+        reply_markup=BACK_HOME_KB,
         parse_mode="Markdown",
     )
     await callback.answer()
@@ -951,14 +959,8 @@ async def show_help_callback(callback: types.CallbackQuery):
 @dp.callback_query(F.data == "send_feedback")
 async def start_feedback(callback: types.CallbackQuery, state: FSMContext):
     await callback.message.edit_text(
-        "✉️ **Зв'язок з розробником**\n\n"
-        "Напиши своє повідомлення (відгук, ідею або знайдену помилку) і я передам його автору.\n\n"
-        "👇 *Чекаю на твій текст:*",
-        reply_markup=InlineKeyboardMarkup(
-            inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 Скасувати", callback_data="back_home")]
-            ]
-        ),
+        FEEDBACK_INTRO_TEXT,
+        reply_markup=CANCEL_KB,
         parse_mode="Markdown",
     )
     await state.set_state(FeedbackState.waiting_for_message)
@@ -985,11 +987,7 @@ async def process_feedback(message: types.Message, state: FSMContext, bot: Bot):
         # 2. Відповідаємо користувачу
         await message.answer(
             "✅ **Повідомлення відправлено!**\nДякую за твій внесок у розвиток проекту.",
-            reply_markup=InlineKeyboardMarkup(
-                inline_keyboard=[
-                    [InlineKeyboardButton(text="🔙 В меню", callback_data="back_home")]
-                ]
-            ),
+            reply_markup=BACK_HOME_KB,
             parse_mode="Markdown",
         )
     except Exception as e:
@@ -1029,25 +1027,70 @@ async def cmd_broadcast(message: types.Message, bot: Bot):
 
     await message.answer(f"✅ Розсилка завершена! Успішно отримали: {count}")
 
+# --- АДМІН-КОМАНДА: ПОВІЛЬНІ ЗАПИТИ ---
+# Використання: /slowqueries або /slowqueries explain (спершу зняти EXPLAIN для топу)
+@dp.message(Command("slowqueries"))
+async def cmd_slow_queries(message: types.Message):
+    ADMIN_ID = int(os.getenv("ADMIN_ID", 0))
+    if message.from_user.id != ADMIN_ID:
+        return
+
+    sampler = db.slow_queries
+    if not sampler.enabled:
+        await message.answer("Семплер вимкнено: задайте SLOW_QUERY_MS.")
+        return
+    if "explain" in message.text:
+        await sampler.explain_top()
+
+    top = sampler.top(limit=5)
+    if not top:
+        await message.answer(f"Запитів довших за {sampler.threshold_ms} мс поки немає.")
+        return
+
+    blocks = []
+    for item in top:
+        lines = [
+            f"{item['count']}× · сума {item['total_ms']} мс · сер. {item['mean_ms']} · макс {item['max_ms']}",
+            item["sql"][:300],
+        ]
+        plan = item["plan_summary"]
+        if plan:
+            lines.append(f"План: {plan['node']}, {plan['execution_ms']} мс, hit {plan['shared_hit']} / read {plan['shared_read']}")
+            lines.extend(f"⚠️ {flag}" for flag in plan["flagged"][:3])
+        blocks.append("\n".join(lines))
+    await message.answer("\n\n".join(blocks)[:4000])
+
 # --- ЗАПУСК ---
+def create_bot():
+    session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)) if TELEGRAM_API_URL else None
+    bot = Bot(token=BOT_TOKEN, session=session)
+    bot.session.middleware(metrics.TelegramMetricsMiddleware())
+    return bot
+
+
 async def main():
     logging.info("🏁 Старт системи...")
-    bot = Bot(token=BOT_TOKEN)
+    bot = create_bot()
+    metrics.start_bot_server()
     await db.connect()
     await db.create_tables()
     await db.create_academy_table()
     await db.create_progress_table()
     await db.create_lab_tables()
+    await db.create_erasure_tables()
 
     scheduler = AsyncIOScheduler()
     scheduler.add_job(send_daily_quote, trigger="cron", hour=7, minute=30, kwargs={"bot": bot})
-    # Чистка кодів щогодини, щоб не накопичувати сміття
-    scheduler.add_job(clear_expired_codes, "interval", hours=3)
+    # Партиції історії на наступні місяці + архівація старих
+    scheduler.add_job(db.maintain_partitions, "cron", hour=4, minute=0)
     scheduler.start()
 
     try:
         await dp.start_polling(bot)
     finally:
+        scheduler.shutdown(wait=False)
+        logging.info(f"Відкинуто подвійних тапів: {dict(user_serialize.dropped)}")
+        await db.close()
         await bot.session.close()
 
 if __name__ == "__main__":
@@ -0,0 +1,210 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import os
+import re
+import time
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import CallbackQuery
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest, start_http_server
+
+# Метрики Prometheus для бота та API. API віддає їх на GET /metrics,
+# бот — окремим HTTP-сервером на METRICS_PORT (0 — вимкнено).
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+
+BOT_HANDLER_SECONDS = Histogram(
+    "stoic_bot_handler_seconds", "Час хендлера бота", ["handler"]
+)
+API_REQUEST_SECONDS = Histogram(
+    "stoic_api_request_seconds", "Час запиту до API", ["method", "route", "status"]
+)
+DB_CALL_SECONDS = Histogram(
+    "stoic_db_call_seconds", "Час виклику методу Database", ["method"]
+)
+DB_QUERIES = Counter(
+    "stoic_db_queries_total", "Запити до Postgres за методом Database або фоновою задачею (other — поза ними)", ["method"]
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "stoic_db_pool_connections", "З'єднання пулу asyncpg", ["state"]
+)
+OPENAI_SECONDS = Histogram(
+    "stoic_openai_seconds", "Час запиту до OpenAI", ["source", "outcome"],
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+OPENAI_TOKENS = Counter(
+    "stoic_openai_tokens_total", "Токени OpenAI", ["source", "kind"]
+)
+TELEGRAM_REQUESTS = Counter(
+    "stoic_telegram_requests_total", "Виклики Telegram Bot API за результатом", ["method", "outcome"]
+)
+DUPLICATE_CALLBACKS = Counter(
+    "stoic_duplicate_callbacks_total", "Відкинуті подвійні тапи", ["prefix"]
+)
+
+# Метод Database, у якому зараз виконується код (для підрахунку запитів)
+_db_method = contextvars.ContextVar("db_method", default=None)
+
+
+def current_db_method():
+    return _db_method.get()
+
+
+def background_task(coro, label):
+    """
+    Фонова задача з чистим контекстом: create_task копіює контекст того, хто її запустив,
+    і без цього всі запити флашера рахувались би під методом Database.connect (чи трасою
+    HTTP-запиту, що її створив). Запити задачі йдуть під власною міткою label.
+    """
+    context = contextvars.Context()
+    context.run(_db_method.set, label)
+    return asyncio.create_task(coro, context=context)
+
+
+# --- Database ---
+
+def instrument_database(cls):
+    """Обгортає публічні async-методи класу: час виклику і атрибуція запитів до методу"""
+    for name, func in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.iscoroutinefunction(func):
+            continue
+        setattr(cls, name, _timed_method(name, func))
+    return cls
+
+
+def _timed_method(name, func):
+    histogram = DB_CALL_SECONDS.labels(name)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        # Вкладений виклик (mark_article_as_read -> complete_article) рахує запити зовнішньому
+        token = _db_method.set(name) if _db_method.get() is None else None
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - started)
+            if token is not None:
+                _db_method.reset(token)
+
+    return wrapper
+
+
+async def setup_connection(conn):
+    """init для asyncpg.create_pool: рахуємо кожен запит з'єднання"""
+    # Службовий RESET, яким пул чистить з'єднання при поверненні, — не запит хендлера
+    reset_query = conn.get_reset_query()
+
+    def on_query(record):
+        # asyncpg кличе логер через call_soon з контекстом задачі, що робила запит
+        if record.query != reset_query:
+            DB_QUERIES.labels(_db_method.get() or "other").inc()
+
+    conn.add_query_logger(on_query)
+
+
+def watch_pool(pool):
+    DB_POOL_CONNECTIONS.labels("busy").set_function(lambda: pool.get_size() - pool.get_idle_size())
+    DB_POOL_CONNECTIONS.labels("idle").set_function(pool.get_idle_size)
+    DB_POOL_CONNECTIONS.labels("max").set_function(pool.get_max_size)
+
+
+# --- OpenAI ---
+
+async def openai_completion(client, source, **kwargs):
+    """client.chat.completions.create з латентністю і токенами в метриках"""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        response = await client.chat.completions.create(**kwargs)
+        outcome = "ok"
+    finally:
+        OPENAI_SECONDS.labels(source, outcome).observe(time.perf_counter() - started)
+    usage = getattr(response, "usage", None)
+    if usage:
+        OPENAI_TOKENS.labels(source, "prompt").inc(usage.prompt_tokens)
+        OPENAI_TOKENS.labels(source, "completion").inc(usage.completion_tokens)
+    return response
+
+
+# --- Бот ---
+
+# Змінні частини callback_data (id, дати, курсори) у мітку не потрапляють
+_VARIABLE_PART = re.compile(r"\d")
+
+
+def callback_label(data):
+    parts = []
+    for part in (data or "").split("_")[:3]:
+        if _VARIABLE_PART.search(part):
+            break
+        parts.append(part)
+    return "cb:" + ("_".join(parts) or "other")
+
+
+def message_label(message, state):
+    text = message.text or ""
+    if text.startswith("/"):
+        return "cmd:" + text.split()[0].split("@")[0]
+    if state:
+        return "state:" + state
+    return "message"
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Внутрішній middleware для callback_query та message: час самого хендлера"""
+
+    async def __call__(self, handler, event, data):
+        if isinstance(event, CallbackQuery):
+            label = callback_label(event.data)
+        else:
+            label = message_label(event, data.get("raw_state"))
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            BOT_HANDLER_SECONDS.labels(label).observe(time.perf_counter() - started)
+
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """Результат кожного виклику Bot API: ok або клас помилки (TelegramForbiddenError ...)"""
+
+    async def __call__(self, make_request, bot, method):
+        outcome = "ok"
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            TELEGRAM_REQUESTS.labels(type(method).__name__, outcome).inc()
+
+
+def start_bot_server(port=METRICS_PORT):
+    if port:
+        start_http_server(port)
+
+
+# --- API ---
+
+def render():
+    """(тіло, content-type) для ендпоінта /metrics"""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+async def api_middleware(request, call_next):
+    """HTTP middleware FastAPI: мітка — шаблон маршруту (/api/user/{target_user_id}), не сирий шлях"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        API_REQUEST_SECONDS.labels(
+            request.method, route.path if route else "unmatched", str(status)
+        ).observe(time.perf_counter() - started)
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import time
+from collections import defaultdict
+
+import asyncpg
+
+import metrics
+from rate_limit import day_of
+
+# Write-behind для game_history: хід гравця кладеться в чергу в пам'яті,
+# а фоновий флашер пише пачками (за розміром пачки або раз на ~200 мс).
+
+# Одна інструкція на пачку: вставка в game_history і upsert денної зведенки daily_user_stats.
+# Ходи юзерів, яких уже стерто (erasure), відкидаємо — як і чекпойнт rate_limit
+_FLUSH_SQL = """
+    WITH moves AS (
+        SELECT m.user_id, m.level_num, m.points_earned, m.played_at
+        FROM unnest($1::bigint[], $2::int[], $3::int[], $4::date[])
+            AS m(user_id, level_num, points_earned, played_at)
+        JOIN users u ON u.user_id = m.user_id
+    ), inserted AS (
+        INSERT INTO game_history (user_id, level_num, points_earned, played_at)
+        SELECT user_id, level_num, points_earned, played_at FROM moves
+    )
+    INSERT INTO daily_user_stats (user_id, day, moves, points, mistakes, wisdoms)
+    SELECT user_id, played_at, COUNT(*), SUM(points_earned),
+           COUNT(*) FILTER (WHERE points_earned < 0),
+           COUNT(*) FILTER (WHERE points_earned > 0)
+    FROM moves
+    GROUP BY user_id, played_at
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        moves = daily_user_stats.moves + EXCLUDED.moves,
+        points = daily_user_stats.points + EXCLUDED.points,
+        mistakes = daily_user_stats.mistakes + EXCLUDED.mistakes,
+        wisdoms = daily_user_stats.wisdoms + EXCLUDED.wisdoms
+"""
+
+# Скільки разів пачка може впасти на даних, перш ніж її почнуть ділити навпіл
+MAX_BATCH_ATTEMPTS = 3
+# Помилки в самих рядках (значення, обмеження) — повтор їх не виправить.
+# Решта (з'єднання, пул, рестарт бази) — тимчасові: пачку повторюємо, поки не запишеться
+_BAD_DATA_ERRORS = (asyncpg.DataError, asyncpg.IntegrityConstraintViolationError)
+
+
+class MoveBuffer:
+    def __init__(self, db, batch_size=500, flush_interval=0.2, max_pending=10000):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Повна черга блокує add(), поки флашер не розгребе її (backpressure)
+        self._queue = asyncio.Queue(maxsize=max_pending)
+        # Ще не записані ходи по юзерах — щоб get_daily_summary бачив свої записи
+        self._pending = defaultdict(list)
+        # Пачка, яку не вдалося записати: пробуємо знову першою
+        self._retry = []
+        # Скільки разів поспіль пачка впала на даних (див. MAX_BATCH_ATTEMPTS)
+        self._failures = 0
+        self._wakeup = asyncio.Event()
+        # Тримається під час запису пачки (один флаш за раз)
+        self.lock = asyncio.Lock()
+        # Юзери пачки, що пишеться зараз (для read_with_pending)
+        self._in_flight = frozenset()
+        self._task = None
+        self._closed = False
+
+    def start(self):
+        if self._task is None:
+            self._task = metrics.background_task(self._run(), "move_buffer")
+
+    async def add(self, user_id, level, points):
+        if self._closed:
+            raise RuntimeError("MoveBuffer is closed")
+        # День — за поясом бази, як CURRENT_DATE у get_daily_summary і партиціях
+        record = (user_id, level, points, day_of(time.time()))
+        self._pending[user_id].append(record)
+        await self._queue.put(record)
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    def pending_for(self, user_id, day=None):
+        """Ходи юзера, які ще не дійшли до БД (за день day, за замовчуванням — сьогодні)"""
+        day = day or day_of(time.time())
+        return [record for record in self._pending.get(user_id, ()) if record[3] == day]
+
+    def _head(self, user_id):
+        records = self._pending.get(user_id)
+        return records[0] if records else None
+
+    async def read_with_pending(self, user_id, read, attempts=3):
+        """
+        read() з БД + pending_for(user_id) так, щоб жоден хід не порахувався двічі.
+        Без lock: якщо за час запиту пачка з ходами юзера дійшла до БД (змінилась голова
+        його черги або пачка ще пишеться) — читаємо знову; після кількох спроб — під lock.
+        """
+        for _ in range(attempts):
+            head = self._head(user_id)
+            pending = self.pending_for(user_id)
+            result = await read()
+            if head is None or (self._head(user_id) is head and user_id not in self._in_flight):
+                return result, pending
+        async with self.lock:
+            return await read(), self.pending_for(user_id)
+
+    async def _run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"❌ game_history flush failed: {e}")
+
+    async def flush(self):
+        """Записує все, що накопичилось у черзі"""
+        async with self.lock:
+            while self._retry or not self._queue.empty():
+                batch, self._retry = self._retry, []
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                self._in_flight = frozenset(record[0] for record in batch)
+                try:
+                    if self._failures < MAX_BATCH_ATTEMPTS:
+                        try:
+                            await self._write(batch)
+                        except Exception as e:
+                            self._retry = batch
+                            if isinstance(e, _BAD_DATA_ERRORS):
+                                self._failures += 1
+                            raise
+                        self._forget(batch)
+                    else:
+                        await self._isolate(batch)
+                    self._failures = 0
+                finally:
+                    self._in_flight = frozenset()
+
+    async def _write(self, batch):
+        async with self.db.pool.acquire() as conn:
+            await conn.execute(_FLUSH_SQL, *map(list, zip(*batch)))
+
+    async def _isolate(self, batch):
+        """
+        Пачка, що раз у раз падає на даних: ділимо навпіл, доки погані рядки не лишаться
+        по одному. Їх — у dead-letter лог, решту пачки — в БД. Порядок ходів зберігається.
+        """
+        parts = [batch]
+        while parts:
+            part = parts.pop()
+            try:
+                await self._write(part)
+            except _BAD_DATA_ERRORS as e:
+                if len(part) == 1:
+                    self._dead_letter(part[0], e)
+                    self._forget(part)
+                else:
+                    middle = len(part) // 2
+                    parts += [part[middle:], part[:middle]]
+                continue
+            except Exception:
+                # Тимчасовий збій: необроблений залишок — знову першим у чергу
+                self._retry = part + [record for rest in reversed(parts) for record in rest]
+                raise
+            self._forget(part)
+
+    def _dead_letter(self, record, error):
+        user_id, level, points, played_at = record
+        entry = {"user_id": user_id, "level_num": level, "points_earned": points, "played_at": played_at.isoformat()}
+        print(f"☠️ game_history dead letter: {json.dumps(entry)} ({type(error).__name__}: {error})")
+
+    def _forget(self, batch):
+        written = defaultdict(int)
+        for record in batch:
+            written[record[0]] += 1
+        for user_id, count in written.items():
+            records = self._pending[user_id]
+            del records[:count]
+            if not records:
+                del self._pending[user_id]
+
+    async def close(self):
+        """Зупиняє флашер і дописує залишок (викликати при зупинці процесу)"""
+        self._closed = True
+        self._wakeup.set()
+        if self._task:
+            await self._task
+            self._task = None
+        await self.flush()
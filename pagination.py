@@ -0,0 +1,33 @@
+import base64
+from datetime import datetime, timedelta
+
+# Keyset-пагінація: курсор — це ключ сортування останнього показаного запису.
+# Для API він непрозорий (base64), для бота — компактний рядок у callback_data (ліміт 64 байти).
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def encode_cursor(*parts) -> str:
+    raw = ".".join(str(p) for p in parts).encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, count: int):
+    """Повертає кортеж з count цілих чисел або None, якщо курсор битий"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        parts = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii").split(".")
+        if len(parts) != count:
+            return None
+        return tuple(int(p) for p in parts)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def datetime_to_micros(dt: datetime) -> int:
+    """TIMESTAMP (naive) -> мікросекунди від епохи, без втрати точності"""
+    return (dt - _EPOCH) // timedelta(microseconds=1)
+
+
+def micros_to_datetime(micros: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=micros)
@@ -0,0 +1,403 @@
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import re
+from datetime import date
+
+import asyncpg
+from dotenv import load_dotenv
+
+# Історичні таблиці (game_history, lab_history, mentor_history, journal) — помісячні
+# декларативні партиції. Міграційний шар (Database.create_*) у боті й API при старті
+# створює їх, додає партиції наперед і DEFAULT-партицію: якщо місячну вчасно не створили,
+# вставка не падає, а рядки переносяться, коли партиція з'явиться.
+# Стару звичайну таблицю старт не чіпає (вона працює як є) — її конвертує окрема команда
+# `python partitions.py convert`: дані переносяться пачками, без довгих блокувань.
+#
+# Retention вимкнено за замовчуванням — дані юзерів без явного рішення не видаляються.
+# Увімкнути: HISTORY_RETENTION=game_history:6,lab_history:6,mentor_history:12 (місяців)
+# і HISTORY_ARCHIVE_DIR — тека на постійному диску (на Railway — volume; локальний диск
+# контейнера зникає при деплої). Тоді щоденна задача maintain() від'єднує партиції старші
+# за межу, вивантажує в HISTORY_ARCHIVE_DIR (csv.gz) і видаляє.
+
+ARCHIVE_DIR = os.getenv("HISTORY_ARCHIVE_DIR") or None
+MONTHS_AHEAD = 2
+# Конвертація старої таблиці: рядків за одну транзакцію і пауза між пачками (сек)
+CONVERT_BATCH = 5000
+CONVERT_PAUSE = 0.05
+
+# Один ключ на всі процеси: бот і API мігрують одночасно при старті
+_LOCK_KEY = 0x5707C1C
+
+
+class PartitionedTable:
+    def __init__(self, name, key, columns, constraints=(), retention_months=None):
+        self.name = name
+        self.key = key
+        # (назва, тип) — порядок колонок як у старій таблиці
+        self.columns = columns
+        self.constraints = constraints
+        # None — дані не видаляються (див. HISTORY_RETENTION)
+        self.retention_months = retention_months
+
+    @property
+    def sequence(self):
+        return f"{self.name}_id_seq"
+
+    def create_sql(self):
+        parts = [f"{col} {col_type}" for col, col_type in self.columns]
+        parts.append(f"PRIMARY KEY (id, {self.key})")
+        parts.extend(self.constraints)
+        body = ",\n    ".join(parts)
+        return f"CREATE TABLE {self.name} (\n    {body}\n) PARTITION BY RANGE ({self.key})"
+
+
+TABLES = {
+    t.name: t
+    for t in [
+        PartitionedTable(
+            "game_history",
+            "played_at",
+            [
+                ("id", "INTEGER NOT NULL DEFAULT nextval('game_history_id_seq')"),
+                ("user_id", "BIGINT"),
+                ("level_num", "INTEGER"),
+                ("points_earned", "INTEGER"),
+                ("played_at", "DATE NOT NULL DEFAULT CURRENT_DATE"),
+            ],
+        ),
+        PartitionedTable(
+            "lab_history",
+            "completed_at",
+            [
+                ("id", "INTEGER NOT NULL DEFAULT nextval('lab_history_id_seq')"),
+                ("user_id", "BIGINT"),
+                ("practice_type", "TEXT"),
+                ("score_earned", "INTEGER"),
+                ("completed_at", "TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP"),
+            ],
+            ["CONSTRAINT fk_lab_user FOREIGN KEY(user_id) REFERENCES users(user_id) ON DELETE CASCADE"],
+        ),
+        PartitionedTable(
+            "mentor_history",
+            "created_at",
+            [
+                ("id", "INTEGER NOT NULL DEFAULT nextval('mentor_history_id_seq')"),
+                ("user_id", "BIGINT"),
+                ("role", "VARCHAR(20)"),  # 'user' або 'assistant'
+                ("content", "TEXT"),
+                ("created_at", "TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP"),
+            ],
+            ["CONSTRAINT fk_user FOREIGN KEY(user_id) REFERENCES users(user_id) ON DELETE CASCADE"],
+        ),
+        PartitionedTable(
+            "journal",
+            "created_at",
+            [
+                ("id", "INTEGER NOT NULL DEFAULT nextval('journal_id_seq')"),
+                ("user_id", "BIGINT"),
+                ("entry_text", "TEXT"),
+                ("created_at", "TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP"),
+            ],
+        ),
+    ]
+}
+
+
+def parse_retention(value):
+    """HISTORY_RETENTION: "game_history:6,mentor_history:12" -> {таблиця: місяців}"""
+    retention = {}
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        table, _, months = item.partition(":")
+        table = table.strip()
+        if table not in TABLES or not months.strip().isdigit() or int(months) < 1:
+            raise ValueError(f"HISTORY_RETENTION: невірний запис {item!r} (очікується таблиця:місяців)")
+        retention[table] = int(months)
+    return retention
+
+
+for _name, _months in parse_retention(os.getenv("HISTORY_RETENTION")).items():
+    TABLES[_name].retention_months = _months
+
+
+def add_months(day: date, months: int) -> date:
+    """Перше число місяця, зсунутого на months від місяця day"""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def month_of_partition(table: str, name: str):
+    """Місяць з назви партиції (table_y2025m03) або None для чужих таблиць"""
+    suffix = name[len(table) + 1:]
+    if not name.startswith(table + "_y") or len(suffix) != 8 or suffix[5] != "m":
+        return None
+    try:
+        return date(int(suffix[1:5]), int(suffix[6:8]), 1)
+    except ValueError:
+        return None
+
+
+async def _relkind(conn, table):
+    return await conn.fetchval(
+        "SELECT relkind::text FROM pg_class WHERE oid = to_regclass($1)", table
+    )
+
+
+async def _list_partitions(conn, table):
+    rows = await conn.fetch(
+        """
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass($1)
+        """,
+        table,
+    )
+    return [row["relname"] for row in rows]
+
+
+async def create_partition(conn, spec, month: date):
+    """Місячна партиція; рядки її місяця, що вже лежать у DEFAULT, переносяться в неї"""
+    name = partition_name(spec.name, month)
+    if await _relkind(conn, name):
+        return name
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    bounds = f"FOR VALUES FROM ('{start}') TO ('{end}')"
+    default = default_partition_name(spec.name)
+    async with conn.transaction():
+        await conn.execute("SELECT pg_advisory_xact_lock($1)", _LOCK_KEY)
+        stranded = await _relkind(conn, default) and await conn.fetchval(
+            f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {spec.key} >= '{start}' AND {spec.key} < '{end}')"
+        )
+        if not stranded:
+            await conn.execute(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {spec.name} {bounds}")
+            return name
+        # PARTITION OF з такими рядками в DEFAULT заборонено: переносимо і приєднуємо
+        await conn.execute(f"CREATE TABLE {name} (LIKE {spec.name} INCLUDING DEFAULTS)")
+        moved = await conn.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {default} WHERE {spec.key} >= '{start}' AND {spec.key} < '{end}' RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+            """
+        )
+        await conn.execute(f"ALTER TABLE {spec.name} ATTACH PARTITION {name} {bounds}")
+    print(f"🧱 {name}: перенесено з {default} ({moved.split()[-1]} рядків)")
+    return name
+
+
+async def ensure_partitions(conn, spec, today=None):
+    """DEFAULT-партиція + партиції від поточного місяця на MONTHS_AHEAD вперед"""
+    await conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {default_partition_name(spec.name)} PARTITION OF {spec.name} DEFAULT"
+    )
+    current = add_months(today or date.today(), 0)
+    for i in range(MONTHS_AHEAD + 1):
+        await create_partition(conn, spec, add_months(current, i))
+
+
+async def ensure_table(conn, name):
+    """
+    Створює партиційовану таблицю з партиціями наперед. Викликається з міграцій
+    Database.create_*. Стару звичайну таблицю лишає як є (див. convert_table).
+    """
+    spec = TABLES[name]
+    async with conn.transaction():
+        await conn.execute("SELECT pg_advisory_xact_lock($1)", _LOCK_KEY)
+        kind = await _relkind(conn, name)
+        if kind == "r":
+            print(f"⚠️ {name}: звичайна таблиця; конвертуйте в партиції: python partitions.py convert")
+            return
+        if kind is None:
+            await conn.execute(f"CREATE SEQUENCE IF NOT EXISTS {spec.sequence}")
+            await conn.execute(spec.create_sql())
+            await conn.execute(f"ALTER SEQUENCE {spec.sequence} OWNED BY {name}.id")
+        await ensure_partitions(conn, spec)
+
+
+async def _move_indexes(conn, legacy, name):
+    """Індекси старої таблиці (крім PK) — на нову: ті ж імена, старі отримують суфікс _legacy"""
+    rows = await conn.fetch(
+        """
+        SELECT c.relname, pg_get_indexdef(c.oid) AS definition
+        FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = to_regclass($1) AND NOT i.indisprimary
+        """,
+        legacy,
+    )
+    for row in rows:
+        await conn.execute(f"ALTER INDEX {row['relname']} RENAME TO {row['relname']}_legacy")
+        await conn.execute(re.sub(rf"ON (\S+\.)?{legacy} USING", rf"ON \g<1>{name} USING", row["definition"]))
+
+
+async def convert_table(conn, name, batch_size=CONVERT_BATCH, pause=CONVERT_PAUSE):
+    """
+    Одноразова конвертація старої звичайної таблиці в партиційовану (зі збереженням
+    послідовності id). Перейменування і створення нової таблиці — коротка транзакція,
+    після неї процеси пишуть уже в партиції, а старі рядки переносяться пачками.
+    Перерваний запуск можна повторити — він продовжить з {name}_legacy.
+    Повертає кількість перенесених рядків або None, якщо конвертувати нічого.
+    """
+    spec = TABLES[name]
+    legacy = f"{name}_legacy"
+    async with conn.transaction():
+        await conn.execute("SELECT pg_advisory_xact_lock($1)", _LOCK_KEY)
+        kind = await _relkind(conn, name)
+        if kind == "r":
+            await conn.execute(f"ALTER TABLE {name} RENAME TO {legacy}")
+            # Ім'я індексу PK має звільнитись для нової таблиці
+            await conn.execute(f"ALTER TABLE {legacy} RENAME CONSTRAINT {name}_pkey TO {legacy}_pkey")
+            await conn.execute(f"CREATE SEQUENCE IF NOT EXISTS {spec.sequence}")
+            await conn.execute(spec.create_sql())
+            await conn.execute(f"ALTER SEQUENCE {spec.sequence} OWNED BY {name}.id")
+            await ensure_partitions(conn, spec)
+            await _move_indexes(conn, legacy, name)
+        elif kind != "p" or await _relkind(conn, legacy) != "r":
+            return None
+
+    # Партиції тільки для місяців, де є дані (інакше рядки ляжуть у DEFAULT)
+    months = await conn.fetch(
+        f"SELECT DISTINCT date_trunc('month', {spec.key})::date AS month FROM {legacy} WHERE {spec.key} IS NOT NULL"
+    )
+    for row in months:
+        await create_partition(conn, spec, row["month"])
+
+    columns = ", ".join(col for col, _ in spec.columns)
+    selected = ", ".join(
+        f"COALESCE({col}, CURRENT_TIMESTAMP)" if col == spec.key else col
+        for col, _ in spec.columns
+    )
+    total = 0
+    while True:
+        # Пачка за id: видаляємо зі старої таблиці й вставляємо в нову однією інструкцією
+        result = await conn.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {legacy}
+                WHERE id IN (SELECT id FROM {legacy} ORDER BY id LIMIT $1)
+                RETURNING *
+            )
+            INSERT INTO {name} ({columns}) SELECT {selected} FROM moved
+            """,
+            batch_size,
+        )
+        moved = int(result.split()[-1])
+        if not moved:
+            break
+        total += moved
+        await asyncio.sleep(pause)
+
+    async with conn.transaction():
+        await conn.execute("SELECT pg_advisory_xact_lock($1)", _LOCK_KEY)
+        await conn.execute(
+            f"SELECT setval('{spec.sequence}', GREATEST((SELECT MAX(id) FROM {name}), 1))"
+        )
+        await conn.execute(f"DROP TABLE {legacy}")
+    print(f"🧱 {name}: конвертовано в партиції ({total} рядків)")
+    return total
+
+
+async def archive_partition(conn, table, name, archive_dir=ARCHIVE_DIR):
+    """DETACH -> вивантаження в archive_dir/<name>.csv.gz -> DROP"""
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.csv.gz")
+    await conn.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+    with gzip.open(path, "wb") as f:
+        await conn.copy_from_table(name, output=f, format="csv", header=True)
+    await conn.execute(f"DROP TABLE {name}")
+    return path
+
+
+async def maintain(conn, today=None, archive_dir=ARCHIVE_DIR):
+    """Щоденна задача: партиції наперед + архівація тих, що вийшли за retention (якщо увімкнено)"""
+    today = today or date.today()
+    archived = []
+    for spec in TABLES.values():
+        if await _relkind(conn, spec.name) != "p":
+            continue
+        await ensure_partitions(conn, spec, today)
+        if spec.retention_months is None:
+            continue
+        if not archive_dir:
+            # Без архіву на постійному диску дані не видаляємо
+            print(f"⚠️ {spec.name}: retention задано, але HISTORY_ARCHIVE_DIR — ні; архівацію пропущено")
+            continue
+        cutoff = add_months(today, -spec.retention_months)
+        for name in sorted(await _list_partitions(conn, spec.name)):
+            month = month_of_partition(spec.name, name)
+            # Партицію прибираємо, коли весь її місяць старший за межу retention
+            if month and add_months(month, 1) <= cutoff:
+                archived.append(await archive_partition(conn, spec.name, name, archive_dir))
+    return archived
+
+
+# Гарячі запити, які мають чіпати тільки поточну партицію
+HOT_QUERIES = {
+    "game_history": "SELECT COUNT(*) FROM game_history WHERE user_id = $1 AND played_at = CURRENT_DATE",
+    "lab_history": """
+        SELECT SUM(score_earned) FROM lab_history
+        WHERE user_id = $1 AND completed_at >= CURRENT_DATE AND completed_at < CURRENT_DATE + 1
+    """,
+}
+
+
+def _scanned_relations(plan):
+    """Таблиці/партиції з плану (відсіяні при старті виконання в план не потрапляють)"""
+    found = {plan["Relation Name"]} if "Relation Name" in plan else set()
+    for child in plan.get("Plans", ()):
+        found |= _scanned_relations(child)
+    return found
+
+
+async def check_pruning(conn):
+    """EXPLAIN гарячих запитів: повертає {таблиця: [партиції]} і падає, якщо їх більше однієї"""
+    result = {}
+    for table, sql in HOT_QUERIES.items():
+        if await _relkind(conn, table) != "p":
+            continue
+        raw = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {sql}", 1)
+        plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+        scanned = sorted(_scanned_relations(plan))
+        result[table] = scanned
+        if len(scanned) > 1:
+            raise AssertionError(f"{table}: запит не відсікає партиції ({', '.join(scanned)})")
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Обслуговування партицій історії")
+    parser.add_argument("command", choices=["maintain", "check", "convert"])
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    parser.add_argument("--batch-size", type=int, default=CONVERT_BATCH, help="для convert")
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(os.getenv("DATABASE_URL"))
+    try:
+        if args.command == "maintain":
+            for path in await maintain(conn, archive_dir=args.archive_dir):
+                print(f"📦 Архівовано: {path}")
+            print("✅ Партиції в порядку.")
+        elif args.command == "convert":
+            for name in TABLES:
+                if await convert_table(conn, name, batch_size=args.batch_size) is None:
+                    print(f"✅ {name}: конвертувати нічого")
+        else:
+            for table, scanned in (await check_pruning(conn)).items():
+                print(f"✅ {table}: {', '.join(scanned) or 'жодної партиції'}")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    asyncio.run(main())
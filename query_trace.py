@@ -0,0 +1,132 @@
+import asyncio
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import re
+import time
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+import metrics
+
+# Трасування запитів до Postgres на один апдейт бота / HTTP-запит API: скільки запитів,
+# сумарний час у БД, найповільніший запит і розбивка за методами Database (N+1 видно одразу).
+# Підсумок кожного апдейту пишеться на рівні DEBUG у логер "query_trace",
+# перевищення QUERY_BUDGET — на рівні WARNING.
+
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "8"))
+
+logger = logging.getLogger("query_trace")
+
+_current = contextvars.ContextVar("query_trace", default=None)
+_WHITESPACE = re.compile(r"\s+")
+
+
+class Trace:
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.db_seconds = 0.0
+        self.slowest = None
+        self.slowest_seconds = 0.0
+        self.by_method = {}
+        self.queries = []
+        self.started = time.perf_counter()
+
+    def add(self, query, seconds, method):
+        self.count += 1
+        self.db_seconds += seconds
+        self.by_method[method] = self.by_method.get(method, 0) + 1
+        self.queries.append((method, query))
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest = query
+
+    def summary(self):
+        return {
+            "name": self.name,
+            "queries": self.count,
+            "db_ms": round(self.db_seconds * 1000, 2),
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "slowest_ms": round(self.slowest_seconds * 1000, 2),
+            "slowest": _short(self.slowest),
+            "by_method": self.by_method,
+        }
+
+
+def _short(query, limit=200):
+    if not query:
+        return None
+    query = _WHITESPACE.sub(" ", query).strip()
+    return query if len(query) <= limit else query[:limit] + "..."
+
+
+def setup_connection(conn):
+    """Реєструє логер запитів на з'єднанні пулу (викликається з init пулу в db.py)"""
+    reset_query = conn.get_reset_query()
+
+    def on_query(record):
+        trace = _current.get()
+        if trace is not None and record.query != reset_query:
+            trace.add(record.query, record.elapsed, metrics.current_db_method() or "other")
+
+    conn.add_query_logger(on_query)
+
+
+@contextlib.asynccontextmanager
+async def trace(name, budget=QUERY_BUDGET):
+    """Трасує запити всередині блоку (і в задачах, створених у ньому) та логує підсумок"""
+    current = Trace(name)
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+        # Логер asyncpg викликається через call_soon: даємо добігти останнім записам
+        await asyncio.sleep(0)
+        summary = current.summary()
+        if budget is not None and current.count > budget:
+            summary["budget"] = budget
+            logger.warning(json.dumps(summary, ensure_ascii=False))
+        elif logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps(summary, ensure_ascii=False))
+
+
+@contextlib.asynccontextmanager
+async def assert_max_queries(limit, name="block"):
+    """
+    Для тестів: падає, якщо блок зробив більше limit запитів.
+        async with assert_max_queries(3, "show_profile"):
+            await show_profile(callback)
+    """
+    async with trace(name, budget=None) as current:
+        yield current
+    if current.count > limit:
+        details = "\n".join(f"  [{method}] {_short(query, 120)}" for method, query in current.queries)
+        raise AssertionError(f"{name}: {current.count} запитів до БД, дозволено {limit}\n{details}")
+
+
+class TraceMiddleware(BaseMiddleware):
+    """Зовнішній middleware апдейтів бота: один Trace на апдейт"""
+
+    async def __call__(self, handler, event: Update, data):
+        if event.callback_query is not None:
+            name = metrics.callback_label(event.callback_query.data)
+        elif event.message is not None:
+            name = metrics.message_label(event.message, data.get("raw_state"))
+        else:
+            name = event.event_type
+        async with trace(name):
+            return await handler(event, data)
+
+
+async def api_middleware(request, call_next):
+    """HTTP middleware FastAPI: один Trace на запит, ім'я — шаблон маршруту"""
+    async with trace(request.url.path) as current:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        current.name = f"{request.method} {route.path if route else 'unmatched'}"
+        return response
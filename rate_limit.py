@@ -0,0 +1,449 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from constants import (
+    ACADEMY_DAILY_LIMIT,
+    AI_COOLDOWN_SECONDS,
+    AI_DAILY_LIMIT,
+    GYM_DAILY_ENERGY,
+    LAB_DAILY_POINTS_LIMIT,
+)
+import metrics
+
+# Ліміти на юзера: рішення приймаються в пам'яті процесу, без запитів до БД і без
+# записів у гарячий рядок users. Стан раз на кілька секунд зберігається в rate_limits:
+# лічильники вікон — дельтами (бот і API додають свої витрати, а не перетирають чужі),
+# токени — як є. Між процесами ліміт узгоджується з точністю до інтервалу checkpoint.
+
+# Пояс, у якому починається новий день денних квот. Той самий, що в сесіях Postgres:
+# complete_article / complete_lab_session рахують день через CURRENT_DATE, і обидві
+# сторони мають перейти на "завтра" одночасно. Database.connect бере його з SHOW TimeZone.
+_day_zone = timezone.utc
+
+
+def use_database_timezone(name):
+    global _day_zone
+    try:
+        _day_zone = ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        print(f"⚠️ Unknown Postgres time zone {name!r}, daily quotas use UTC")
+        _day_zone = timezone.utc
+
+
+def day_of(now):
+    """Календарний день моменту now (unix time) за поясом бази"""
+    return datetime.fromtimestamp(now, _day_zone).date()
+
+
+class _State:
+    __slots__ = ("window_id", "used", "prev_used", "tokens", "refilled_at", "pending", "dirty")
+
+    def __init__(self):
+        self.window_id = 0
+        self.used = 0.0
+        self.prev_used = 0.0
+        self.tokens = 0.0
+        self.refilled_at = 0.0
+        # Витрачено з останнього checkpoint (для вікон)
+        self.pending = 0.0
+        self.dirty = False
+
+
+class TokenBucket:
+    """capacity токенів, один новий кожні refill_seconds. Кулдаун — це capacity=1."""
+
+    persistent = True
+
+    def __init__(self, capacity, refill_seconds):
+        self.capacity = capacity
+        self.refill_seconds = refill_seconds
+
+    def new_state(self, now):
+        state = _State()
+        state.tokens = float(self.capacity)
+        state.refilled_at = now
+        return state
+
+    def refresh(self, state, now):
+        elapsed = max(now - state.refilled_at, 0.0)
+        state.tokens = min(float(self.capacity), state.tokens + elapsed / self.refill_seconds)
+        state.refilled_at = now
+
+    def remaining(self, state, now):
+        return math.floor(state.tokens + 1e-9)
+
+    def take(self, state, amount):
+        state.tokens -= amount
+        state.dirty = True
+
+    def give(self, state, amount):
+        state.tokens = min(float(self.capacity), state.tokens + amount)
+        state.dirty = True
+
+
+class SlidingWindow:
+    """
+    Не більше limit за останні period секунд. Рахується двома вікнами:
+    поточне плюс частка попереднього, що ще потрапляє в ковзний інтервал.
+    """
+
+    persistent = True
+
+    def __init__(self, limit, period):
+        self.limit = limit
+        self.period = period
+
+    def window_of(self, now):
+        return int(now // self.period)
+
+    def prev_weight(self, now):
+        return 1.0 - (now % self.period) / self.period
+
+    def new_state(self, now):
+        state = _State()
+        state.window_id = self.window_of(now)
+        return state
+
+    def refresh(self, state, now):
+        window_id = self.window_of(now)
+        if window_id != state.window_id:
+            state.prev_used = state.used if window_id == state.window_id + 1 else 0.0
+            state.used = 0.0
+            # Недописані витрати минулого вікна не переносимо в нове
+            state.pending = 0.0
+            state.window_id = window_id
+
+    def remaining(self, state, now):
+        used = state.used + state.prev_used * self.prev_weight(now)
+        return max(math.floor(self.limit - used + 1e-9), 0)
+
+    def take(self, state, amount):
+        state.used += amount
+        state.pending += amount
+        state.dirty = True
+
+    def give(self, state, amount):
+        amount = min(amount, state.used)
+        state.used -= amount
+        state.pending -= amount
+        state.dirty = True
+
+
+class DailyQuota(SlidingWindow):
+    """
+    Денна квота з оновленням опівночі (як обіцяють тексти бота: "повертайся завтра").
+    derived=True — квота, яку атомарно рахує БД з історії (уроки, бали Лабораторії):
+    лімітер не зберігає її, а лише пам'ятає останній результат через observe().
+    """
+
+    def __init__(self, limit, derived=False):
+        super().__init__(limit, 86400)
+        self.persistent = not derived
+
+    def window_of(self, now):
+        return day_of(now).toordinal()
+
+    def prev_weight(self, now):
+        return 0.0
+
+
+LIMITS = {
+    "ai_cooldown": TokenBucket(1, AI_COOLDOWN_SECONDS),
+    "ai_daily": DailyQuota(AI_DAILY_LIMIT),
+    "energy": DailyQuota(GYM_DAILY_ENERGY),
+    "academy": DailyQuota(ACADEMY_DAILY_LIMIT, derived=True),
+    "lab_points": DailyQuota(LAB_DAILY_POINTS_LIMIT, derived=True),
+}
+
+_LOAD_SQL = """
+    SELECT name, window_id, used, prev_used, tokens, refilled_at
+    FROM rate_limits WHERE user_id = $1
+"""
+
+# Злиття дельт з тим, що вже записав інший процес. Рядки видалених юзерів відкидаємо.
+_MERGE_WINDOWS_SQL = """
+    INSERT INTO rate_limits (user_id, name, window_id, used)
+    SELECT d.user_id, d.name, d.window_id, d.delta
+    FROM unnest($1::bigint[], $2::text[], $3::bigint[], $4::float8[]) AS d(user_id, name, window_id, delta)
+    JOIN users u ON u.user_id = d.user_id
+    ON CONFLICT (user_id, name) DO UPDATE SET
+        used = CASE
+            WHEN rate_limits.window_id = EXCLUDED.window_id THEN GREATEST(rate_limits.used + EXCLUDED.used, 0)
+            WHEN rate_limits.window_id > EXCLUDED.window_id THEN rate_limits.used
+            ELSE GREATEST(EXCLUDED.used, 0)
+        END,
+        prev_used = CASE
+            WHEN rate_limits.window_id >= EXCLUDED.window_id THEN rate_limits.prev_used
+            WHEN rate_limits.window_id = EXCLUDED.window_id - 1 THEN rate_limits.used
+            ELSE 0
+        END,
+        window_id = GREATEST(rate_limits.window_id, EXCLUDED.window_id),
+        updated_at = CURRENT_TIMESTAMP
+    RETURNING user_id, name, window_id, used, prev_used
+"""
+
+_PUT_BUCKETS_SQL = """
+    INSERT INTO rate_limits (user_id, name, tokens, refilled_at)
+    SELECT d.user_id, d.name, d.tokens, d.refilled_at
+    FROM unnest($1::bigint[], $2::text[], $3::float8[], $4::float8[]) AS d(user_id, name, tokens, refilled_at)
+    JOIN users u ON u.user_id = d.user_id
+    ON CONFLICT (user_id, name) DO UPDATE SET
+        tokens = EXCLUDED.tokens,
+        refilled_at = EXCLUDED.refilled_at,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+
+async def create_tables(conn):
+    async with conn.transaction():
+        existed = await conn.fetchval("SELECT to_regclass('rate_limits') IS NOT NULL")
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                user_id BIGINT NOT NULL,
+                name TEXT NOT NULL,
+                window_id BIGINT NOT NULL DEFAULT 0,
+                used DOUBLE PRECISION NOT NULL DEFAULT 0,
+                prev_used DOUBLE PRECISION NOT NULL DEFAULT 0,
+                tokens DOUBLE PRECISION,
+                refilled_at DOUBLE PRECISION,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (user_id, name)
+            )
+            """
+        )
+        if not existed:
+            # Одноразово переносимо сьогоднішні витрати зі старих колонок users.
+            # window_id — порядковий номер CURRENT_DATE, як date.toordinal() у DailyQuota
+            await conn.execute(
+                """
+                WITH today AS (SELECT (CURRENT_DATE - DATE '0001-01-01' + 1)::bigint AS window_id)
+                INSERT INTO rate_limits (user_id, name, window_id, used)
+                SELECT user_id, 'energy', today.window_id, $1::int - energy FROM users, today
+                WHERE last_active_date = CURRENT_DATE AND energy < $1::int
+                UNION ALL
+                SELECT user_id, 'ai_daily', today.window_id, ai_message_count FROM users, today
+                WHERE last_ai_reset = CURRENT_DATE AND ai_message_count > 0
+                ON CONFLICT DO NOTHING
+                """,
+                GYM_DAILY_ENERGY,
+            )
+
+
+class _UserLimits:
+    __slots__ = ("states", "loaded", "touched")
+
+    def __init__(self):
+        self.states = {}
+        self.loaded = False
+        self.touched = time.monotonic()
+
+
+class RateLimiter:
+    def __init__(self, db, limits=LIMITS, checkpoint_interval=5.0, max_users=50000, idle_ttl=1800):
+        self.db = db
+        self.limits = limits
+        self.checkpoint_interval = checkpoint_interval
+        self.max_users = max_users
+        # Чисті записи, яких не торкались idle_ttl секунд, вивантажуються після checkpoint
+        self.idle_ttl = idle_ttl
+        self._users = OrderedDict()
+        self._loading = {}
+        self._lock = asyncio.Lock()
+        self._checkpointed_at = 0.0
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._closed = False
+
+    def start(self):
+        if self._task is None:
+            self._task = metrics.background_task(self._run(), "rate_limit")
+
+    # --- Рішення (у пам'яті) ---
+
+    async def acquire(self, user_id, *names, amount=1):
+        """
+        Списує amount з кожного ліміту names, якщо вистачає в усіх.
+        Повертає None або назву першого ліміту, що не пустив (тоді нічого не списано).
+        """
+        entry = await self._entry(user_id)
+        now = time.time()
+        states = [self._state(entry, name, now) for name in names]
+        for name, state in zip(names, states):
+            if self.limits[name].remaining(state, now) < amount:
+                return name
+        for name, state in zip(names, states):
+            self.limits[name].take(state, amount)
+        return None
+
+    async def remaining(self, user_id, name):
+        entry = await self._entry(user_id)
+        now = time.time()
+        return self.limits[name].remaining(self._state(entry, name, now), now)
+
+    async def release(self, user_id, name, amount=1):
+        """Повертає витрачене (наприклад, енергію за бонус). False — повертати нічого."""
+        entry = await self._entry(user_id)
+        now = time.time()
+        limit = self.limits[name]
+        state = self._state(entry, name, now)
+        before = limit.remaining(state, now)
+        limit.give(state, amount)
+        return limit.remaining(state, now) > before
+
+    def exhausted(self, user_id, name):
+        """Тільки для відомого стану в пам'яті, без БД: True — квоту точно вичерпано"""
+        entry = self._users.get(user_id)
+        if entry is None or name not in entry.states:
+            return False
+        now = time.time()
+        return self.limits[name].remaining(self._state(entry, name, now), now) <= 0
+
+    def observe(self, user_id, name, used):
+        """Запам'ятовує витрачене за даними БД (для derived-квот після атомарного виклику)"""
+        entry = self._users.get(user_id)
+        if entry is None:
+            entry = self._users[user_id] = _UserLimits()
+        now = time.time()
+        state = self._state(entry, name, now)
+        state.used = float(used)
+        entry.touched = time.monotonic()
+        self._users.move_to_end(user_id)
+
+    def forget(self, user_id):
+        self._users.pop(user_id, None)
+
+    async def _entry(self, user_id):
+        entry = self._users.get(user_id)
+        if entry is None or not entry.loaded:
+            # Паралельні запити одного юзера чекають одне завантаження
+            loading = self._loading.get(user_id)
+            if loading is None:
+                loading = self._loading[user_id] = asyncio.ensure_future(self._load(user_id))
+                loading.add_done_callback(lambda _: self._loading.pop(user_id, None))
+            await asyncio.shield(loading)
+            entry = self._users[user_id]
+        entry.touched = time.monotonic()
+        self._users.move_to_end(user_id)
+        return entry
+
+    async def _load(self, user_id):
+        async with self.db.pool.acquire() as conn:
+            rows = await conn.fetch(_LOAD_SQL, user_id)
+        entry = self._users.get(user_id)
+        if entry is None:
+            entry = self._users[user_id] = _UserLimits()
+        for row in rows:
+            limit = self.limits.get(row["name"])
+            if limit is None or not limit.persistent or row["name"] in entry.states:
+                continue
+            state = _State()
+            state.window_id = row["window_id"]
+            state.used = row["used"]
+            state.prev_used = row["prev_used"]
+            if row["tokens"] is not None:
+                state.tokens = row["tokens"]
+                state.refilled_at = row["refilled_at"]
+            entry.states[row["name"]] = state
+        entry.loaded = True
+
+    def _state(self, entry, name, now):
+        limit = self.limits[name]
+        state = entry.states.get(name)
+        if state is None:
+            state = entry.states[name] = limit.new_state(now)
+        limit.refresh(state, now)
+        return state
+
+    # --- Збереження ---
+
+    async def _run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.checkpoint_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.checkpoint()
+            except Exception as e:
+                print(f"❌ rate_limits checkpoint failed: {e}")
+
+    async def checkpoint(self):
+        """Пише змінені стани в rate_limits і вивантажує неактивних юзерів"""
+        async with self._lock:
+            windows, buckets = [], []
+            since, self._checkpointed_at = self._checkpointed_at, time.monotonic()
+            for user_id, entry in self._users.items():
+                # Вікна активних юзерів шлемо і з нульовою дельтою: у відповідь приходять
+                # витрати інших процесів
+                active = entry.touched >= since
+                for name, state in entry.states.items():
+                    limit = self.limits[name]
+                    if not limit.persistent:
+                        continue
+                    if isinstance(limit, TokenBucket):
+                        if state.dirty:
+                            state.dirty = False
+                            buckets.append((user_id, name, state.tokens, state.refilled_at))
+                    elif state.dirty or active:
+                        state.dirty = False
+                        windows.append((user_id, name, state.window_id, state.pending, state))
+                        state.pending = 0.0
+
+            try:
+                async with self.db.pool.acquire() as conn:
+                    if buckets:
+                        await conn.execute(_PUT_BUCKETS_SQL, *map(list, zip(*buckets)))
+                    if windows:
+                        rows = await conn.fetch(_MERGE_WINDOWS_SQL, *map(list, zip(*(w[:4] for w in windows))))
+            except Exception:
+                self._restore(windows, buckets)
+                raise
+
+            if windows:
+                self._apply_merged(windows, rows)
+            self._evict()
+
+    def _restore(self, windows, buckets):
+        for user_id, name, window_id, delta, state in windows:
+            if state.window_id == window_id:
+                state.pending += delta
+            state.dirty = True
+        for user_id, name, *_ in buckets:
+            entry = self._users.get(user_id)
+            if entry and name in entry.states:
+                entry.states[name].dirty = True
+
+    def _apply_merged(self, windows, rows):
+        # Після злиття в пам'яті — сумарні витрати всіх процесів плюс те, що набігло за час запису
+        sent = {(user_id, name): (window_id, state) for user_id, name, window_id, _, state in windows}
+        for row in rows:
+            window_id, state = sent[(row["user_id"], row["name"])]
+            if state.window_id == row["window_id"] == window_id:
+                state.used = row["used"] + state.pending
+                state.prev_used = row["prev_used"]
+
+    def _evict(self):
+        idle_before = time.monotonic() - self.idle_ttl
+        for user_id in list(self._users):
+            entry = self._users[user_id]
+            over_limit = len(self._users) > self.max_users
+            if not over_limit and entry.touched > idle_before:
+                # Далі за LRU лише свіжіші записи
+                break
+            if user_id in self._loading or any(state.dirty for state in entry.states.values()):
+                continue
+            del self._users[user_id]
+
+    async def close(self):
+        """Зупиняє фоновий checkpoint і зберігає залишок (викликати при зупинці процесу)"""
+        self._closed = True
+        self._wakeup.set()
+        if self._task:
+            await self._task
+            self._task = None
+        await self.checkpoint()
@@ -0,0 +1,217 @@
+import asyncio
+import datetime
+import json
+import os
+import re
+import time
+
+import asyncpg
+
+import metrics
+
+# Семплер повільних запитів (вмикається SLOW_QUERY_MS > 0). Логер запитів asyncpg
+# збирає все, що довше порогу, групуючи за нормалізованим SQL (літерали -> ?)
+# з формами параметрів (int, str, list[int]#500 ...). Раз на EXPLAIN_INTERVAL секунд
+# для найдорожчих запитів знімається план з реальними параметрами останнього виклику
+# (на репліці READ_REPLICA_URL, якщо задана). EXPLAIN ANALYZE — лише для читання і в
+# READ ONLY транзакції: записи й виклики функцій-мутаторів (complete_article, ...) з
+# параметрами живого юзера не мають брати локи на гарячих рядках і крутити послідовності,
+# тож для них — EXPLAIN без ANALYZE (план без фактичних чисел).
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+READ_REPLICA_URL = os.getenv("READ_REPLICA_URL")
+EXPLAIN_INTERVAL = 300
+# Скільки найдорожчих запитів пояснювати за прохід
+EXPLAIN_TOP = 5
+# EXPLAIN ANALYZE виконує запит по-справжньому: не даємо йому висіти довше
+EXPLAIN_TIMEOUT_MS = 5000
+MAX_STATEMENTS = 200
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+# Пояснюємо лише DML/SELECT; DDL, COPY, службові RESET — ні
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+# Пише або блокує рядки (у т.ч. CTE з INSERT і SELECT ... FOR UPDATE/SHARE)
+_WRITES = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b|\bFOR\s+(KEY\s+)?SHARE\b", re.IGNORECASE)
+
+
+def normalize(query):
+    query = _STRING.sub("?", query)
+    query = _NUMBER.sub("?", query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def param_shape(value):
+    if isinstance(value, (list, tuple)):
+        inner = type(value[0]).__name__ if value else "?"
+        return f"list[{inner}]#{len(value)}"
+    return type(value).__name__
+
+
+class SlowStatement:
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.shapes = set()
+        # Сирий текст і параметри останнього виклику — для EXPLAIN, назовні не віддаються
+        self.sample = None
+        self.plan = None
+        self.explained_at = None
+
+    def add(self, query, args, elapsed_ms):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if len(self.shapes) < 10:
+            self.shapes.add(", ".join(param_shape(arg) for arg in args))
+        self.sample = (query, args)
+
+    def as_dict(self, with_plan=False):
+        data = {
+            "sql": self.sql,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 2),
+            "mean_ms": round(self.total_ms / self.count, 2),
+            "max_ms": round(self.max_ms, 2),
+            "param_shapes": sorted(self.shapes),
+            "plan_summary": summarize_plan(self.plan) if self.plan else None,
+            "explained_at": self.explained_at.isoformat() if self.explained_at else None,
+        }
+        if with_plan:
+            data["plan"] = self.plan
+        return data
+
+
+def summarize_plan(plan):
+    """Коротко про план: час, буфери і вузли, на які варто дивитися (Seq Scan, random(), Sort по диску)"""
+    root = plan["Plan"]
+    flagged = []
+
+    def walk(node):
+        kind = node["Node Type"]
+        if kind == "Seq Scan":
+            rows = node.get("Actual Rows", node.get("Plan Rows", 0))
+            flagged.append(f"Seq Scan on {node.get('Relation Name')} ({rows} rows)")
+        elif kind == "Sort":
+            if any("random()" in key for key in node.get("Sort Key", ())):
+                flagged.append("ORDER BY random()")
+            if node.get("Sort Space Type") == "Disk":
+                flagged.append(f"Sort on disk ({node.get('Sort Space Used')} kB)")
+        for child in node.get("Plans", ()):
+            walk(child)
+
+    walk(root)
+    return {
+        "node": root["Node Type"],
+        # False — план без виконання (запис або мутатор): оцінки планувальника, не факти
+        "analyzed": "Execution Time" in plan,
+        "execution_ms": plan.get("Execution Time"),
+        "shared_hit": root.get("Shared Hit Blocks"),
+        "shared_read": root.get("Shared Read Blocks"),
+        "flagged": flagged,
+    }
+
+
+class SlowQuerySampler:
+    def __init__(self, db, threshold_ms=SLOW_QUERY_MS, replica_url=READ_REPLICA_URL):
+        self.db = db
+        self.threshold_ms = threshold_ms
+        self.replica_url = replica_url
+        self._statements = {}
+        self._task = None
+
+    @property
+    def enabled(self):
+        return self.threshold_ms > 0
+
+    def setup_connection(self, conn):
+        """Реєструє логер на з'єднанні пулу (init пулу в db.py)"""
+        if self.enabled:
+            conn.add_query_logger(self._on_query)
+
+    def _on_query(self, record):
+        elapsed_ms = record.elapsed * 1000
+        if elapsed_ms < self.threshold_ms or record.exception is not None:
+            return
+        sql = normalize(record.query)
+        statement = self._statements.get(sql)
+        if statement is None:
+            if len(self._statements) >= MAX_STATEMENTS:
+                # Витісняємо найдешевший, щоб місце отримав новий
+                cheapest = min(self._statements, key=lambda key: self._statements[key].total_ms)
+                del self._statements[cheapest]
+            statement = self._statements[sql] = SlowStatement(sql)
+        statement.add(record.query, record.args or (), elapsed_ms)
+
+    def top(self, limit=10, with_plan=False):
+        statements = sorted(self._statements.values(), key=lambda s: s.total_ms, reverse=True)
+        return [statement.as_dict(with_plan) for statement in statements[:limit]]
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = metrics.background_task(self._run(), "slow_queries")
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(EXPLAIN_INTERVAL)
+            try:
+                await self.explain_top()
+            except Exception as e:
+                print(f"❌ Slow query EXPLAIN failed: {e}")
+
+    async def explain_top(self, limit=EXPLAIN_TOP):
+        """Плани найдорожчих запитів, ще не пояснених за останній інтервал"""
+        now = datetime.datetime.now()
+        fresh_after = now - datetime.timedelta(seconds=EXPLAIN_INTERVAL)
+        candidates = [
+            s for s in sorted(self._statements.values(), key=lambda s: s.total_ms, reverse=True)
+            if _EXPLAINABLE.match(s.sample[0]) and not (s.explained_at and s.explained_at > fresh_after)
+        ][:limit]
+        if not candidates:
+            return 0
+
+        # Окреме з'єднання без логерів: власні EXPLAIN не потрапляють у вибірку
+        conn = await asyncpg.connect(self.replica_url or self.db.db_url)
+        try:
+            for statement in candidates:
+                query, args = statement.sample
+                try:
+                    statement.plan = await self._explain(conn, query, args, analyze=not _WRITES.search(statement.sql))
+                except Exception as e:
+                    statement.plan = {"Plan": {"Node Type": "error"}, "error": str(e)}
+                statement.explained_at = now
+        finally:
+            await conn.close()
+        return len(candidates)
+
+    async def _explain(self, conn, query, args, analyze=True):
+        # ANALYZE виконує запит: READ ONLY відкидає будь-який запис, FOR UPDATE чи nextval()
+        # ще до локів — так ловимо й SELECT функції-мутатора, якого не видно з тексту
+        if analyze:
+            try:
+                return await self._run_explain(conn, "ANALYZE, BUFFERS, FORMAT JSON", query, args)
+            except asyncpg.ReadOnlySQLTransactionError:
+                pass
+        return await self._run_explain(conn, "FORMAT JSON", query, args)
+
+    async def _run_explain(self, conn, options, query, args):
+        # Транзакцію все одно відкочуємо
+        tr = conn.transaction(readonly=True)
+        await tr.start()
+        try:
+            await conn.execute(f"SET LOCAL statement_timeout = {EXPLAIN_TIMEOUT_MS}")
+            started = time.perf_counter()
+            raw = await conn.fetchval(f"EXPLAIN ({options}) {query}", *args)
+            plan = json.loads(raw)[0]
+            plan["Explain Wall Time"] = round((time.perf_counter() - started) * 1000, 2)
+            return plan
+        finally:
+            await tr.rollback()
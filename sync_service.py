@@ -0,0 +1,71 @@
+from utils import get_academy_rank, get_stoic_rank
+
+# Синхронізація бота з додатком: бот видає 6-значний код на 10 хвилин,
+# додаток обмінює його на токен і профіль.
+# Прострочені коди не чистить окремий крон: їх прибирає кожна видача нового коду
+# (по індексу expires_at), а погашення однаково перевіряє термін дії.
+
+CODE_CANDIDATES = 8
+
+# Одна інструкція: прибрати старий код юзера і прострочені, вставити перший вільний
+# з кількох випадкових кандидатів. Кандидат, що збігся з будь-яким рядком (навіть тим,
+# який ця ж інструкція видаляє), пропускаємо — ON CONFLICT лишається тільки для гонок.
+_ISSUE_SQL = f"""
+    WITH cleanup AS (
+        DELETE FROM sync_codes
+        WHERE user_id = $1 OR expires_at <= (now() AT TIME ZONE 'utc')
+    ), candidates AS (
+        SELECT DISTINCT lpad(floor(random() * 1000000)::int::text, 6, '0') AS code
+        FROM generate_series(1, {CODE_CANDIDATES})
+    )
+    INSERT INTO sync_codes (code, user_id)
+    SELECT c.code, $1 FROM candidates c
+    WHERE NOT EXISTS (SELECT 1 FROM sync_codes s WHERE s.code = c.code)
+    LIMIT 1
+    ON CONFLICT (code) DO NOTHING
+    RETURNING code
+"""
+
+# Погашення за один запит: код видаляється і одразу повертається токен з профілем
+_REDEEM_SQL = """
+    WITH redeemed AS (
+        DELETE FROM sync_codes
+        WHERE code = $1 AND expires_at > (now() AT TIME ZONE 'utc')
+        RETURNING user_id
+    )
+    SELECT u.user_id, u.username, u.score, u.level, u.birthdate,
+           u.auth_token, COALESCE(u.academy_count, 0) AS academy_count
+    FROM redeemed r JOIN users u ON u.user_id = r.user_id
+"""
+
+
+async def issue_code(db, user_id):
+    """Новий код для юзера (попередній перестає діяти)"""
+    async with db.pool.acquire() as conn:
+        # Кандидати зайняті або паралельна видача забрала той самий код — пробуємо ще раз
+        for _ in range(5):
+            code = await conn.fetchval(_ISSUE_SQL, user_id)
+            if code:
+                return code
+    raise RuntimeError("Не вдалося видати код синхронізації")
+
+
+async def redeem_code(db, code):
+    """Повертає (токен, профіль) або None, якщо код недійсний чи прострочений"""
+    async with db.pool.acquire() as conn:
+        row = await conn.fetchrow(_REDEEM_SQL, code)
+    if not row:
+        return None
+
+    data = dict(row)
+    token = data.pop("auth_token")
+    academy_count = data.pop("academy_count")
+    data["score"] = data["score"] or 0
+    data["rank"] = get_stoic_rank(data["score"])
+    data["user_id"] = int(data["user_id"])
+    if data.get("birthdate"):
+        data["birthdate"] = data["birthdate"].isoformat()
+    data["academy_total"] = academy_count
+    data["academy_rank"] = get_academy_rank(academy_count)
+    data["energy"] = await db.check_energy(data["user_id"])
+    return token, data
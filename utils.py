@@ -1,15 +1,95 @@
-def get_stoic_rank(score):
-    if score < 50:
-        return "🌱 Неофіт"
-    elif score < 150:
-        return "🎒 Учень"
-    elif score < 500:
-        return "🏃 Практик"  # Раніше це був майже кінець
-    elif score < 1000:
-        return "🧠 Філософ"  # Новий рівень
-    elif score < 2500:
-        return "🛡️ Майстер Стійкості"
-    elif score < 5000:
-        return "🏛️ Мудрець"
-    else:
-        return "👑 Стоїчний Ідеал"  # Елітний статус
\ No newline at end of file
+from bisect import bisect_right
+from collections import namedtuple
+
+# Ранги — таблиці з відсортованими порогами: пошук через bisect замість ланцюжків if/elif.
+# Поріг — мінімальне значення, з якого починається звання; перше звання — з нуля.
+
+RankInfo = namedtuple("RankInfo", ["name", "next_threshold", "progress"])
+# RankInfo без Python-рівня __new__ namedtuple (удвічі дешевше в гарячому циклі)
+_new_rank_info = tuple.__new__
+
+
+class RankTable:
+    def __init__(self, ranks):
+        """ranks — список (поріг, {"ua": назва, "en": назва}) за зростанням порогу"""
+        self.thresholds = [threshold for threshold, _ in ranks]
+        self.names = {
+            lang: [names.get(lang) or names["ua"] for _, names in ranks]
+            for lang in {lang for _, names in ranks for lang in names}
+        }
+        # Усе, що залежить лише від інтервалу між порогами, рахуємо один раз:
+        # для останнього звання — готовий RankInfo, для решти — (назва, низ, верх, 1/ширина)
+        self._rows = {lang: self._build_rows(names) for lang, names in self.names.items()}
+
+    def _build_rows(self, names):
+        rows = []
+        for i, name in enumerate(names):
+            if i + 1 == len(names):
+                rows.append(RankInfo(name, 0, 1.0))
+            else:
+                low, high = self.thresholds[i], self.thresholds[i + 1]
+                rows.append((name, low, high, 1.0 / (high - low)))
+        return rows
+
+    def index(self, value) -> int:
+        return max(bisect_right(self.thresholds, value) - 1, 0)
+
+    def name(self, value, lang="ua") -> str:
+        return self.names.get(lang, self.names["ua"])[self.index(value)]
+
+    def next_threshold(self, value) -> int:
+        """Поріг наступного звання або 0, якщо звання максимальне"""
+        i = self.index(value) + 1
+        return self.thresholds[i] if i < len(self.thresholds) else 0
+
+    def _resolve(self, value, rows):
+        row = rows[max(bisect_right(self.thresholds, value) - 1, 0)]
+        if type(row) is RankInfo:
+            return row
+        name, low, high, scale = row
+        progress = (value - low) * scale
+        return _new_rank_info(RankInfo, (name, high, 0.0 if progress < 0.0 else 1.0 if progress > 1.0 else progress))
+
+    def resolve(self, value, lang="ua") -> RankInfo:
+        """Назва, наступний поріг і прогрес до нього (0.0–1.0) одним викликом"""
+        return self._resolve(value, self._rows.get(lang, self._rows["ua"]))
+
+    def resolve_many(self, values, lang="ua"):
+        """resolve для списку (лідерборд): мова вибирається один раз на весь список"""
+        rows = self._rows.get(lang, self._rows["ua"])
+        return [self._resolve(value, rows) for value in values]
+
+
+STOIC_RANKS = RankTable([
+    (0, {"ua": "🌱 Неофіт", "en": "🌱 Neophyte"}),
+    (50, {"ua": "🎒 Учень", "en": "🎒 Apprentice"}),
+    (150, {"ua": "🏃 Практик", "en": "🏃 Practitioner"}),
+    (500, {"ua": "🧠 Філософ", "en": "🧠 Philosopher"}),
+    (1000, {"ua": "🛡️ Майстер Стійкості", "en": "🛡️ Master of Resilience"}),
+    (2500, {"ua": "🏛️ Мудрець", "en": "🏛️ Sage"}),
+    (5000, {"ua": "👑 Стоїчний Ідеал", "en": "👑 Stoic Ideal"}),  # Елітний статус
+])
+
+ACADEMY_RANKS = RankTable([
+    (0, {"ua": "👶 Дошкільня (Ще не почав)", "en": "👶 Preschooler (Not started)"}),
+    (1, {"ua": "1️⃣ 1-й Клас (Новачок)", "en": "1️⃣ Grade 1 (Novice)"}),
+    (5, {"ua": "2️⃣ 2-й Клас (Допитливий)", "en": "2️⃣ Grade 2 (Curious)"}),
+    (10, {"ua": "3️⃣ 3-й Клас (Слухач)", "en": "3️⃣ Grade 3 (Listener)"}),
+    (20, {"ua": "4️⃣ 4-й Клас (Молодший учень)", "en": "4️⃣ Grade 4 (Junior Student)"}),
+    (35, {"ua": "5️⃣ 5-й Клас (Дослідник)", "en": "5️⃣ Grade 5 (Explorer)"}),
+    (50, {"ua": "6️⃣ 6-й Клас (Практик)", "en": "6️⃣ Grade 6 (Practitioner)"}),
+    (70, {"ua": "7️⃣ 7-й Клас (Логік)", "en": "7️⃣ Grade 7 (Logician)"}),
+    (100, {"ua": "8️⃣ 8-й Клас (Аналітик)", "en": "8️⃣ Grade 8 (Analyst)"}),
+    (150, {"ua": "9️⃣ 9-й Клас (Гімназист)", "en": "9️⃣ Grade 9 (Gymnasist)"}),
+    (200, {"ua": "🔟 10-й Клас (Філософ)", "en": "🔟 Grade 10 (Philosopher)"}),
+    (300, {"ua": "1️⃣1️⃣ 11-й Клас (Випускник)", "en": "1️⃣1️⃣ Grade 11 (Graduate)"}),
+    (365, {"ua": "🎓 Магістр Стоїцизму (Університет)", "en": "🎓 Master of Stoicism (University)"}),
+])
+
+
+def get_stoic_rank(score, lang="ua"):
+    return STOIC_RANKS.name(score, lang)
+
+
+def get_academy_rank(count, lang="ua"):
+    return ACADEMY_RANKS.name(count, lang)